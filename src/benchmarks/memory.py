@@ -0,0 +1,58 @@
+import argparse
+import tracemalloc
+
+from src.model.property import Apartment
+
+
+class _DictApartment:
+    # Layout of Apartment before the hierarchy was slotted: an instance dict plus
+    # a fresh facilities list and history list per unit.
+    def __init__(self, property_id, address, size, price, floor_number, facilities):
+        self.property_id = property_id
+        self.address = address
+        self.size = size
+        self.facilities = list(facilities)
+        self.price = price
+        self.history = []
+        self.is_occupied = False
+        self.current_lease = None
+        self.floor_number = floor_number
+        self.has_elevator = False
+        self.has_balcony = False
+
+
+def _slotted(index, facilities):
+    unit = Apartment(f"A{index}", f"{index} Main Street", 80.0, 1000.0 + index, "Bench Homes", index % 20)
+    unit.facilities = facilities
+    return unit
+
+
+def _dict_based(index, facilities):
+    return _DictApartment(f"A{index}", f"{index} Main Street", 80.0, 1000.0 + index, index % 20, facilities)
+
+
+def bytes_per_unit(factory, units: int) -> float:
+    facilities = ("parking", "gym", "pool")
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    portfolio = [factory(index, facilities) for index in range(units)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del portfolio
+    return allocated / units
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the memory cost of one Property unit.")
+    parser.add_argument("--units", type=int, default=100_000)
+    args = parser.parse_args(argv)
+    before = bytes_per_unit(_dict_based, args.units)
+    after = bytes_per_unit(_slotted, args.units)
+    print(f"dict-based Apartment: {before:.1f} bytes/unit")
+    print(f"slotted Apartment:    {after:.1f} bytes/unit")
+    print(f"saving:               {1 - after / before:.1%}")
+
+
+if __name__ == "__main__":
+    main()
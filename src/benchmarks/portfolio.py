@@ -0,0 +1,112 @@
+import random
+from datetime import date, datetime
+
+from src.model import LeaseAgreement, Resident
+from src.model.property import Land, House, Apartment, Shop
+from src.model.rentalcompany import RentalCompany
+from src.scripts.task2 import Payment, PaymentHistory
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+STREETS = ("Green Street", "Main Street", "Park Avenue", "River Road", "Hill Lane", "Station Road", "Market Square",
+           "Lake View", "Cedar Close", "Harbour Way", "Mill Lane", "Church Road")
+CITIES = {"Nairobi": (-1.286, 36.817), "Mombasa": (-4.043, 39.668), "Kisumu": (-0.092, 34.768),
+          "Nakuru": (-0.303, 36.080), "Eldoret": (0.514, 35.269)}
+COMPANY_NAME = "Bench Homes"
+AS_OF = date(2025, 1, 1)
+
+
+def parse_size(size) -> int:
+    return SIZES.get(str(size).lower()) or int(size)
+
+
+class Portfolio:
+    def __init__(self, company: RentalCompany, leases: list[LeaseAgreement], payments: PaymentHistory,
+                 as_of: date):
+        self.company = company
+        self.leases = leases
+        self.payments = payments
+        self.as_of = as_of
+
+    def __repr__(self):
+        return (f"Portfolio(units={len(self.company)}, leases={len(self.leases)}, "
+                f"payments={len(self.payments.payments)})")
+
+
+def _months_before(moment: date, months: int) -> date:
+    index = moment.year * 12 + moment.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def generate_properties(units: int, seed: int = 0, start: int = 0) -> list:
+    rng = random.Random(seed)
+    cities = list(CITIES.items())
+    properties = []
+    for index in range(start, start + units):
+        city, (latitude, longitude) = cities[index % len(cities)]
+        address = f"{rng.randint(1, 400)} {rng.choice(STREETS)}, {city}"
+        coordinates = (latitude + rng.uniform(-0.15, 0.15), longitude + rng.uniform(-0.15, 0.15))
+        kind = rng.random()
+        if kind < 0.6:
+            p = Apartment(f"A{index}", address, rng.uniform(35, 140), round(rng.uniform(400, 2500), 2), COMPANY_NAME,
+                          rng.randint(0, 30), *coordinates)
+            p.has_elevator = p.floor_number > 4
+            p.has_balcony = rng.random() < 0.5
+        elif kind < 0.85:
+            p = House(f"H{index}", address, rng.uniform(90, 400), round(rng.uniform(900, 6000), 2), COMPANY_NAME,
+                      rng.randint(1, 6), rng.randint(1, 4), *coordinates)
+            p.has_garden = rng.random() < 0.6
+        elif kind < 0.95:
+            p = Shop(f"S{index}", address, rng.uniform(20, 300), round(rng.uniform(700, 8000), 2), COMPANY_NAME,
+                     rng.choice(("Retail", "Food", "Services")), *coordinates)
+            p.parking_available = rng.random() < 0.4
+        else:
+            p = Land(f"L{index}", address, rng.uniform(500, 5000), round(rng.uniform(2000, 40000), 2), COMPANY_NAME,
+                     rng.choice(("Residential", "Commercial", "Agricultural")), rng.uniform(200, 4000), *coordinates)
+        if rng.random() < 0.3:
+            p.facilities = rng.sample(("parking", "gym", "pool", "security", "backup power"), 2)
+        properties.append(p)
+    return properties
+
+
+def generate_portfolio(units: int, seed: int = 0, occupancy: float = 0.85, lease_history: int = 3,
+                       payment_months: int = 3, as_of: date = AS_OF) -> Portfolio:
+    rng = random.Random(seed + 1)
+    properties = generate_properties(units, seed)
+    # Residents are shared across units to keep the object graph closer to a real tenant base.
+    residents = [Resident(100_000 + index, f"resident{index}", "hash", index, f"Resident {index}",
+                          f"resident{index}@example.com", []) for index in range(max(1, units // 4))]
+    leases, payments = [], []
+    lease_id = 0
+    for p in properties:
+        occupied = rng.random() < occupancy
+        count = rng.randint(1, lease_history) if occupied else rng.randint(0, lease_history - 1)
+        # Back-to-back yearly leases; an occupied unit's last lease runs over the as-of date.
+        first_start = _months_before(as_of, 12 * count - (rng.randint(1, 11) if occupied else -rng.randint(1, 6)))
+        for position in range(count):
+            lease_id += 1
+            resident = residents[rng.randrange(len(residents))]
+            start = _months_before(first_start, -12 * position)
+            lease = LeaseAgreement(lease_id, p, resident, datetime(start.year, start.month, start.day), 12,
+                                   round(p.price * rng.uniform(0.9, 1.0), 2))
+            resident.lease_agreements.append(lease)
+            leases.append(lease)
+            if occupied and position == count - 1:
+                p.add_lease(lease)
+                resident.current_lease = lease
+            else:
+                p._record_history(lease)
+        if occupied and count:
+            lease = p.current_lease
+            for month in range(payment_months, 0, -1):
+                payment = Payment(lease, lease.monthly_rent, _months_before(as_of, month))
+                outcome = rng.random()
+                if outcome < 0.85:
+                    payment.settle(payment.due_date)
+                elif outcome < 0.95:
+                    payment.settle(date.fromordinal(payment.due_date.toordinal() + rng.randint(2, 20)))
+                payments.append(payment)
+    company = RentalCompany(COMPANY_NAME)
+    company.add_properties(properties)
+    history = PaymentHistory()
+    history.add_payments(payments)
+    return Portfolio(company, leases, history, as_of)
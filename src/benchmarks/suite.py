@@ -0,0 +1,195 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+
+from src.benchmarks.portfolio import CITIES, COMPANY_NAME, STREETS, generate_portfolio, generate_properties, parse_size
+from src.model import ExpiryCalendar, LeaseRegistry, renew_many
+from src.model.instrumentation import metrics
+from src.model.rentalcompany import RentalCompany, PropertySearch, Navigation, RentalAnalytics, MonthlyReport
+from src.model.property import House
+
+FORMAT_VERSION = 1
+
+
+class Benchmark:
+    def __init__(self, name: str, run, setup=None, ops: int = 1):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.ops = ops
+
+    def measure(self, repeat: int) -> dict:
+        timings = []
+        for _ in range(repeat):
+            argument = self.setup() if self.setup is not None else None
+            started = time.perf_counter()
+            for _ in range(self.ops):
+                self.run(argument)
+            timings.append((time.perf_counter() - started) / self.ops)
+        return {"seconds": statistics.median(timings), "best": min(timings), "repeat": repeat, "ops": self.ops}
+
+
+def benchmarks(portfolio, seed: int = 0) -> list[Benchmark]:
+    company, payments = portfolio.company, portfolio.payments
+    rng = random.Random(seed)
+    search, analytics, navigation = PropertySearch(), RentalAnalytics(), Navigation(company)
+    locations = [rng.choice(STREETS) for _ in range(50)]
+    prices = [(low, low + rng.uniform(50, 400)) for low in (rng.uniform(400, 5000) for _ in range(50))]
+    origins = [(latitude + rng.uniform(-0.2, 0.2), longitude + rng.uniform(-0.2, 0.2))
+               for latitude, longitude in (rng.choice(list(CITIES.values())) for _ in range(50))]
+    cycle = {"location": 0, "price": 0, "origin": 0}
+
+    def next_value(key: str, values: list):
+        cycle[key] = (cycle[key] + 1) % len(values)
+        return values[cycle[key]]
+
+    def fresh_units():
+        return RentalCompany(COMPANY_NAME), generate_properties(min(len(company), 100_000), seed + 7)
+
+    def add_one_by_one(argument):
+        target, properties = argument
+        for p in properties:
+            target.add_property(p)
+
+    def add_in_bulk(argument):
+        target, properties = argument
+        target.add_properties(properties)
+
+    def fresh_leases():
+        # Every unit is let on a current lease that both lease indexes track, so each change is re-indexed.
+        leases = generate_portfolio(min(len(company), 20_000), seed + 11, occupancy=1.0, lease_history=1,
+                                    payment_months=0).leases
+        LeaseRegistry(leases)
+        ExpiryCalendar(leases)
+        return leases
+
+    def renew_one_by_one(leases):
+        for lease in leases:
+            lease.renew(12)
+
+    def terminate_one_by_one(leases):
+        for lease in leases:
+            lease.terminate()
+
+    return [
+        Benchmark("search.by_location", lambda _: search.search_by_location(company, next_value("location", locations)), ops=5),
+        Benchmark("search.by_price", lambda _: search.search_by_price(company, *next_value("price", prices)), ops=20),
+        Benchmark("search.by_availability", lambda _: search.search_by_availability(company), ops=5),
+        Benchmark("search.query_page", lambda _: search.query_page(
+            company, location=next_value("location", locations), available=True, type=House, min_bedrooms=3), ops=50),
+        Benchmark("navigation.nearest_available", lambda _: navigation.get_nearest_available_property(
+            next_value("origin", origins)), ops=200),
+        Benchmark("analytics.vacancy_rate", lambda _: analytics.vacancy_rate(company), ops=100),
+        Benchmark("analytics.loss_due_to_vacancy", lambda _: analytics.loss_due_to_vacancy(company), ops=100),
+        Benchmark("analytics.average_rent", lambda _: analytics.average_rent(company), ops=100),
+        Benchmark("analytics.total_revenue", lambda _: analytics.total_revenue(company), ops=100),
+        Benchmark("analytics.turnover_rate", lambda _: analytics.turnover_rate(company), ops=100),
+        Benchmark("analytics.revenue_analysis", lambda _: analytics.revenue_analysis(company)),
+        Benchmark("report.generate_report", lambda _: MonthlyReport(1, 1, 2025).generate_report(company.properties_list)),
+        Benchmark("report.generate_reports", lambda _: MonthlyReport.generate_reports(company, 2023, 1, 2025, 12)),
+        Benchmark("payments.total_revenue", lambda _: payments.total_revenue("2024-10-01", "2024-12-31"), ops=1000),
+        Benchmark("company.add_property", add_one_by_one, setup=fresh_units),
+        Benchmark("company.add_properties", add_in_bulk, setup=fresh_units),
+        Benchmark("lease.renew", renew_one_by_one, setup=fresh_leases),
+        Benchmark("lease.renew_many", lambda leases: renew_many(leases, 12), setup=fresh_leases),
+        Benchmark("lease.terminate", terminate_one_by_one, setup=fresh_leases),
+    ]
+
+
+def run(sizes, repeat: int = 5, seed: int = 0, only: str = None, payment_months: int = 3, progress=None) -> dict:
+    results = {"format": FORMAT_VERSION,
+               "meta": {"python": platform.python_version(), "implementation": platform.python_implementation(),
+                        "machine": platform.machine(), "created": datetime.now().isoformat(timespec="seconds"),
+                        "seed": seed, "repeat": repeat},
+               "runs": {}}
+    for size in sizes:
+        units = parse_size(size)
+        started = time.perf_counter()
+        portfolio = generate_portfolio(units, seed, payment_months=payment_months)
+        timings = {"generate_portfolio": {"seconds": time.perf_counter() - started, "best": None, "repeat": 1,
+                                          "ops": 1}}
+        for benchmark in benchmarks(portfolio, seed):
+            if only and not benchmark.name.startswith(only):
+                continue
+            timings[benchmark.name] = benchmark.measure(repeat)
+            if progress is not None:
+                progress(f"{size:>6} {benchmark.name:<32} {timings[benchmark.name]['seconds'] * 1000:10.3f} ms")
+        results["runs"][str(size)] = {"units": units, "leases": len(portfolio.leases),
+                                      "payments": len(portfolio.payments.payments), "benchmarks": timings}
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float = 0.25) -> list[dict]:
+    if baseline.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported baseline format {baseline.get('format')!r}.")
+    rows = []
+    for size, current in results["runs"].items():
+        reference = baseline["runs"].get(size)
+        if reference is None or reference["units"] != current["units"]:
+            continue
+        for name, timing in current["benchmarks"].items():
+            before = reference["benchmarks"].get(name)
+            if before is None:
+                rows.append({"size": size, "name": name, "baseline": None, "current": timing["seconds"],
+                             "change": None, "status": "new"})
+                continue
+            change = timing["seconds"] / before["seconds"] - 1 if before["seconds"] else 0.0
+            status = "regressed" if change > tolerance else "improved" if change < -tolerance else "ok"
+            rows.append({"size": size, "name": name, "baseline": before["seconds"], "current": timing["seconds"],
+                         "change": change, "status": status})
+    return rows
+
+
+def format_comparison(rows: list[dict]) -> str:
+    lines = []
+    for row in rows:
+        if row["baseline"] is None:
+            lines.append(f"{row['size']:>6} {row['name']:<32} {'':>10} {row['current'] * 1000:10.3f} ms  new")
+        else:
+            lines.append(f"{row['size']:>6} {row['name']:<32} {row['baseline'] * 1000:10.3f} "
+                         f"{row['current'] * 1000:10.3f} ms {row['change']:+8.1%}  {row['status']}")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Time searches, analytics, reports and bulk loads on synthetic "
+                                                 "portfolios.")
+    parser.add_argument("--size", action="append", help="portfolio size: 10k, 100k, 1m or a unit count "
+                                                        "(repeatable, default 10k)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--payment-months", type=int, default=3)
+    parser.add_argument("--only", help="run only benchmarks whose name starts with this prefix")
+    parser.add_argument("--output", help="write the results as JSON to this path")
+    parser.add_argument("--baseline", help="compare against results previously written with --output")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a benchmark counts "
+                                                                      "as regressed (0.25 = 25%%)")
+    parser.add_argument("--metrics", help="also record per-operation instrumentation and export it to this path")
+    args = parser.parse_args(argv)
+    if args.metrics:
+        metrics.enable()
+    results = run(args.size or ["10k"], args.repeat, args.seed, args.only, args.payment_months,
+                  progress=lambda line: print(line, file=sys.stderr))
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(results, handle, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    if args.metrics:
+        metrics.export(args.metrics)
+    if args.baseline:
+        with open(args.baseline) as handle:
+            rows = compare(results, json.load(handle), args.tolerance)
+        print(format_comparison(rows), file=sys.stderr)
+        if any(row["status"] == "regressed" for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,15 @@
-from datetime import datetime
+import logging
+from calendar import monthrange
+from collections.abc import Sequence
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from src.model.indexes import IntervalTree, SortedIndex
+from src.model.instrumentation import metrics, timed
 from src.model.property import Property
 from src.model.maintenance import Event
 
+logger = logging.getLogger(__name__)
+
 class User:
     def __init__(self, user_id: int, username: str, password_hash: str, role: str):
         self.user_id = user_id
@@ -16,11 +24,77 @@ class User:
         return self.password_hash == password
 
 
+class AssignedProperties(Sequence):
+    # holder is (role, user_id): ids are only unique within a role, so an owner and a manager
+    # that share a number must not share visibility. Compares equal to a list of the same properties.
+    def __init__(self, holder, properties: list[Property] = None):
+        self.holder = holder
+        self._indexes = ()
+        self._properties: dict[str, Property] = {}
+        for p in properties or []:
+            self.append(p)
+
+    def __len__(self):
+        return len(self._properties)
+
+    def __iter__(self):
+        return iter(list(self._properties.values()))
+
+    def __getitem__(self, index):
+        return list(self._properties.values())[index]
+
+    def __eq__(self, other):
+        if isinstance(other, AssignedProperties):
+            return list(self) == list(other)
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    def __contains__(self, property: Property):
+        return self._properties.get(property.property_id) is property
+
+    def is_attached(self, index) -> bool:
+        return index in self._indexes
+
+    def __repr__(self):
+        return f"AssignedProperties(holder={self.holder}, properties={list(self._properties)})"
+
+    def ids(self):
+        return self._properties.keys()
+
+    def attach_index(self, index) -> None:
+        if index not in self._indexes:
+            self._indexes += (index,)
+            for property_id in self._properties:
+                index.add(self.holder, property_id)
+
+    def detach_index(self, index) -> None:
+        if index in self._indexes:
+            self._indexes = tuple(attached for attached in self._indexes if attached is not index)
+            for property_id in self._properties:
+                index.remove(self.holder, property_id)
+
+    def append(self, property: Property) -> bool:
+        if property.property_id in self._properties:
+            return False
+        self._properties[property.property_id] = property
+        for index in self._indexes:
+            index.add(self.holder, property.property_id)
+        return True
+
+    def remove(self, property: Property) -> None:
+        if property not in self:
+            raise ValueError(f"Property {property.property_id} is not assigned to {self.holder}.")
+        del self._properties[property.property_id]
+        for index in self._indexes:
+            index.remove(self.holder, property.property_id)
+
+
 class Owner(User):
     def __init__(self, owner_id: int, name: str, contact_info: str, properties: list[Property]):
         super().__init__(user_id=owner_id, username=name, password_hash="dummy", role="owner")
         self.contact_info = contact_info
-        self.properties = properties
+        self.properties = AssignedProperties((self.role, owner_id), properties)
 
     def get_properties(self):
         return self.properties
@@ -30,7 +104,7 @@ class Admin(User):
     def __init__(self, user_id: int, username: str, password_hash: str):
         super().__init__(user_id, username, password_hash, role="admin")
         self.permissions = ["manage_properties", "manage_users"]
-        self.properties = []
+        self.properties = AssignedProperties((self.role, user_id))
 
     def add_property(self, property: Property):
         self.properties.append(property)
@@ -39,13 +113,13 @@ class Admin(User):
         if property in self.properties:
             self.properties.remove(property)
         else:
-            print(f"Property {property} not found.")
+            logger.warning("Property %s not found.", property, extra={"user_id": self.user_id})
 
 
 class PropertyManager(User):
     def __init__(self, user_id: int, username: str, password_hash: str):
         super().__init__(user_id, username, password_hash, role="manager")
-        self.properties: list[Property] = []
+        self.properties = AssignedProperties((self.role, user_id))
 
     def assign_property(self, property: Property):
         self.properties.append(property)
@@ -71,11 +145,13 @@ class Resident(User):
     def get_active_lease(self):
         return [lease for lease in self.lease_agreements if lease.is_active()]
 
+    @timed("resident.pay_rent")
     def pay_rent(self, amount: float):
         if self.current_lease:
             self.current_lease.pay_rent(amount)
         else:
-            print("No active lease found.")
+            metrics.increment("payments.without_lease")
+            logger.warning("No active lease found.", extra={"resident_id": self.resident_id})
 
 
 class RentalApplication:
@@ -110,14 +186,23 @@ class Complaint:
             return Event(opened=False, text="Complaint resolved successfully.")
 
 
+@lru_cache(maxsize=65536)
+def months_after(year: int, month: int, day: int, months: int) -> datetime:
+    # Leases cluster on a few start dates and standard terms, so the same shifts come up over and over.
+    year, month = divmod(year * 12 + month - 1 + months, 12)
+    return datetime(year, month + 1, min(day, monthrange(year, month + 1)[1]))
+
+
 class LeaseAgreement:
     def __init__(self, lease_id: int, property: Property, resident: Resident, start_date, duration_months: int, monthly_rent: float):
+        self._registries = ()
         self.lease_id = lease_id
         self.property = property
         self.resident = resident
         self.start_date = start_date if isinstance(start_date, datetime) else datetime.strptime(start_date, '%Y-%m-%d')
         self.duration_months = duration_months
         self.monthly_rent = monthly_rent
+        self.penalty_rule = None
         self._is_active = True
         self.end_date = self._calculate_end_date()
 
@@ -125,23 +210,31 @@ class LeaseAgreement:
         return self._is_active and datetime.now() < self.end_date
 
     def _calculate_end_date(self):
-        year = self.start_date.year + (self.start_date.month + self.duration_months - 1) // 12
-        month = (self.start_date.month + self.duration_months - 1) % 12 + 1
-        day = min(self.start_date.day, [31, 29 if year % 4 == 0 and (year % 100 != 0 or year % 400 == 0) else 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31][month - 1])
-        return datetime(year, month, day)
+        return months_after(self.start_date.year, self.start_date.month, self.start_date.day, self.duration_months)
+
+    def _reindex(self) -> None:
+        for registry in self._registries:
+            registry.refresh(self)
 
+    @timed("lease.renew")
     def renew(self, additional_months):
         self.duration_months += additional_months
         self.end_date = self._calculate_end_date()
+        self._reindex()
 
+    @timed("lease.terminate")
     def terminate(self):
         self._is_active = False
         self.end_date = datetime.now()
         self.property.terminate_lease()
         self.resident.current_lease = None
+        self._reindex()
 
+    @timed("lease.pay_rent")
     def pay_rent(self, amount: float):
-        print(f"Payment of {amount} received for lease {self.lease_id}.")
+        metrics.increment("payments.received")
+        logger.info("Payment of %s received for lease %s.", amount, self.lease_id,
+                    extra={"lease_id": self.lease_id, "amount": amount})
 
     def __str__(self):
         return f"Lease for {self.property} with {self.resident.name} ({self.start_date.strftime('%Y-%m-%d')} to {self.end_date.strftime('%Y-%m-%d')})"
@@ -170,3 +263,174 @@ class RentalContract:
 
     def __str__(self):
         return f"Rental Contract for {self.property} with {self.owner.name} ({self.commission_fee}% fee, started {self.start_date.strftime('%Y-%m-%d')})"
+
+
+def _as_datetime(moment) -> datetime:
+    return moment if isinstance(moment, datetime) else datetime.combine(moment, time())
+
+
+class LeaseRegistry:
+    def __init__(self, leases: list[LeaseAgreement] = None):
+        self._sequence: dict[LeaseAgreement, int] = {}
+        self._indexed_end: dict[LeaseAgreement, datetime] = {}
+        self._next_sequence = 0
+        self._intervals = IntervalTree()
+        self._ends = SortedIndex()
+        for lease in leases or []:
+            self.add(lease)
+
+    def __len__(self):
+        return len(self._sequence)
+
+    def __contains__(self, lease: LeaseAgreement):
+        return lease in self._sequence
+
+    def _index(self, lease: LeaseAgreement) -> None:
+        self._indexed_end[lease] = lease.end_date
+        self._intervals.add(lease.start_date, self._sequence[lease], lease.end_date, lease)
+        self._ends.add(lease, lease.end_date)
+
+    def _unindex(self, lease: LeaseAgreement) -> None:
+        self._intervals.remove(lease.start_date, self._sequence[lease])
+        self._ends.remove(lease, self._indexed_end.pop(lease))
+
+    def refresh(self, lease: LeaseAgreement) -> None:
+        if self._indexed_end.get(lease) != lease.end_date:
+            self._unindex(lease)
+            self._index(lease)
+
+    def add(self, lease: LeaseAgreement) -> None:
+        if lease in self._sequence:
+            return
+        self._sequence[lease] = self._next_sequence
+        self._next_sequence += 1
+        self._index(lease)
+        lease._registries += (self,)
+
+    def remove(self, lease: LeaseAgreement) -> None:
+        if lease in self._sequence:
+            self._unindex(lease)
+            del self._sequence[lease]
+            lease._registries = tuple(registry for registry in lease._registries if registry is not self)
+
+    def active_on(self, moment) -> list[LeaseAgreement]:
+        return self._intervals.containing(_as_datetime(moment))
+
+    def active_between(self, start, end) -> list[LeaseAgreement]:
+        return self._intervals.overlapping(_as_datetime(start), _as_datetime(end))
+
+    def ending_between(self, start, end) -> list[LeaseAgreement]:
+        return self._ends.range(_as_datetime(start), _as_datetime(end))
+
+    def ending_within(self, days: int, today=None) -> list[LeaseAgreement]:
+        today = _as_datetime(today or date.today())
+        return self.ending_between(today, today + timedelta(days=days))
+
+    def refresh_many(self, leases) -> None:
+        changed = [lease for lease in leases
+                   if lease in self._indexed_end and self._indexed_end[lease] != lease.end_date]
+        if len(changed) * 8 < len(self._indexed_end):
+            for lease in changed:
+                self._unindex(lease)
+                self._index(lease)
+            return
+        # For a large batch, re-sorting the end index once is cheaper than shifting it once per lease.
+        for lease in changed:
+            self._intervals.remove(lease.start_date, self._sequence[lease])
+            self._intervals.add(lease.start_date, self._sequence[lease], lease.end_date, lease)
+            self._indexed_end[lease] = lease.end_date
+        self._ends = SortedIndex()
+        self._ends.add_many((end_date, lease) for lease, end_date in self._indexed_end.items())
+
+
+class ExpiryCalendar:
+    def __init__(self, leases: list[LeaseAgreement] = None):
+        self._buckets: dict[date, dict[LeaseAgreement, None]] = {}
+        self._indexed: dict[LeaseAgreement, date] = {}
+        self._days = SortedIndex()
+        self._members: dict[LeaseAgreement, None] = {}
+        for lease in leases or []:
+            self.add(lease)
+
+    def __len__(self):
+        return len(self._members)
+
+    def __contains__(self, lease: LeaseAgreement):
+        return lease in self._members
+
+    def _index(self, lease: LeaseAgreement) -> None:
+        # Terminated leases stay registered but are no longer expiring.
+        if not lease._is_active:
+            return
+        day = lease.end_date.date()
+        self._indexed[lease] = day
+        bucket = self._buckets.get(day)
+        if bucket is None:
+            bucket = self._buckets[day] = {}
+            self._days.add(day, day)
+        bucket[lease] = None
+
+    def _unindex(self, lease: LeaseAgreement) -> None:
+        day = self._indexed.pop(lease, None)
+        if day is None:
+            return
+        bucket = self._buckets[day]
+        del bucket[lease]
+        if not bucket:
+            del self._buckets[day]
+            self._days.remove(day, day)
+
+    def add(self, lease: LeaseAgreement) -> None:
+        if lease in self._members:
+            return
+        self._members[lease] = None
+        self._index(lease)
+        lease._registries += (self,)
+
+    def remove(self, lease: LeaseAgreement) -> None:
+        if lease in self._members:
+            self._unindex(lease)
+            del self._members[lease]
+            lease._registries = tuple(registry for registry in lease._registries if registry is not self)
+
+    def refresh(self, lease: LeaseAgreement) -> None:
+        if lease in self._members:
+            self._unindex(lease)
+            self._index(lease)
+
+    def refresh_many(self, leases) -> None:
+        for lease in leases:
+            self.refresh(lease)
+
+    def expiring_on(self, day) -> list[LeaseAgreement]:
+        return list(self._buckets.get(_as_datetime(day).date(), ()))
+
+    def expiring_between(self, start, end) -> list[LeaseAgreement]:
+        return [lease for day in self._days.range(_as_datetime(start).date(), _as_datetime(end).date())
+                for lease in self._buckets[day]]
+
+    def expiring_within(self, days: int, today=None) -> list[LeaseAgreement]:
+        today = _as_datetime(today or date.today()).date()
+        return self.expiring_between(today, today + timedelta(days=days))
+
+    def counts_by_day(self, start, end) -> dict[date, int]:
+        return {day: len(self._buckets[day])
+                for day in self._days.range(_as_datetime(start).date(), _as_datetime(end).date())}
+
+
+@timed("lease.renew_many")
+def renew_many(leases, months: int) -> Event:
+    renewed = 0
+    batches: dict[int, tuple] = {}
+    for lease in leases:
+        lease.duration_months += months
+        lease.end_date = lease._calculate_end_date()
+        for registry in lease._registries:
+            batches.setdefault(id(registry), (registry, []))[1].append(lease)
+        renewed += 1
+    # Each registry re-indexes the whole batch at once instead of once per lease.
+    for registry, batch in batches.values():
+        registry.refresh_many(batch)
+    metrics.increment("lease.renewed", renewed)
+    logger.info("Renewed %s leases by %s months.", renewed, months, extra={"leases": renewed, "months": months})
+    return Event(opened=False, text=f"Renewed {renewed} leases by {months} months.")
@@ -0,0 +1,134 @@
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the stdlib arrays are walked directly instead
+    np = None
+
+
+def round_cents(value: float) -> float:
+    return round(value * 100) / 100
+
+
+class PortfolioColumns:
+    fields = ("price", "size", "is_occupied")
+
+    def __init__(self):
+        self.property_ids: list[str] = []
+        self._rows: dict[str, int] = {}
+        self.price = array('d')
+        self.size = array('d')
+        self.is_occupied = array('b')
+        self.type_code = array('H')
+        self.types: list[type] = []
+        self._type_codes: dict[type, int] = {}
+
+    def __len__(self):
+        return len(self.property_ids)
+
+    def _code(self, property_type: type) -> int:
+        code = self._type_codes.get(property_type)
+        if code is None:
+            code = self._type_codes[property_type] = len(self.types)
+            self.types.append(property_type)
+        return code
+
+    def _codes_for(self, property_type: type) -> set[int]:
+        return {code for cls, code in self._type_codes.items() if issubclass(cls, property_type)}
+
+    def append(self, property) -> None:
+        # Convert first so a bad value fails before any column has grown.
+        price, size, occupied = float(property.price), float(property.size), bool(property.is_occupied)
+        code = self._code(type(property))
+        self._rows[property.property_id] = len(self.property_ids)
+        self.property_ids.append(property.property_id)
+        self.price.append(price)
+        self.size.append(size)
+        self.is_occupied.append(occupied)
+        self.type_code.append(code)
+
+    def extend(self, properties) -> None:
+        for property in properties:
+            self.append(property)
+
+    def remove(self, property_id: str) -> None:
+        row = self._rows.pop(property_id)
+        last = len(self.property_ids) - 1
+        for column in (self.property_ids, self.price, self.size, self.is_occupied, self.type_code):
+            column[row] = column[last]
+            column.pop()
+        if row != last:
+            self._rows[self.property_ids[row]] = row
+
+    def update(self, property_id: str, field: str, value) -> None:
+        getattr(self, field)[self._rows[property_id]] = value
+
+    def _view(self, field: str):
+        # Zero-copy, so it pins the array's buffer: only use it inside a method, never hand it out.
+        values = getattr(self, field)
+        return np.frombuffer(values, dtype=values.typecode) if np is not None and len(values) else values
+
+    def column(self, field: str):
+        values = getattr(self, field)
+        return np.array(values, dtype=values.typecode) if np is not None and len(values) else values[:]
+
+    def _matching_rows(self, property_type: type = None, occupied: bool = None, min_price: float = None,
+                       max_price: float = None):
+        codes = self._codes_for(property_type) if property_type is not None else None
+        if np is not None and len(self):
+            mask = np.ones(len(self), dtype=bool)
+            if codes is not None:
+                mask &= np.isin(self._view("type_code"), list(codes))
+            if occupied is not None:
+                mask &= self._view("is_occupied").astype(bool) == occupied
+            if min_price is not None:
+                mask &= self._view("price") >= min_price
+            if max_price is not None:
+                mask &= self._view("price") <= max_price
+            return np.flatnonzero(mask).tolist()
+        return [row for row in range(len(self))
+                if (codes is None or self.type_code[row] in codes)
+                and (occupied is None or bool(self.is_occupied[row]) == occupied)
+                and (min_price is None or self.price[row] >= min_price)
+                and (max_price is None or self.price[row] <= max_price)]
+
+    def select(self, property_type: type = None, occupied: bool = None, min_price: float = None,
+               max_price: float = None) -> list[str]:
+        rows = self._matching_rows(property_type, occupied, min_price, max_price)
+        return [self.property_ids[row] for row in rows]
+
+    def scale_prices(self, factor: float, property_type: type = None) -> list[tuple[str, float]]:
+        rows = self._matching_rows(property_type)
+        if np is not None and rows:
+            prices = self._view("price")
+            index = np.asarray(rows)
+            prices[index] = np.rint(prices[index] * factor * 100) / 100
+        else:
+            for row in rows:
+                self.price[row] = round_cents(self.price[row] * factor)
+        return [(self.property_ids[row], self.price[row]) for row in rows]
+
+    def aggregate(self) -> dict[str, tuple[int, int, float, float]]:
+        if np is not None and len(self):
+            codes = self._view("type_code")
+            occupied = self._view("is_occupied").astype(bool)
+            prices = self._view("price")
+            size = len(self.types)
+            units = np.bincount(codes, minlength=size)
+            occupied_units = np.bincount(codes, weights=occupied, minlength=size)
+            rent = np.bincount(codes, weights=prices, minlength=size)
+            vacant_rent = np.bincount(codes, weights=np.where(occupied, 0.0, prices), minlength=size)
+            rows = zip(units.tolist(), occupied_units.tolist(), rent.tolist(), vacant_rent.tolist())
+        else:
+            totals = [[0, 0, 0.0, 0.0] for _ in self.types]
+            for code, occupied, price in zip(self.type_code, self.is_occupied, self.price):
+                entry = totals[code]
+                entry[0] += 1
+                entry[2] += price
+                if occupied:
+                    entry[1] += 1
+                else:
+                    entry[3] += price
+            rows = totals
+        return {self.types[code].__name__: (int(units), int(occupied), rent, vacant)
+                for code, (units, occupied, rent, vacant) in enumerate(rows) if units}
@@ -0,0 +1,426 @@
+from bisect import bisect_left, bisect_right
+from heapq import heappush, heapreplace
+from math import asin, cos, dist, floor, pi, radians, sin, sqrt
+from random import random
+
+
+class SortedIndex:
+    def __init__(self):
+        self._keys: list = []
+        self._ids: list = []
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def add(self, item_id, key) -> None:
+        position = bisect_right(self._keys, key)
+        self._keys.insert(position, key)
+        self._ids.insert(position, item_id)
+
+    def add_many(self, entries) -> None:
+        entries = sorted([*zip(self._keys, self._ids), *entries], key=lambda entry: entry[0])
+        self._keys = [key for key, _ in entries]
+        self._ids = [item_id for _, item_id in entries]
+
+    def remove(self, item_id, key) -> None:
+        start = bisect_left(self._keys, key)
+        end = bisect_right(self._keys, key, start)
+        position = self._ids.index(item_id, start, end)
+        del self._keys[position]
+        del self._ids[position]
+
+    def _bounds(self, low, high) -> tuple[int, int]:
+        return bisect_left(self._keys, low), bisect_right(self._keys, high)
+
+    def count(self, low, high) -> int:
+        start, end = self._bounds(low, high)
+        return max(end - start, 0)
+
+    def range(self, low, high) -> list:
+        start, end = self._bounds(low, high)
+        return self._ids[start:end]
+
+    def iter_range(self, low, high):
+        start, end = self._bounds(low, high)
+        ids = self._ids
+        return (ids[position] for position in range(start, end))
+
+    def first(self, count: int) -> list:
+        return self._ids[:count]
+
+    def key_at(self, position: int):
+        return self._keys[position]
+
+
+class AddressIndex:
+    gram_size = 3
+
+    def __init__(self):
+        self._postings: dict[str, dict[str, None]] = {}
+        self._deferred: list = []
+
+    def defer(self, entries) -> None:
+        self._deferred.append(entries)
+
+    def _drain(self) -> None:
+        deferred, self._deferred = self._deferred, []
+        for entries in deferred:
+            for property_id, address in entries:
+                self.add(property_id, address)
+
+    def _grams(self, text: str) -> set[str]:
+        # Only full-size grams are posted; an address shorter than a gram is posted as a whole.
+        size = self.gram_size
+        if len(text) < size:
+            return {text} if text else set()
+        return {text[start:start + size] for start in range(len(text) - size + 1)}
+
+    def add(self, property_id: str, address: str) -> None:
+        if self._deferred:
+            self._drain()
+        for gram in self._grams(address.lower()):
+            self._postings.setdefault(gram, {})[property_id] = None
+
+    def remove(self, property_id: str, address: str) -> None:
+        if self._deferred:
+            self._drain()
+        for gram in self._grams(address.lower()):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.pop(property_id, None)
+                if not posting:
+                    del self._postings[gram]
+
+    def _query_grams(self, location: str) -> set[str]:
+        if len(location) <= self.gram_size:
+            return {location}
+        size = self.gram_size
+        return {location[start:start + size] for start in range(len(location) - size + 1)}
+
+    def _short_postings(self, location: str) -> list[dict[str, None]]:
+        # A query shorter than a gram matches every posted gram that contains it; the gram
+        # keys are few compared to the units, so scanning them is cheap.
+        return [posting for gram, posting in self._postings.items() if location in gram]
+
+    def count(self, location: str) -> int:
+        if self._deferred:
+            self._drain()
+        location = location.lower()
+        if len(location) < self.gram_size:
+            return sum(map(len, self._short_postings(location)))
+        return min(len(self._postings.get(gram, ())) for gram in self._query_grams(location))
+
+    def candidates(self, location: str) -> list[str]:
+        return list(self.iter_candidates(location))
+
+    def iter_candidates(self, location: str):
+        if self._deferred:
+            self._drain()
+        location = location.lower()
+        if len(location) < self.gram_size:
+            matches: dict[str, None] = {}
+            for posting in self._short_postings(location):
+                matches.update(posting)
+            return iter(matches)
+        postings = sorted((self._postings.get(gram, {}) for gram in self._query_grams(location)), key=len)
+        smallest, rest = postings[0], postings[1:]
+        return (property_id for property_id in smallest if all(property_id in posting for posting in rest))
+
+    def is_exact(self, location: str) -> bool:
+        return len(location) <= self.gram_size
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = radians(lat1), radians(lat2)
+    a = sin((phi2 - phi1) / 2) ** 2 + cos(phi1) * cos(phi2) * sin(radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a)))
+
+
+def _unit_vector(latitude: float, longitude: float) -> tuple[float, float, float]:
+    phi, lam = radians(latitude), radians(longitude)
+    return cos(phi) * cos(lam), cos(phi) * sin(lam), sin(phi)
+
+
+class SpatialIndex:
+    # Points live on the unit sphere and are bucketed into a 3D grid, so chord
+    # length orders candidates exactly like great-circle distance.
+    def __init__(self, cell_km: float = 5.0):
+        self._cell = cell_km / EARTH_RADIUS_KM
+        self._cells: dict[tuple[int, int, int], dict[str, tuple[float, float, float]]] = {}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _key(self, point: tuple[float, float, float]) -> tuple[int, int, int]:
+        return tuple(floor(axis / self._cell) for axis in point)
+
+    def add(self, property_id: str, latitude: float, longitude: float) -> None:
+        point = _unit_vector(latitude, longitude)
+        cell = self._cells.setdefault(self._key(point), {})
+        if property_id not in cell:
+            self._size += 1
+        cell[property_id] = point
+
+    def remove(self, property_id: str, latitude: float, longitude: float) -> None:
+        key = self._key(_unit_vector(latitude, longitude))
+        cell = self._cells.get(key)
+        if cell is not None and cell.pop(property_id, None) is not None:
+            self._size -= 1
+            if not cell:
+                del self._cells[key]
+
+    def _ring(self, center: tuple[int, int, int], radius: int):
+        cx, cy, cz = center
+        span = range(-radius, radius + 1)
+        for dx in span:
+            for dy in span:
+                if abs(dx) == radius or abs(dy) == radius:
+                    depths = span
+                else:
+                    depths = (-radius, radius) if radius else (0,)
+                for dz in depths:
+                    cell = self._cells.get((cx + dx, cy + dy, cz + dz))
+                    if cell:
+                        yield cell
+
+    def nearest(self, latitude: float, longitude: float, k: int = 1, max_km: float = None) -> list[tuple[float, str]]:
+        if k <= 0 or not self._size:
+            return []
+        origin = _unit_vector(latitude, longitude)
+        center = self._key(origin)
+        limit = 2.0 if max_km is None else 2 * sin(min(max_km / EARTH_RADIUS_KM, pi) / 2)
+        best: list[tuple[float, str]] = []
+
+        def consider(cell):
+            for property_id, point in cell.items():
+                chord = dist(origin, point)
+                if chord > limit:
+                    continue
+                if len(best) < k:
+                    heappush(best, (-chord, property_id))
+                elif chord < -best[0][0]:
+                    heapreplace(best, (-chord, property_id))
+
+        radius = 0
+        while True:
+            if (2 * radius + 1) ** 3 > len(self._cells):
+                for key, cell in self._cells.items():
+                    if max(abs(a - b) for a, b in zip(key, center)) >= radius:
+                        consider(cell)
+                break
+            for cell in self._ring(center, radius):
+                consider(cell)
+            bound = radius * self._cell
+            if bound > limit or (len(best) == k and -best[0][0] <= bound):
+                break
+            radius += 1
+        return [(2 * EARTH_RADIUS_KM * asin(min(1.0, -chord / 2)), property_id)
+                for chord, property_id in sorted(best, reverse=True)]
+
+
+class _IntervalNode:
+    __slots__ = ("key", "end", "item", "priority", "left", "right", "max_end")
+
+    def __init__(self, key, end, item):
+        self.key = key
+        self.end = end
+        self.item = item
+        self.priority = random()
+        self.left = None
+        self.right = None
+        self.max_end = end
+
+    def update(self) -> '_IntervalNode':
+        self.max_end = self.end
+        for child in (self.left, self.right):
+            if child is not None and child.max_end > self.max_end:
+                self.max_end = child.max_end
+        return self
+
+
+class IntervalTree:
+    # A treap ordered by (start, sequence) and augmented with the largest end in
+    # each subtree, so overlap queries skip subtrees that finish too early.
+    def __init__(self):
+        self._root = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _insert(self, node, new):
+        if node is None:
+            return new
+        if new.key < node.key:
+            node.left = self._insert(node.left, new)
+            if node.left.priority > node.priority:
+                top, node.left = node.left, node.left.right
+                top.right = node.update()
+                return top.update()
+        else:
+            node.right = self._insert(node.right, new)
+            if node.right.priority > node.priority:
+                top, node.right = node.right, node.right.left
+                top.left = node.update()
+                return top.update()
+        return node.update()
+
+    def _merge(self, left, right):
+        if left is None or right is None:
+            return left or right
+        if left.priority > right.priority:
+            left.right = self._merge(left.right, right)
+            return left.update()
+        right.left = self._merge(left, right.left)
+        return right.update()
+
+    def _delete(self, node, key):
+        if node is None:
+            raise KeyError(key)
+        if key == node.key:
+            return self._merge(node.left, node.right)
+        if key < node.key:
+            node.left = self._delete(node.left, key)
+        else:
+            node.right = self._delete(node.right, key)
+        return node.update()
+
+    def add(self, start, sequence: int, end, item) -> None:
+        self._root = self._insert(self._root, _IntervalNode((start, sequence), end, item))
+        self._size += 1
+
+    def remove(self, start, sequence: int) -> None:
+        self._root = self._delete(self._root, (start, sequence))
+        self._size -= 1
+
+    def _collect(self, node, low, high, inclusive: bool, found: list) -> None:
+        if node is None or node.max_end <= low:
+            return
+        self._collect(node.left, low, high, inclusive, found)
+        start = node.key[0]
+        if start < high or (inclusive and start == high):
+            if node.end > low:
+                found.append(node.item)
+            self._collect(node.right, low, high, inclusive, found)
+
+    def overlapping(self, low, high) -> list:
+        found = []
+        self._collect(self._root, low, high, False, found)
+        return found
+
+    def containing(self, point) -> list:
+        found = []
+        self._collect(self._root, point, point, True, found)
+        return found
+
+
+class PrefixSums:
+    # A Fenwick tree over day positions (dates by ordinal, integers as they are), so an
+    # update or a range total is O(log n) whatever order the keys arrive in. The covered
+    # span doubles when a key falls outside it, which keeps growth amortised O(1).
+    def __init__(self):
+        self._base: int = None
+        self._values: list = []
+        self._tree: list = [0]
+
+    @staticmethod
+    def _position(key) -> int:
+        return key.toordinal() if hasattr(key, "toordinal") else key
+
+    def _grow(self, position: int) -> None:
+        if self._base is None:
+            self._base, self._values = position, [0]
+        else:
+            size = len(self._values)
+            low, high = min(self._base, position), max(self._base + size - 1, position)
+            span = max(2 * size, high - low + 1)
+            if position < self._base:
+                padding = span - size
+                self._base -= padding
+                self._values = [0] * padding + self._values
+            else:
+                self._values += [0] * (span - size)
+        tree = [0, *self._values]
+        for index in range(1, len(tree)):
+            parent = index + (index & -index)
+            if parent < len(tree):
+                tree[parent] += tree[index]
+        self._tree = tree
+
+    def add(self, key, amount) -> None:
+        position = self._position(key)
+        if self._base is None or not self._base <= position < self._base + len(self._values):
+            self._grow(position)
+        index = position - self._base
+        self._values[index] += amount
+        tree, index = self._tree, index + 1
+        while index < len(tree):
+            tree[index] += amount
+            index += index & -index
+
+    def _prefix(self, count: int):
+        tree, total = self._tree, 0
+        while count > 0:
+            total += tree[count]
+            count -= count & -count
+        return total
+
+    def total(self, low, high):
+        if self._base is None:
+            return 0
+        start = max(self._position(low) - self._base, 0)
+        end = min(self._position(high) - self._base + 1, len(self._values))
+        return self._prefix(end) - self._prefix(start) if end > start else 0
+
+
+class MembershipIndex:
+    # Item ids per holder plus the reverse map; dicts keep insertion order and give
+    # O(1) assignment, removal and membership checks on both sides.
+    def __init__(self):
+        self._members: dict = {}
+        self._holders: dict = {}
+
+    def __len__(self):
+        return len(self._members)
+
+    def add(self, holder, item_id) -> bool:
+        members = self._members.setdefault(holder, {})
+        if item_id in members:
+            return False
+        members[item_id] = None
+        self._holders.setdefault(item_id, {})[holder] = None
+        return True
+
+    def remove(self, holder, item_id) -> bool:
+        members = self._members.get(holder)
+        if members is None or item_id not in members:
+            return False
+        del members[item_id]
+        holders = self._holders[item_id]
+        del holders[holder]
+        if not holders:
+            del self._holders[item_id]
+        return True
+
+    def contains(self, holder, item_id) -> bool:
+        return item_id in self._members.get(holder, ())
+
+    def count(self, holder) -> int:
+        return len(self._members.get(holder, ()))
+
+    def members(self, holder):
+        return self._members.get(holder, {}).keys()
+
+    def holders(self, item_id):
+        return self._holders.get(item_id, {}).keys()
+
+    def filter(self, holder, item_ids) -> list:
+        members = self._members.get(holder, {})
+        return [item_id for item_id in item_ids if item_id in members]
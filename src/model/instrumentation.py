@@ -0,0 +1,106 @@
+import json
+import threading
+from functools import wraps
+from time import perf_counter
+
+# Latency buckets are powers of two in microseconds: bucket b holds observations below 2**b us.
+_BUCKETS = 32
+
+
+class Histogram:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.buckets = [0] * _BUCKETS
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.buckets[min(int(seconds * 1e6).bit_length(), _BUCKETS - 1)] += 1
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket, hits in enumerate(self.buckets):
+            seen += hits
+            if hits and seen >= rank:
+                return min(max(2 ** bucket / 1e6, self.min), self.max)
+        return self.max
+
+    def as_dict(self) -> dict:
+        return {"count": self.count, "total": self.total, "mean": self.mean,
+                "min": self.min if self.count else 0.0, "max": self.max,
+                "p50": self.percentile(50), "p95": self.percentile(95), "p99": self.percentile(99),
+                "buckets_us": {2 ** bucket: hits for bucket, hits in enumerate(self.buckets) if hits}}
+
+
+class Instrumentation:
+    def __init__(self):
+        self.enabled = False
+        self.counters: dict[str, int] = {}
+        self.histograms: dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"enabled": self.enabled, "counters": dict(self.counters),
+                    "latency": {name: histogram.as_dict() for name, histogram in sorted(self.histograms.items())}}
+
+    def export(self, path: str) -> None:
+        with open(path, "w") as handle:
+            json.dump(self.snapshot(), handle, indent=2)
+
+
+metrics = Instrumentation()
+
+
+def timed(name: str):
+    def decorate(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            # Disabled mode costs one attribute check on top of the call.
+            if not metrics.enabled:
+                return function(*args, **kwargs)
+            started = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            except Exception:
+                metrics.increment(f"{name}.errors")
+                raise
+            finally:
+                metrics.observe(name, perf_counter() - started)
+        return wrapper
+    return decorate
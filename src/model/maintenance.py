@@ -1,5 +1,14 @@
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+from array import array
 from datetime import date
+from itertools import islice
+from math import ceil
 
+from src.model.indexes import PrefixSums, SortedIndex
 from src.model.property import Property
 
 
@@ -11,28 +20,148 @@ class Event:
     pass
 
 
+class _SpilledSegment:
+    _header = struct.Struct("<?I")
+
+    def __init__(self, spill_dir: str, events: list[Event]):
+        # mkstemp gives every segment its own file, even when several logs share a spill_dir.
+        descriptor, self.path = tempfile.mkstemp(prefix="events-", suffix=".seg", dir=spill_dir)
+        self._offsets = array('Q')
+        with os.fdopen(descriptor, "wb") as handle:
+            position = 0
+            for event in events:
+                text = event.text.encode("utf-8")
+                self._offsets.append(position)
+                handle.write(self._header.pack(event.opened, len(text)))
+                handle.write(text)
+                position += self._header.size + len(text)
+        with open(self.path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def iter_from(self, index: int):
+        header = self._header
+        for position in self._offsets[index:]:
+            opened, length = header.unpack_from(self._map, position)
+            start = position + header.size
+            yield Event(opened, self._map[start:start + length].decode("utf-8"))
+
+    def close(self) -> None:
+        self._map.close()
+        os.remove(self.path)
+
+
 class EventLog:
-    def __init__(self, events: list[Event]):
-        self.events = events
+    def __init__(self, events: list[Event], segment_size: int = 1024, spill_dir: str = None,
+                 max_memory_segments: int = 4, retention_segments: int = None):
+        if retention_segments is not None and retention_segments < 1:
+            raise ValueError(f"retention_segments must be at least 1, got {retention_segments}.")
+        self.segment_size = segment_size
+        self.spill_dir = spill_dir
+        self.max_memory_segments = max_memory_segments
+        self.retention_segments = retention_segments
+        self._segments: list = [[]]
+        self._offset = 0
+        self._length = 0
+        self._cursors: dict[str, int] = {}
+        for event in events:
+            self.record_event(event)
+
+    def __len__(self):
+        return self._length - self._offset
+
+    @property
+    def events(self) -> tuple[Event, ...]:
+        # A snapshot, so appending to it raises instead of silently dropping the event; use record_event.
+        return tuple(self.iter_events())
 
     def record_event(self, event: Event):
-        self.events.append(event)
+        tail = self._segments[-1]
+        tail.append(event)
+        self._length += 1
+        if len(tail) == self.segment_size:
+            self._segments.append([])
+            self._spill()
+            self._retain()
+
+    def _spill(self) -> None:
+        if self.spill_dir is None:
+            return
+        in_memory = [index for index, segment in enumerate(self._segments[:-1]) if isinstance(segment, list)]
+        for index in in_memory[:max(len(in_memory) - self.max_memory_segments, 0)]:
+            self._segments[index] = _SpilledSegment(self.spill_dir, self._segments[index])
 
-    def read_new_messages(self):
-        new_messages = [event.text for event in self.events if event.opened]
+    def _retain(self) -> None:
+        if self.retention_segments is None:
+            return
+        while len(self._segments) > self.retention_segments:
+            segment = self._segments.pop(0)
+            if isinstance(segment, _SpilledSegment):
+                segment.close()
+            self._offset += self.segment_size
+
+    def iter_events(self, start: int = 0):
+        start = max(start, self._offset) - self._offset
+        first, skip = divmod(start, self.segment_size)
+        for segment in self._segments[first:]:
+            if isinstance(segment, _SpilledSegment):
+                yield from segment.iter_from(skip)
+            else:
+                yield from islice(segment, skip, None)
+            skip = 0
+
+    def iter_new_events(self, consumer: str = "default"):
+        start = self._cursors.get(consumer, 0)
+        end = self._length
+        self._cursors[consumer] = end
+        return islice(self.iter_events(start), max(end - max(start, self._offset), 0))
+
+    def read_new_messages(self, consumer: str = "default"):
+        new_messages = [event.text for event in self.iter_new_events(consumer) if event.opened]
         return new_messages
 
     def read_all_messages(self):
-        all_messages = [event.text for event in self.events]
+        all_messages = [event.text for event in self.iter_events()]
         return all_messages
 
+    def close(self) -> None:
+        for segment in self._segments:
+            if isinstance(segment, _SpilledSegment):
+                segment.close()
+        self._segments = [[]]
+        self._offset = self._length
+
 
 class MaintenanceRequest:
-    def __init__(self, request_id: int, property: Property, request_date: date, status: str):
+    def __init__(self, request_id: int, property: Property, request_date: date, status: str, urgency: int = 0):
+        self._queues = ()
         self.request_id = request_id
         self.property = property
         self.request_date = request_date
-        self.status = status
+        self._status = status
+        self._urgency = urgency
+
+    @property
+    def status(self) -> str:
+        return self._status
+
+    @status.setter
+    def status(self, value: str) -> None:
+        self._status = value
+        for queue in self._queues:
+            queue.refresh(self)
+
+    @property
+    def urgency(self) -> int:
+        return self._urgency
+
+    @urgency.setter
+    def urgency(self, value: int) -> None:
+        self._urgency = value
+        for queue in self._queues:
+            queue.refresh(self)
 
     def approve_request(self, status: str):
         self.status = status
@@ -48,15 +177,320 @@ class MaintenanceRequest:
         return Event(True, self.status + "Request resolved successfully.")
 
 
+OPEN_STATUSES = ("Pending", "Approved")
+
+
+class MaintenanceQueue:
+    def __init__(self, requests: list[MaintenanceRequest] = None):
+        self._requests: dict[int, MaintenanceRequest] = {}
+        self._indexed: dict[int, tuple] = {}
+        self._by_status: dict[str, dict[int, None]] = {}
+        self._by_property: dict[object, dict[str, dict[int, None]]] = {}
+        # Request dates per status, plus None for every open request, for "oldest" and SLA ages.
+        self._dates: dict[str, SortedIndex] = {}
+        # Priority heaps per status; superseded entries are skipped lazily and compacted when they pile up.
+        self._heaps: dict[str, list] = {}
+        self._entries: dict[int, int] = {}
+        self._sequence = 0
+        if requests:
+            self.add_many(requests)
+
+    def __len__(self):
+        return len(self._requests)
+
+    def get(self, request_id: int) -> MaintenanceRequest:
+        return self._requests.get(request_id)
+
+    def _property_key(self, request: MaintenanceRequest):
+        return getattr(request.property, "property_id", request.property)
+
+    def _entry(self, request: MaintenanceRequest) -> tuple:
+        self._sequence += 1
+        self._entries[request.request_id] = self._sequence
+        return -request.urgency, request.request_date, self._sequence, request.request_id
+
+    def _index(self, request: MaintenanceRequest, bulk: list = None) -> None:
+        request_id, status = request.request_id, request.status
+        property_key = self._property_key(request)
+        self._indexed[request_id] = (status, property_key, request.request_date)
+        self._by_status.setdefault(status, {})[request_id] = None
+        self._by_property.setdefault(property_key, {}).setdefault(status, {})[request_id] = None
+        for key in (status, None) if status in OPEN_STATUSES else (status,):
+            if bulk is None:
+                self._dates.setdefault(key, SortedIndex()).add(request_id, request.request_date)
+            else:
+                bulk.append((key, request.request_date, request_id))
+        heap = self._heaps.setdefault(status, [])
+        if bulk is None:
+            heapq.heappush(heap, self._entry(request))
+            if len(heap) > 2 * len(self._by_status[status]) + 64:
+                self._compact(status)
+        else:
+            heap.append(self._entry(request))
+
+    def _unindex(self, request_id: int) -> None:
+        status, property_key, request_date = self._indexed.pop(request_id)
+        del self._by_status[status][request_id]
+        statuses = self._by_property[property_key]
+        del statuses[status][request_id]
+        if not statuses[status]:
+            del statuses[status]
+            if not statuses:
+                del self._by_property[property_key]
+        for key in (status, None) if status in OPEN_STATUSES else (status,):
+            self._dates[key].remove(request_id, request_date)
+        del self._entries[request_id]
+
+    def _compact(self, status: str) -> None:
+        heap = self._heaps[status]
+        self._heaps[status] = [entry for entry in heap if self._entries.get(entry[3]) == entry[2]]
+        heapq.heapify(self._heaps[status])
+
+    def add(self, request: MaintenanceRequest) -> bool:
+        if request.request_id in self._requests:
+            return False
+        self._requests[request.request_id] = request
+        request._queues += (self,)
+        self._index(request)
+        return True
+
+    def add_many(self, requests) -> int:
+        bulk, added = [], 0
+        for request in requests:
+            if request.request_id in self._requests:
+                continue
+            self._requests[request.request_id] = request
+            request._queues += (self,)
+            self._index(request, bulk)
+            added += 1
+        grouped: dict = {}
+        for key, request_date, request_id in bulk:
+            grouped.setdefault(key, []).append((request_date, request_id))
+        for key, entries in grouped.items():
+            self._dates.setdefault(key, SortedIndex()).add_many(entries)
+        for heap in self._heaps.values():
+            heapq.heapify(heap)
+        return added
+
+    def remove(self, request: MaintenanceRequest) -> None:
+        if self._requests.get(request.request_id) is request:
+            del self._requests[request.request_id]
+            request._queues = tuple(queue for queue in request._queues if queue is not self)
+            self._unindex(request.request_id)
+
+    def refresh(self, request: MaintenanceRequest) -> None:
+        if self._requests.get(request.request_id) is request:
+            self._unindex(request.request_id)
+            self._index(request)
+
+    def with_status(self, status: str) -> list[MaintenanceRequest]:
+        return [self._requests[request_id] for request_id in self._by_status.get(status, ())]
+
+    def for_property(self, property: Property, status: str = None) -> list[MaintenanceRequest]:
+        statuses = self._by_property.get(getattr(property, "property_id", property), {})
+        buckets = [statuses.get(status, {})] if status is not None else statuses.values()
+        return [self._requests[request_id] for bucket in buckets for request_id in bucket]
+
+    def top(self, count: int = 10, status: str = "Pending") -> list[MaintenanceRequest]:
+        heap = self._heaps.get(status, [])
+        taken = []
+        while heap and len(taken) < count:
+            entry = heapq.heappop(heap)
+            if self._entries.get(entry[3]) == entry[2]:
+                taken.append(entry)
+        for entry in taken:
+            heapq.heappush(heap, entry)
+        return [self._requests[entry[3]] for entry in taken]
+
+    def oldest(self, count: int = 10, status: str = None) -> list[MaintenanceRequest]:
+        dates = self._dates.get(status)
+        return [self._requests[request_id] for request_id in dates.first(count)] if dates is not None else []
+
+    def _resolve_all(self, requests) -> list[MaintenanceRequest]:
+        return [self._requests.get(request) if isinstance(request, int) else request for request in requests]
+
+    def approve_requests(self, requests) -> tuple[list[Event], list]:
+        events, failed = [], []
+        for request in self._resolve_all(requests):
+            if request is None or request.status != "Pending":
+                failed.append(request)
+            else:
+                events.append(request.approve_request(request.status))
+        return events, failed
+
+    def resolve_requests(self, requests) -> tuple[list[Event], list]:
+        events, failed = [], []
+        for request in self._resolve_all(requests):
+            if request is None or request.status != "Approved":
+                failed.append(request)
+            else:
+                events.append(request.resolve_request())
+        return events, failed
+
+    def age_percentiles(self, percentiles=(50, 90, 99), today: date = None, status: str = None) -> dict:
+        today = today or date.today()
+        dates = self._dates.get(status)
+        size = len(dates) if dates is not None else 0
+        if not size:
+            return {percentile: None for percentile in percentiles}
+        # Ages ascend as request dates descend, so the nearest-rank age is read straight off the date index.
+        return {percentile: (today - dates.key_at(size - max(1, ceil(percentile / 100 * size)))).days
+                for percentile in percentiles}
+
+    def overdue(self, days: int, today: date = None, status: str = None) -> list[MaintenanceRequest]:
+        today = today or date.today()
+        dates = self._dates.get(status)
+        if dates is None or not len(dates):
+            return []
+        cutoff = date.fromordinal(today.toordinal() - days - 1)
+        return [self._requests[request_id] for request_id in dates.range(dates.key_at(0), cutoff)]
+
+
 class Renovation:
     def __init__(self, renovation_id: int, property: Property, dates: date, cost: float, description: str):
+        self._ledgers = ()
         self.renovation_id = renovation_id
         self.property = property
-        self.date = dates
-        self.cost = cost
+        self._date = dates
+        self._cost = cost
         self.description = description
 
+    @property
+    def date(self) -> date:
+        return self._date
+
+    @date.setter
+    def date(self, value: date) -> None:
+        self._date = value
+        for ledger in self._ledgers:
+            ledger.refresh(self)
+
+    @property
+    def cost(self) -> float:
+        return self._cost
+
+    @cost.setter
+    def cost(self, value: float) -> None:
+        self._cost = value
+        for ledger in self._ledgers:
+            ledger.refresh(self)
+
     def get_total_cost(self):
         return self.cost
 
 
+def quarter_of(moment: date) -> tuple[int, int]:
+    return moment.year, (moment.month - 1) // 3 + 1
+
+
+class RenovationLedger:
+    def __init__(self, renovations: list[Renovation] = None):
+        self._renovations: dict[int, Renovation] = {}
+        self._indexed: dict[int, tuple] = {}
+        self._by_property: dict[object, dict[int, None]] = {}
+        self._property_totals: dict[object, list] = {}
+        self._type_totals: dict[str, list] = {}
+        self._quarter_totals: dict[tuple[int, int], list] = {}
+        self._type_quarter_totals: dict[tuple[str, tuple[int, int]], list] = {}
+        self._spend = PrefixSums()
+        self._total = 0.0
+        if renovations:
+            self.add_many(renovations)
+
+    def __len__(self):
+        return len(self._renovations)
+
+    def get(self, renovation_id: int) -> Renovation:
+        return self._renovations.get(renovation_id)
+
+    def _property_key(self, property):
+        return getattr(property, "property_id", property)
+
+    def _book(self, property_key, type_name: str, quarter, when: date, cost: float, count: int) -> None:
+        # Each bucket keeps [renovations, cost] so it can be dropped once its last renovation leaves.
+        for totals, key in ((self._property_totals, property_key), (self._type_totals, type_name),
+                            (self._quarter_totals, quarter), (self._type_quarter_totals, (type_name, quarter))):
+            bucket = totals.get(key)
+            if bucket is None:
+                bucket = totals[key] = [0, 0.0]
+            bucket[0] += count
+            bucket[1] += cost
+            if not bucket[0]:
+                del totals[key]
+        if when is not None:
+            self._spend.add(when, cost)
+        self._total += cost
+
+    def _index(self, renovation: Renovation) -> None:
+        property_key = self._property_key(renovation.property)
+        type_name = type(renovation.property).__name__
+        quarter = quarter_of(renovation.date) if renovation.date is not None else None
+        self._indexed[renovation.renovation_id] = (property_key, type_name, quarter, renovation.date, renovation.cost)
+        self._by_property.setdefault(property_key, {})[renovation.renovation_id] = None
+        self._book(property_key, type_name, quarter, renovation.date, renovation.cost, 1)
+
+    def _unindex(self, renovation_id: int) -> None:
+        property_key, type_name, quarter, when, cost = self._indexed.pop(renovation_id)
+        renovations = self._by_property[property_key]
+        del renovations[renovation_id]
+        if not renovations:
+            del self._by_property[property_key]
+        self._book(property_key, type_name, quarter, when, -cost, -1)
+
+    def add(self, renovation: Renovation) -> bool:
+        if renovation.renovation_id in self._renovations:
+            return False
+        self._renovations[renovation.renovation_id] = renovation
+        renovation._ledgers += (self,)
+        self._index(renovation)
+        return True
+
+    def add_many(self, renovations) -> int:
+        return sum(self.add(renovation) for renovation in renovations)
+
+    def remove(self, renovation: Renovation) -> None:
+        if self._renovations.get(renovation.renovation_id) is renovation:
+            del self._renovations[renovation.renovation_id]
+            renovation._ledgers = tuple(ledger for ledger in renovation._ledgers if ledger is not self)
+            self._unindex(renovation.renovation_id)
+
+    def refresh(self, renovation: Renovation) -> None:
+        if self._renovations.get(renovation.renovation_id) is renovation:
+            self._unindex(renovation.renovation_id)
+            self._index(renovation)
+
+    def for_property(self, property) -> list[Renovation]:
+        return [self._renovations[renovation_id]
+                for renovation_id in self._by_property.get(self._property_key(property), ())]
+
+    def property_cost(self, property) -> float:
+        return self._property_totals.get(self._property_key(property), (0, 0.0))[1]
+
+    def property_costs(self) -> dict:
+        return {property_key: cost for property_key, (_, cost) in self._property_totals.items()}
+
+    def type_cost(self, type_name: str) -> float:
+        return self._type_totals.get(type_name, (0, 0.0))[1]
+
+    def type_costs(self) -> dict[str, float]:
+        return {type_name: cost for type_name, (_, cost) in self._type_totals.items()}
+
+    def quarter_cost(self, year: int, quarter: int, type_name: str = None) -> float:
+        if type_name is None:
+            return self._quarter_totals.get((year, quarter), (0, 0.0))[1]
+        return self._type_quarter_totals.get((type_name, (year, quarter)), (0, 0.0))[1]
+
+    def quarterly_costs(self, type_name: str = None) -> dict[tuple[int, int], float]:
+        if type_name is None:
+            totals = {quarter: cost for quarter, (_, cost) in self._quarter_totals.items()}
+        else:
+            totals = {quarter: cost for (name, quarter), (_, cost) in self._type_quarter_totals.items()
+                      if name == type_name}
+        return {quarter: totals[quarter] for quarter in sorted(totals, key=lambda quarter: quarter or (0, 0))}
+
+    def total(self, start: date = None, end: date = None) -> float:
+        if start is None and end is None:
+            return self._total
+        return self._spend.total(start or date.min, end or date.max)
+
+
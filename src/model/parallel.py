@@ -0,0 +1,262 @@
+import multiprocessing
+import struct
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time, timedelta
+from math import ceil, fsum, isfinite
+from operator import itemgetter
+
+from src.model.rentalcompany import MonthlyReport, PortfolioSnapshot, RentalCompany, lease_spans, shift_months
+
+_HEADER = struct.Struct("<II")
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _to_micros(moment) -> int:
+    if not isinstance(moment, datetime):
+        moment = datetime.combine(moment, time())
+    return (moment - _EPOCH) // _MICROSECOND
+
+
+def exact_partials(values) -> list[float]:
+    # Non-overlapping floats whose exact sum equals the exact sum of values, so partial results from
+    # different shards can be merged with fsum without any rounding depending on how the work was split.
+    values = list(values)
+    partials = []
+    while True:
+        residual = fsum(values)
+        if not residual:
+            return partials
+        partials.append(residual)
+        if not isfinite(residual):
+            return partials
+        values.append(-residual)
+
+
+def encode_partition(properties, type_codes: dict[str, int]) -> bytes:
+    prices, starts, ends, rents = array('d'), array('q'), array('q'), array('d')
+    lease_counts, types, occupied = array('I'), array('B'), array('b')
+    # Lease boundaries repeat a lot (month starts), so converted timestamps are memoised per partition.
+    micros: dict = {}
+
+    def to_micros(moment) -> int:
+        value = micros.get(moment)
+        if value is None:
+            value = micros[moment] = _to_micros(moment)
+        return value
+
+    for p in properties:
+        type_name = type(p).__name__
+        code = type_codes.get(type_name)
+        if code is None:
+            code = type_codes[type_name] = len(type_codes)
+        types.append(code)
+        prices.append(p.price)
+        occupied.append(p.is_occupied)
+        leases = [*p.history, p.current_lease] if p.current_lease is not None else p.history
+        count = 0
+        for lease in leases:
+            if getattr(lease, "start_date", None) is None:
+                continue
+            starts.append(to_micros(lease.start_date))
+            ends.append(to_micros(lease.end_date))
+            rents.append(getattr(lease, "monthly_rent", p.price))
+            count += 1
+        lease_counts.append(count)
+    columns = (prices, starts, ends, rents, lease_counts, types, occupied)
+    return _HEADER.pack(len(prices), len(starts)) + b"".join(column.tobytes() for column in columns)
+
+
+def _decode(payload: bytes) -> tuple:
+    units, leases = _HEADER.unpack_from(payload)
+    position = _HEADER.size
+    columns = []
+    for typecode, length in (('d', units), ('q', leases), ('q', leases), ('d', leases), ('I', units), ('B', units),
+                             ('b', units)):
+        column = array(typecode)
+        size = column.itemsize * length
+        column.frombytes(payload[position:position + size])
+        position += size
+        columns.append(column)
+    return columns
+
+
+def analyse_partition(payload: bytes, type_names: tuple, base: int, months: int) -> dict:
+    prices, starts, ends, rents, lease_counts, types, occupied = _decode(payload)
+    type_units, type_occupied = [0] * len(type_names), [0] * len(type_names)
+    type_rent = [[] for _ in type_names]
+    type_vacant = [[] for _ in type_names]
+    occupied_diff = [0] * (months + 1)
+    price_slots = [[] for _ in range(months + 1)]
+    income_slots = [[] for _ in range(months + 1)]
+    month_cache: dict[int, int] = {}
+    shift_cache: dict[tuple, int] = {}
+
+    def month_of(micros: int) -> int:
+        month = month_cache.get(micros)
+        if month is None:
+            moment = _EPOCH + timedelta(microseconds=micros)
+            month = month_cache[micros] = moment.year * 12 + moment.month - 1 - base
+        return month
+
+    def before(micros: int) -> int:
+        return micros - 1
+
+    def shift(micros: int, count: int) -> int:
+        shifted = shift_cache.get((micros, count))
+        if shifted is None:
+            shifted = shift_cache[micros, count] = _to_micros(shift_months(_EPOCH + timedelta(microseconds=micros),
+                                                                          count))
+        return shifted
+
+    position = 0
+    for row, price in enumerate(prices):
+        code = types[row]
+        type_units[code] += 1
+        type_rent[code].append(price)
+        if occupied[row]:
+            type_occupied[code] += 1
+        else:
+            type_vacant[code].append(price)
+        count = lease_counts[row]
+        if count and months > 0:
+            leases = sorted(zip(starts[position:position + count], ends[position:position + count],
+                                rents[position:position + count]), key=itemgetter(0))
+            for first, last, rent in lease_spans(leases, month_of, before, shift, months):
+                occupied_diff[first] += 1
+                occupied_diff[last + 1] -= 1
+                price_slots[first].append(price)
+                price_slots[last + 1].append(-price)
+                income_slots[first].append(rent)
+                income_slots[last + 1].append(-rent)
+        position += count
+    return {
+        "types": {type_names[code]: (type_units[code], type_occupied[code], exact_partials(type_rent[code]),
+                                     exact_partials(type_vacant[code]))
+                  for code in range(len(type_names)) if type_units[code]},
+        "occupied": occupied_diff,
+        "occupied_price": [exact_partials(slot) for slot in price_slots],
+        "income": [exact_partials(slot) for slot in income_slots],
+    }
+
+
+class CompanyReport:
+    def __init__(self, company_name: str, snapshot: PortfolioSnapshot, reports: list[MonthlyReport]):
+        self.company_name = company_name
+        self.snapshot = snapshot
+        self.reports = reports
+
+    def __repr__(self):
+        return f"CompanyReport(company={self.company_name}, snapshot={self.snapshot}, months={len(self.reports)})"
+
+
+def merge_partitions(company_name: str, partials: list[dict], base: int, months: int,
+                     first_report_id: int = 1) -> CompanyReport:
+    types: dict[str, list] = {}
+    occupied = [0] * (months + 1)
+    price_slots = [[] for _ in range(months + 1)]
+    income_slots = [[] for _ in range(months + 1)]
+    for partial in partials:
+        for type_name, (units, occupied_units, rent, vacant_rent) in partial["types"].items():
+            entry = types.setdefault(type_name, [0, 0, [], []])
+            entry[0] += units
+            entry[1] += occupied_units
+            entry[2].extend(rent)
+            entry[3].extend(vacant_rent)
+        for offset in range(months + 1):
+            occupied[offset] += partial["occupied"][offset]
+            price_slots[offset].extend(partial["occupied_price"][offset])
+            income_slots[offset].extend(partial["income"][offset])
+    total_price = [value for entry in types.values() for value in entry[2]]
+    snapshot = PortfolioSnapshot(sum(entry[0] for entry in types.values()), sum(entry[1] for entry in types.values()),
+                                 fsum(total_price), fsum(value for entry in types.values() for value in entry[3]),
+                                 {type_name: PortfolioSnapshot(units, occupied_units, fsum(rent), fsum(vacant_rent))
+                                  for type_name, (units, occupied_units, rent, vacant_rent) in types.items()})
+
+    reports = []
+    running_occupied, running_price, running_income = 0, [], []
+    for offset in range(months):
+        running_occupied += occupied[offset]
+        running_price = exact_partials(running_price + price_slots[offset])
+        running_income = exact_partials(running_income + income_slots[offset])
+        year, month = divmod(base + offset, 12)
+        report = MonthlyReport(first_report_id + offset, month + 1, year)
+        if snapshot.total_units:
+            report.vacancy_percentage = (snapshot.total_units - running_occupied) / snapshot.total_units * 100
+            report.income = fsum(running_income)
+            report.loss_due_to_vacancy = fsum(total_price + [-value for value in running_price])
+        reports.append(report)
+    return CompanyReport(company_name, snapshot, reports)
+
+
+def analyse_slice(rental_company: RentalCompany, start: int, stop: int, base: int, months: int) -> dict:
+    type_codes: dict[str, int] = {}
+    payload = encode_partition(rental_company.properties_list[start:stop], type_codes)
+    return analyse_partition(payload, tuple(type_codes), base, months)
+
+
+_inherited: list = []
+
+
+def _inherit(companies: list) -> None:
+    global _inherited
+    _inherited = companies
+
+
+def _analyse_inherited(position: int, start: int, stop: int, base: int, months: int) -> dict:
+    return analyse_slice(_inherited[position], start, stop, base, months)
+
+
+class ParallelReportRunner:
+    def __init__(self, processes: int = None, partition_size: int = 50_000, executor=None):
+        self.processes = processes
+        self.partition_size = partition_size
+        self.executor = executor
+
+    def slices(self, rental_company: RentalCompany) -> list[tuple[int, int]]:
+        units = len(rental_company)
+        return [(start, min(start + self.partition_size, units))
+                for start in range(0, units, self.partition_size)] or [(0, 0)]
+
+    def run(self, companies, start_year: int, start_month: int, end_year: int, end_month: int,
+            first_report_id: int = 1) -> list[CompanyReport]:
+        base = start_year * 12 + start_month - 1
+        months = max(0, end_year * 12 + end_month - base)
+        companies = list(companies)
+        if self.executor is not None:
+            return self._run_encoded(self.executor, companies, base, months, first_report_id)
+        if self.processes == 1:
+            partials = [[analyse_slice(rental_company, start, stop, base, months)
+                         for start, stop in self.slices(rental_company)] for rental_company in companies]
+            return self._merge(companies, partials, base, months, first_report_id)
+        # Workers get the companies when they start (without pickling under fork) and encode their own
+        # slices, so the parent only hands out row ranges.
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork") if "fork" in methods else None
+        with ProcessPoolExecutor(max_workers=self.processes, mp_context=context, initializer=_inherit,
+                                 initargs=(companies,)) as executor:
+            pending = [[executor.submit(_analyse_inherited, position, start, stop, base, months)
+                        for start, stop in self.slices(rental_company)]
+                       for position, rental_company in enumerate(companies)]
+            partials = [[future.result() for future in futures] for futures in pending]
+        return self._merge(companies, partials, base, months, first_report_id)
+
+    def _run_encoded(self, executor, companies: list[RentalCompany], base: int, months: int,
+                     first_report_id: int) -> list[CompanyReport]:
+        # A caller's executor was started without the companies, so the slices are encoded here and shipped.
+        pending = []
+        for rental_company in companies:
+            futures = []
+            for start, stop in self.slices(rental_company):
+                type_codes: dict[str, int] = {}
+                payload = encode_partition(rental_company.properties_list[start:stop], type_codes)
+                futures.append(executor.submit(analyse_partition, payload, tuple(type_codes), base, months))
+            pending.append(futures)
+        partials = [[future.result() for future in futures] for futures in pending]
+        return self._merge(companies, partials, base, months, first_report_id)
+
+    def _merge(self, companies: list[RentalCompany], partials: list[list[dict]], base: int, months: int,
+               first_report_id: int) -> list[CompanyReport]:
+        return [merge_partitions(rental_company.company_name, company_partials, base, months, first_report_id)
+                for rental_company, company_partials in zip(companies, partials)]
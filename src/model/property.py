@@ -1,56 +1,179 @@
 from datetime import datetime
 from typing import TYPE_CHECKING
 
+from src.model.instrumentation import timed
+
 if TYPE_CHECKING:
     from src.scripts.task2 import LeaseAgreement
 
 
+_FACILITY_BITS: dict[str, int] = {}
+_FACILITY_NAMES: list[str] = []
+
+
+def _facility_bit(name: str) -> int:
+    bit = _FACILITY_BITS.get(name)
+    if bit is None:
+        bit = _FACILITY_BITS[name] = 1 << len(_FACILITY_NAMES)
+        _FACILITY_NAMES.append(name)
+    return bit
+
+
 class Property:
-    def __init__(self, property_id: str, address: str, size: float, price: float, company_name: str):
+    __slots__ = ("_watchers", "property_id", "_address", "_size", "_facilities", "_price", "_history",
+                 "_is_occupied", "current_lease", "_coordinates")
+
+    def __init__(self, property_id: str, address: str, size: float, price: float, company_name: str,
+                 latitude: float = None, longitude: float = None):
+        self._watchers = ()
         self.property_id = property_id
-        self.address = address
-        self.size = size
-        self.facilities: list[str] = []
-        self.price = price
-        self.history: list['LeaseAgreement'] = []
-        self.is_occupied: bool = False
+        self._address = address
+        self._size = size
+        self._facilities = 0
+        self._price = price
+        self._history: list['LeaseAgreement'] = None
+        self._is_occupied: bool = False
         self.current_lease = None
+        self._coordinates = None if latitude is None or longitude is None else (latitude, longitude)
 
     def __repr__(self):
         return f"Property(name={self.property_id}, value={self.price})"
 
+    def _notify(self, field: str, old) -> None:
+        for watcher in self._watchers:
+            watcher._property_changed(self, field, old)
+
+    @property
+    def facilities(self) -> tuple[str, ...]:
+        mask = self._facilities
+        return tuple(name for index, name in enumerate(_FACILITY_NAMES) if mask >> index & 1)
+
+    @facilities.setter
+    def facilities(self, names) -> None:
+        self._facilities = 0
+        for name in names:
+            self.add_facility(name)
+
+    def add_facility(self, name: str) -> None:
+        self._facilities |= _facility_bit(name)
+
+    def remove_facility(self, name: str) -> None:
+        self._facilities &= ~_FACILITY_BITS.get(name, 0)
+
+    def has_facility(self, name: str) -> bool:
+        return bool(self._facilities & _FACILITY_BITS.get(name, 0))
+
+    # Both collections are read-only views: change them through add_facility/remove_facility
+    # and the lease methods, never by mutating what these properties return.
+    @property
+    def history(self) -> tuple['LeaseAgreement', ...]:
+        return tuple(self._history) if self._history is not None else ()
+
+    def _record_history(self, lease: 'LeaseAgreement') -> None:
+        if self._history is None:
+            self._history = []
+        self._history.append(lease)
+
+    @property
+    def address(self) -> str:
+        return self._address
+
+    @address.setter
+    def address(self, value: str) -> None:
+        old, self._address = self._address, value
+        if self._watchers and old != value:
+            self._notify("address", old)
+
+    @property
+    def size(self) -> float:
+        return self._size
+
+    @size.setter
+    def size(self, value: float) -> None:
+        old, self._size = self._size, value
+        if self._watchers and old != value:
+            self._notify("size", old)
+
+    @property
+    def price(self) -> float:
+        return self._price
+
+    @price.setter
+    def price(self, value: float) -> None:
+        old, self._price = self._price, value
+        if self._watchers and old != value:
+            self._notify("price", old)
+
+    @property
+    def coordinates(self):
+        return self._coordinates
+
+    @coordinates.setter
+    def coordinates(self, value) -> None:
+        old, self._coordinates = self._coordinates, None if value is None else tuple(value)
+        if self._watchers and old != self._coordinates:
+            self._notify("coordinates", old)
+
+    @property
+    def latitude(self):
+        return self._coordinates[0] if self._coordinates else None
+
+    @property
+    def longitude(self):
+        return self._coordinates[1] if self._coordinates else None
+
+    @property
+    def is_occupied(self) -> bool:
+        return self._is_occupied
+
+    @is_occupied.setter
+    def is_occupied(self, value: bool) -> None:
+        old, self._is_occupied = self._is_occupied, value
+        if self._watchers and old != value:
+            self._notify("is_occupied", old)
+
     def get_status(self):
         return "Occupied" if self.is_occupied else "Available"
 
     def calculate_cost(self):
         return self.price
 
+    @timed("property.add_lease")
     def add_lease(self, lease: 'LeaseAgreement') -> None:
         if self.current_lease:
-            self.history.append(self.current_lease)
+            self._record_history(self.current_lease)
         self.current_lease = lease
         self.is_occupied = True
 
+    @timed("property.terminate_lease")
     def terminate_lease(self) -> None:
-        if self.current_lease:
-            self.current_lease.end_date = datetime.now()
-            self.history.append(self.current_lease)
+        lease = self.current_lease
+        if lease:
+            lease._is_active = False
+            lease.end_date = datetime.now()
+            self._record_history(lease)
             self.current_lease = None
             self.is_occupied = False
+            for registry in getattr(lease, "_registries", ()):
+                registry.refresh(lease)
 
 
 class Land(Property):
+    __slots__ = ("zoning_type", "buildable_area")
+
     def __init__(self, property_id: str, address: str, size: float, price: float, company_name: str, zoning_type: str,
-                 buildable_area: float):
-        super().__init__(property_id, address, size, price, company_name)
+                 buildable_area: float, latitude: float = None, longitude: float = None):
+        super().__init__(property_id, address, size, price, company_name, latitude, longitude)
         self.zoning_type = zoning_type
         self.buildable_area = buildable_area
 
 
 class House(Property):
+    __slots__ = ("num_bedrooms", "num_bathrooms", "has_garden")
+
     def __init__(self, property_id: str, address: str, size: float, price: float, company_name: str, num_bedrooms: int,
-                 num_bathrooms: int):
-        super().__init__(property_id, address, size, price, company_name)
+                 num_bathrooms: int, latitude: float = None, longitude: float = None):
+        super().__init__(property_id, address, size, price, company_name, latitude, longitude)
         self.num_bedrooms = num_bedrooms
         self.num_bathrooms = num_bathrooms
         self.has_garden: bool = False
@@ -60,8 +183,11 @@ class House(Property):
 
 
 class Apartment(Property):
-    def __init__(self, property_id: str, address: str, size: float, price: float, company_name: str, floor_number: int):
-        super().__init__(property_id, address, size, price, company_name)
+    __slots__ = ("floor_number", "has_elevator", "has_balcony")
+
+    def __init__(self, property_id: str, address: str, size: float, price: float, company_name: str, floor_number: int,
+                 latitude: float = None, longitude: float = None):
+        super().__init__(property_id, address, size, price, company_name, latitude, longitude)
         self.floor_number = floor_number
         self.has_elevator: bool = False
         self.has_balcony: bool = False
@@ -71,9 +197,11 @@ class Apartment(Property):
 
 
 class Shop(Property):
+    __slots__ = ("business_type", "parking_available")
+
     def __init__(self, property_id: str, address: str, size: float, price: float, company_name: str,
-                 business_type: str):
-        super().__init__(property_id, address, size, price, company_name)
+                 business_type: str, latitude: float = None, longitude: float = None):
+        super().__init__(property_id, address, size, price, company_name, latitude, longitude)
         self.business_type = business_type
         self.parking_available: bool = False
 
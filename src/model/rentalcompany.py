@@ -1,25 +1,357 @@
 
-from src.model.property import Property
+import logging
+from datetime import datetime, timedelta
+from itertools import islice
+from operator import itemgetter
+
+from src.model import months_after
+from src.model.columns import PortfolioColumns, round_cents
+from src.model.indexes import AddressIndex, MembershipIndex, SortedIndex, SpatialIndex, haversine
+from src.model.instrumentation import metrics, timed
+from src.model.maintenance import RenovationLedger
+from src.model.property import Property, House, Apartment
+from src.model.repository import Repository, RepositoryProperties, _build_property, type_names
+
+logger = logging.getLogger(__name__)
 
 class RentalCompany:
-    def __init__(self, company_name: str):
+    def __init__(self, company_name: str, repository: Repository = None):
         self.company_name: str = company_name
-        self.properties_list: list[Property] = []
+        self._properties: dict[str, Property] = {}
+        self._properties_cache: tuple[Property, ...] = None
+        self._clear_indexes()
+        self._columns: PortfolioColumns = None
         self.contracts = []
+        self.visibility = MembershipIndex()
+        self.repository: Repository = None
+        if repository is not None:
+            self.attach_repository(repository)
+
+    def _clear_indexes(self) -> None:
+        self._price_index = SortedIndex()
+        self._id_index = SortedIndex()
+        self._address_index = AddressIndex()
+        self._available: dict[str, None] = {}
+        self._by_type: dict[type, dict[str, None]] = {}
+        self._spatial = SpatialIndex()
+        self._totals = PortfolioSnapshot()
+
+    @property
+    def properties_list(self) -> tuple[Property, ...]:
+        if self._properties_cache is None:
+            self._properties_cache = tuple(self._properties.values())
+        return self._properties_cache
+
+    def __len__(self):
+        return len(self._properties)
+
+    @property
+    def columns(self) -> PortfolioColumns:
+        return self._columns
+
+    def enable_columnar(self) -> PortfolioColumns:
+        if self._columns is None:
+            self._columns = PortfolioColumns()
+            self._columns.extend(self._properties.values())
+        return self._columns
+
+    def disable_columnar(self) -> None:
+        self._columns = None
+
+    def __contains__(self, property: Property):
+        return self._properties.get(property.property_id) is property
+
+    def get_property(self, property_id: str):
+        return self._properties.get(property_id)
+
+    def save_snapshot(self, path: str) -> None:
+        from src.model.snapshot import save_snapshot
+        save_snapshot(self, path)
+
+    @classmethod
+    def load_snapshot(cls, path: str) -> 'RentalCompany':
+        from src.model.snapshot import load_snapshot
+        return load_snapshot(path, cls)
+
+    def close(self) -> None:
+        # Releases the snapshot file behind a restored company; units not built yet are read first,
+        # so the company stays fully usable afterwards.
+        close = getattr(self._properties, "close", None)
+        if close is not None:
+            self._address_index._drain()
+            close()
+            self._properties_cache = None
+
+    def __enter__(self) -> 'RentalCompany':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _restore(self, properties, rows, addresses) -> None:
+        # Rebuilds the in-memory indexes for a properties mapping whose units may not be built yet.
+        # rows are (property_id, type, price, is_occupied, coordinates); addresses are (property_id, address)
+        # pairs and are only read when the address index is first used.
+        self._clear_indexes()
+        self._properties = properties
+        self._properties_cache = None
+        prices = []
+        totals: dict[type, list] = {}
+        for property_id, property_type, price, occupied, coordinates in rows:
+            prices.append((price, property_id))
+            self._by_type.setdefault(property_type, {})[property_id] = None
+            entry = totals.get(property_type)
+            if entry is None:
+                entry = totals[property_type] = [0, 0, 0, 0, 0.0, 0.0]
+            cents, rest = _split_cents(price)
+            entry[0] += 1
+            entry[2] += cents
+            entry[4] += rest
+            if occupied:
+                entry[1] += 1
+            else:
+                entry[3] += cents
+                entry[5] += rest
+                self._available[property_id] = None
+                if coordinates:
+                    self._spatial.add(property_id, *coordinates)
+        for property_type, entry in totals.items():
+            self._totals._adjust_cents(property_type.__name__, *entry)
+        self._price_index.add_many(prices)
+        self._id_index.add_many((property_id, property_id) for _, property_id in prices)
+        self._address_index.defer(addresses)
+
+    def attach_repository(self, repository: Repository) -> None:
+        repository.save_properties(self._properties.values())
+        self.repository = repository
+        if repository.pushdown:
+            # Reads are answered by the repository from now on, so the in-memory indexes are dropped.
+            self._properties = RepositoryProperties(repository, self, dict(self._properties))
+            self._clear_indexes()
+
+    @classmethod
+    def from_repository(cls, repository: Repository, company_name: str) -> 'RentalCompany':
+        rental_company = cls(company_name)
+        if repository.pushdown:
+            rental_company._properties = RepositoryProperties(repository, rental_company)
+        else:
+            rental_company.add_properties([_build_property(row, company_name) for row in repository.query()])
+        rental_company.repository = repository
+        return rental_company
 
+    @property
+    def _pushdown(self) -> Repository:
+        repository = self.repository
+        return repository if repository is not None and repository.pushdown else None
+
+    def _from_rows(self, rows) -> list[Property]:
+        return [self._properties.adopt(row) for row in rows]
+
+    def _register(self, properties: list[Property]) -> None:
+        # The steps that can fail (column conversion, the repository write) run first and are undone
+        # together, so a failed add leaves the company exactly as it was.
+        appended = []
+        try:
+            if self._columns is not None:
+                for property in properties:
+                    self._columns.append(property)
+                    appended.append(property)
+            if self.repository is not None:
+                self.repository.save_properties(properties)
+        except Exception:
+            for property in appended:
+                self._columns.remove(property.property_id)
+            raise
+        for property in properties:
+            self._properties[property.property_id] = property
+            property._watchers += (self,)
+            if self._pushdown is not None:
+                continue
+            self._address_index.add(property.property_id, property.address)
+            self._by_type.setdefault(type(property), {})[property.property_id] = None
+            self._totals._count(property, 1)
+            if not property.is_occupied:
+                self._available[property.property_id] = None
+                if property.coordinates:
+                    self._spatial.add(property.property_id, *property.coordinates)
+        self._properties_cache = None
+
+    @timed("company.add_property")
     def add_property(self, property: Property):
-        if property not in self.properties_list:
-            self.properties_list.append(property)
-            print(f"Property {property.property_id} added to {self.company_name}.")
+        if property.property_id not in self._properties:
+            self._register([property])
+            if self._pushdown is None:
+                self._price_index.add(property.property_id, property.price)
+                self._id_index.add(property.property_id, property.property_id)
+            metrics.increment("company.properties_added")
+            logger.info("Property %s added to %s.", property.property_id, self.company_name,
+                        extra={"property_id": property.property_id, "company": self.company_name})
         else:
-            print(f"Property {property.property_id} already exists.")
+            metrics.increment("company.duplicates")
+            logger.warning("Property %s already exists.", property.property_id,
+                           extra={"property_id": property.property_id, "company": self.company_name})
 
+    @timed("company.add_properties")
+    def add_properties(self, properties) -> int:
+        if self._pushdown is not None:
+            properties = list(properties)
+            self._properties.prefetch(property.property_id for property in properties)
+        added: dict[str, Property] = {}
+        for property in properties:
+            if property.property_id not in added and property.property_id not in self._properties:
+                added[property.property_id] = property
+        added = list(added.values())
+        self._register(added)
+        if self._pushdown is None:
+            self._price_index.add_many((property.price, property.property_id) for property in added)
+            self._id_index.add_many((property.property_id, property.property_id) for property in added)
+        metrics.increment("company.properties_added", len(added))
+        logger.info("%d properties added to %s.", len(added), self.company_name,
+                    extra={"added": len(added), "company": self.company_name})
+        return len(added)
+
+    @timed("company.remove_property")
     def remove_property(self, property: Property):
-        if property in self.properties_list:
-            self.properties_list.remove(property)
-            print(f"Property {property.property_id} removed from {self.company_name}.")
+        if property in self:
+            if self._columns is not None:
+                self._columns.remove(property.property_id)
+            del self._properties[property.property_id]
+            self._properties_cache = None
+            property._watchers = tuple(watcher for watcher in property._watchers if watcher is not self)
+            if self.repository is not None:
+                self.repository.delete_property(property.property_id)
+            if self._pushdown is None:
+                self._price_index.remove(property.property_id, property.price)
+                self._id_index.remove(property.property_id, property.property_id)
+                self._address_index.remove(property.property_id, property.address)
+                self._available.pop(property.property_id, None)
+                self._by_type[type(property)].pop(property.property_id, None)
+                self._totals._count(property, -1)
+                if property.coordinates:
+                    self._spatial.remove(property.property_id, *property.coordinates)
+            metrics.increment("company.properties_removed")
+            logger.info("Property %s removed from %s.", property.property_id, self.company_name,
+                        extra={"property_id": property.property_id, "company": self.company_name})
+        else:
+            logger.warning("Property %s not found.", property.property_id,
+                           extra={"property_id": property.property_id, "company": self.company_name})
+
+    def track_access(self, user) -> None:
+        user.properties.attach_index(self.visibility)
+
+    def untrack_access(self, user) -> None:
+        user.properties.detach_index(self.visibility)
+
+    def visible_ids(self, user):
+        # Accepts a user or an explicit (role, user_id) holder key. A user whose assignments are not
+        # tracked here sees their own properties.
+        assignments = getattr(user, "properties", None)
+        if assignments is None:
+            return self.visibility.members(user)
+        if not assignments.is_attached(self.visibility):
+            return assignments.ids()
+        return self.visibility.members(assignments.holder)
+
+    def _property_changed(self, property: Property, field: str, old) -> None:
+        if self.repository is not None:
+            self.repository.update_property(property, field)
+        if self._columns is not None and field in PortfolioColumns.fields:
+            self._columns.update(property.property_id, field, getattr(property, field))
+        if self._pushdown is not None:
+            return
+        if field == "price":
+            self._price_index.remove(property.property_id, old)
+            self._price_index.add(property.property_id, property.price)
+            # Old and new prices are counted separately so whole-cent prices keep the totals exact.
+            for price in (-old, property.price):
+                self._totals._adjust(type(property).__name__, rent=price,
+                                     vacant_rent=0.0 if property.is_occupied else price)
+        elif field == "address":
+            self._address_index.remove(property.property_id, old)
+            self._address_index.add(property.property_id, property.address)
+        elif field == "is_occupied":
+            change = 1 if property.is_occupied else -1
+            self._totals._adjust(type(property).__name__, occupied=change, vacant_rent=-change * property.price)
+            if property.is_occupied:
+                self._available.pop(property.property_id, None)
+                if property.coordinates:
+                    self._spatial.remove(property.property_id, *property.coordinates)
+            else:
+                self._available[property.property_id] = None
+                if property.coordinates:
+                    self._spatial.add(property.property_id, *property.coordinates)
+        elif field == "coordinates" and not property.is_occupied:
+            if old:
+                self._spatial.remove(property.property_id, *old)
+            if property.coordinates:
+                self._spatial.add(property.property_id, *property.coordinates)
+
+    @timed("company.adjust_prices")
+    def adjust_prices(self, factor: float, property_type: type = None) -> int:
+        if self._pushdown is not None:
+            changes = self.repository.scale_prices(factor, type_names(property_type) if property_type else None)
+            loaded, scaled = self._properties.cached(), []
+            for property_id, price in changes:
+                if property_id in loaded:
+                    p = loaded[property_id]
+                    scaled.append((p, p._price))
+                    p._price = price
+                if self._columns is not None:
+                    self._columns.update(property_id, "price", price)
+            self._notify_others(scaled, "price")
+            return len(changes)
+        if self._columns is not None:
+            changes = self._columns.scale_prices(factor, property_type)
         else:
-            print(f"Property {property.property_id} not found.")
+            changes = [(p.property_id, round_cents(p.price * factor)) for p in self._properties.values()
+                       if property_type is None or isinstance(p, property_type)]
+        scaled = []
+        for property_id, price in changes:
+            p = self._properties[property_id]
+            scaled.append((p, p._price))
+            p._price = price
+        if self.repository is not None:
+            self.repository.update_prices(changes)
+        # This company rebuilds its own indexes once; anyone else watching the units hears about each change.
+        self._price_index = SortedIndex()
+        self._price_index.add_many((p.price, p.property_id) for p in self._properties.values())
+        self._totals = RentalAnalytics().scan(self._properties.values())
+        self._notify_others(scaled, "price")
+        return len(changes)
+
+    def _notify_others(self, changes, field: str) -> None:
+        for property, old in changes:
+            for watcher in property._watchers:
+                if watcher is not self:
+                    watcher._property_changed(property, field, old)
+
+    def properties_in_price_range(self, min_price: float, max_price: float) -> list[Property]:
+        if self._pushdown is not None:
+            return self._from_rows(self.repository.query(min_price=min_price, max_price=max_price))
+        return [self._properties[property_id] for property_id in self._price_index.range(min_price, max_price)]
+
+    def properties_at_location(self, location: str) -> list[Property]:
+        if not location:
+            return list(self.properties_list)
+        if self._pushdown is not None:
+            return self._from_rows(self.repository.query(location=location))
+        candidates = (self._properties[property_id] for property_id in self._address_index.candidates(location))
+        if self._address_index.is_exact(location):
+            return list(candidates)
+        location = location.lower()
+        return [p for p in candidates if location in p.address.lower()]
+
+    def available_properties(self) -> list[Property]:
+        if self._pushdown is not None:
+            return self._from_rows(self.repository.query(available=True))
+        return [self._properties[property_id] for property_id in self._available]
+
+    def properties_of_type(self, property_type: type) -> list[Property]:
+        if self._pushdown is not None:
+            return self._from_rows(self.repository.query(types=type_names(property_type)))
+        return [self._properties[property_id]
+                for cls, bucket in self._by_type.items() if issubclass(cls, property_type)
+                for property_id in bucket]
 
     def get_income(self):
         total_income = 0
@@ -28,74 +360,385 @@ class RentalCompany:
         return total_income
 
     def analyze_occupancy(self):
-        if not self.properties_list:
+        snapshot = RentalAnalytics().snapshot(self)
+        if not snapshot.total_units:
             return "No properties available for occupancy analysis."
-        occupied_properties = sum(1 for p in self.properties_list if p.get_status() == "Occupied")
-        occupancy_rate = occupied_properties / len(self.properties_list) * 100
-        return f"Occupancy Rate: {occupancy_rate:.2f}%"
+        return f"Occupancy Rate: {snapshot.occupancy_rate:.2f}%"
+
+def _split_cents(amount: float) -> tuple[int, float]:
+    cents = round(amount * 100)
+    return cents, amount - cents / 100
+
+class PortfolioSnapshot:
+    def __init__(self, total_units: int = 0, occupied_units: int = 0, total_rent: float = 0.0,
+                 vacant_rent: float = 0.0, by_type: dict[str, 'PortfolioSnapshot'] = None):
+        self.total_units = total_units
+        self.occupied_units = occupied_units
+        self.total_rent = total_rent
+        self.vacant_rent = vacant_rent
+        self.by_type = by_type if by_type is not None else {}
+        # Running rent is kept in integer cents plus whatever lies below a cent, so long runs of
+        # updates cannot drift; the float attributes are derived from these.
+        self._rent_cents, self._rent_rest = _split_cents(total_rent)
+        self._vacant_cents, self._vacant_rest = _split_cents(vacant_rent)
+
+    def __repr__(self):
+        return (f"PortfolioSnapshot(units={self.total_units}, occupied={self.occupied_units}, "
+                f"total_rent={self.total_rent:.2f}, vacant_rent={self.vacant_rent:.2f})")
+
+    def _adjust(self, type_name: str, units: int = 0, occupied: int = 0, rent: float = 0.0,
+                vacant_rent: float = 0.0) -> None:
+        rent_cents, rent_rest = _split_cents(rent)
+        vacant_cents, vacant_rest = _split_cents(vacant_rent)
+        self._adjust_cents(type_name, units, occupied, rent_cents, vacant_cents, rent_rest, vacant_rest)
+
+    def _adjust_cents(self, type_name: str, units: int, occupied: int, rent_cents: int, vacant_cents: int,
+                      rent_rest: float = 0.0, vacant_rest: float = 0.0) -> None:
+        breakdown = self.by_type.get(type_name)
+        if breakdown is None:
+            breakdown = self.by_type[type_name] = PortfolioSnapshot()
+        for totals in (self, breakdown):
+            totals.total_units += units
+            totals.occupied_units += occupied
+            if totals.total_units:
+                totals._rent_cents += rent_cents
+                totals._rent_rest += rent_rest
+                totals._vacant_cents += vacant_cents
+                totals._vacant_rest += vacant_rest
+            else:
+                totals._rent_cents = totals._vacant_cents = 0
+                totals._rent_rest = totals._vacant_rest = 0.0
+            totals.total_rent = totals._rent_cents / 100 + totals._rent_rest
+            totals.vacant_rent = totals._vacant_cents / 100 + totals._vacant_rest
+        if not breakdown.total_units:
+            del self.by_type[type_name]
+
+    def _count(self, property: Property, units: int) -> None:
+        occupied = property.is_occupied
+        self._adjust(type(property).__name__, units=units, occupied=units if occupied else 0,
+                     rent=units * property.price, vacant_rent=0.0 if occupied else units * property.price)
+
+    def copy(self) -> 'PortfolioSnapshot':
+        snapshot = PortfolioSnapshot(self.total_units, self.occupied_units, self.total_rent, self.vacant_rent,
+                                     {name: breakdown.copy() for name, breakdown in self.by_type.items()})
+        snapshot._rent_cents, snapshot._rent_rest = self._rent_cents, self._rent_rest
+        snapshot._vacant_cents, snapshot._vacant_rest = self._vacant_cents, self._vacant_rest
+        return snapshot
+
+    def _rate(self, count: int) -> float:
+        return count / self.total_units * 100 if self.total_units else 0.0
+
+    @property
+    def vacant_units(self) -> int:
+        return self.total_units - self.occupied_units
+
+    @property
+    def occupancy_rate(self) -> float:
+        return self._rate(self.occupied_units)
+
+    @property
+    def vacancy_rate(self) -> float:
+        return self._rate(self.vacant_units)
+
+    @property
+    def turnover_rate(self) -> float:
+        return self._rate(self.vacant_units)
+
+    @property
+    def loss_due_to_vacancy(self) -> float:
+        return self.vacant_rent
+
+    @property
+    def occupied_rent(self) -> float:
+        return self.total_rent - self.vacant_rent
+
+    @property
+    def total_revenue(self) -> float:
+        return self.total_rent
+
+    @property
+    def average_rent(self) -> float:
+        return self.total_rent / self.total_units if self.total_units else 0.0
 
 class PropertySearch:
+    @timed("search.by_location")
     def search_by_location(self, rental_company: RentalCompany, location: str):
-        return [p for p in rental_company.properties_list if location.lower() in p.address.lower()]
+        return rental_company.properties_at_location(location)
 
+    @timed("search.by_price")
     def search_by_price(self, rental_company: RentalCompany, min_price: float, max_price: float):
-        return [p for p in rental_company.properties_list if min_price <= p.price <= max_price]
+        return rental_company.properties_in_price_range(min_price, max_price)
 
+    @timed("search.by_availability")
     def search_by_availability(self, rental_company: RentalCompany):
-        return [p for p in rental_company.properties_list if p.get_status() == "Available"]
+        return rental_company.available_properties()
+
+    def _plan(self, rental_company: RentalCompany, location, min_price, max_price, available, property_type,
+              visible=None):
+        return self._best_plan(rental_company, location, min_price, max_price, available, property_type,
+                               visible)[1]()
+
+    def _best_plan(self, rental_company: RentalCompany, location, min_price, max_price, available, property_type,
+                   visible=None):
+        # Each plan walks its index lazily; candidates are only ever checked one at a time.
+        plans = [(len(rental_company), lambda: iter(rental_company._properties))]
+        if visible is not None:
+            plans.append((len(visible), lambda: iter(visible)))
+        if min_price is not None or max_price is not None:
+            low = float('-inf') if min_price is None else min_price
+            high = float('inf') if max_price is None else max_price
+            plans.append((rental_company._price_index.count(low, high),
+                          lambda: rental_company._price_index.iter_range(low, high)))
+        if location:
+            plans.append((rental_company._address_index.count(location),
+                          lambda: rental_company._address_index.iter_candidates(location)))
+        if available:
+            plans.append((len(rental_company._available), lambda: iter(rental_company._available)))
+        if property_type is not None:
+            buckets = [bucket for cls, bucket in rental_company._by_type.items() if issubclass(cls, property_type)]
+            plans.append((sum(map(len, buckets)), lambda: (i for bucket in buckets for i in bucket)))
+        return min(plans, key=lambda plan: plan[0])
+
+    def _property_type(self, property_type: type, min_bedrooms: int, floor: int) -> type:
+        if min_bedrooms is not None:
+            property_type = property_type or House
+        if floor is not None:
+            property_type = property_type or Apartment
+        return property_type
+
+    def _pushed_down(self, rental_company: RentalCompany, location, min_price, max_price, available, type,
+                     min_bedrooms, floor, limit: int = None, offset: int = 0):
+        property_type = self._property_type(type, min_bedrooms, floor)
+        rows = rental_company.repository.query(location=location, min_price=min_price, max_price=max_price,
+                                               available=available,
+                                               types=type_names(property_type) if property_type else None,
+                                               min_bedrooms=min_bedrooms, floor=floor, limit=limit, offset=offset)
+        for row in rows:
+            yield rental_company._properties.adopt(row)
+
+    def query(self, rental_company: RentalCompany, location: str = None, min_price: float = None,
+              max_price: float = None, available: bool = None, type: type = None, min_bedrooms: int = None,
+              floor: int = None, visible_to=None):
+        visible = rental_company.visible_ids(visible_to) if visible_to is not None else None
+        if rental_company._pushdown is not None and visible is None:
+            yield from self._pushed_down(rental_company, location, min_price, max_price, available, type,
+                                         min_bedrooms, floor)
+            return
+        property_type = self._property_type(type, min_bedrooms, floor)
+        if rental_company._pushdown is not None:
+            # The in-memory indexes are not kept in pushdown mode, so a scoped query walks the visible ids.
+            candidates = list(visible)
+        else:
+            candidates = self._plan(rental_company, location, min_price, max_price, available, property_type,
+                                    visible)
+        yield from self._matches(rental_company, candidates, location, min_price, max_price, available,
+                                 property_type, min_bedrooms, floor, visible)
+
+    def _matches(self, rental_company: RentalCompany, candidates, location, min_price, max_price, available,
+                 property_type, min_bedrooms, floor, visible):
+        location = location.lower() if location else None
+        for property_id in candidates:
+            if visible is not None and property_id not in visible:
+                continue
+            p = rental_company._properties.get(property_id)
+            if p is None:
+                continue
+            if location is not None and location not in p.address.lower():
+                continue
+            if min_price is not None and p.price < min_price:
+                continue
+            if max_price is not None and p.price > max_price:
+                continue
+            if available is not None and p.is_occupied == available:
+                continue
+            if property_type is not None and not isinstance(p, property_type):
+                continue
+            if min_bedrooms is not None and getattr(p, "num_bedrooms", -1) < min_bedrooms:
+                continue
+            if floor is not None and getattr(p, "floor_number", None) != floor:
+                continue
+            yield p
+
+    @timed("search.query_page")
+    def query_page(self, rental_company: RentalCompany, page: int = 0, page_size: int = 20, **criteria):
+        if rental_company._pushdown is not None and criteria.get("visible_to") is None:
+            criteria = {name: criteria.get(name) for name in
+                        ("location", "min_price", "max_price", "available", "type", "min_bedrooms", "floor")}
+            return list(self._pushed_down(rental_company, **criteria, limit=page_size, offset=page * page_size))
+        return self._in_id_order(rental_company, (page + 1) * page_size, **criteria)[page * page_size:]
+
+    def _in_id_order(self, rental_company: RentalCompany, limit: int, location: str = None, min_price: float = None,
+                     max_price: float = None, available: bool = None, type: type = None, min_bedrooms: int = None,
+                     floor: int = None, visible_to=None) -> list[Property]:
+        # Pages are ordered by property_id whichever index the planner picks, so they stay put when a
+        # different index becomes the most selective. The id index is walked first, for at most as many
+        # ids as the best plan would yield; if that does not fill the page, only the planned candidates
+        # are sorted. Either way the checks stop once the page is full.
+        visible = rental_company.visible_ids(visible_to) if visible_to is not None else None
+        property_type = self._property_type(type, min_bedrooms, floor)
+        criteria = (location, min_price, max_price, available, property_type, min_bedrooms, floor, visible)
+        if rental_company._pushdown is not None:
+            return list(islice(self._matches(rental_company, sorted(visible), *criteria), limit))
+        count, plan = self._best_plan(rental_company, location, min_price, max_price, available, property_type,
+                                      visible)
+        rows = list(islice(self._matches(rental_company, islice(rental_company._id_index, count), *criteria), limit))
+        if len(rows) < limit and count < len(rental_company):
+            rows = list(islice(self._matches(rental_company, sorted(plan()), *criteria), limit))
+        return rows
 
 class Navigation:
-    def __init__(self, rental_company: RentalCompany):
+    def __init__(self, rental_company: RentalCompany, geocoder=None):
         self.rental_company = rental_company
+        self.geocoder = geocoder
 
-    def calculate_distance(self, location1: str, location2: str) -> float:
+    def _resolve(self, location):
+        if isinstance(location, Property):
+            return location.coordinates
+        if isinstance(location, tuple):
+            return location
+        if self.geocoder is not None:
+            return self.geocoder(location)
+        return None
 
-        return abs(hash(location1) - hash(location2)) % 100
+    def calculate_distance(self, location1, location2) -> float:
+        origin, destination = self._resolve(location1), self._resolve(location2)
+        if origin is None or destination is None:
+            return float('inf')
+        return haversine(*origin, *destination)
 
-    def get_nearest_available_property(self, location: str):
-        nearest_property = None
-        min_distance = float('inf')
-        for property in self.rental_company.properties_list:
-            if property.get_status() == "Available":
-                distance = self.calculate_distance(location, property.address)
-                if distance < min_distance:
-                    min_distance = distance
-                    nearest_property = property
-        return nearest_property
+    @timed("navigation.k_nearest_available")
+    def k_nearest_available(self, location, k: int, max_km: float = None) -> list[Property]:
+        origin = self._resolve(location)
+        if origin is None:
+            return []
+        if self.rental_company._pushdown is not None:
+            nearest = self.rental_company.repository.nearest_available(*origin, k=k, max_km=max_km)
+            return self.rental_company._from_rows(row for _, row in nearest)
+        nearest = self.rental_company._spatial.nearest(*origin, k=k, max_km=max_km)
+        return [self.rental_company.get_property(property_id) for _, property_id in nearest]
+
+    @timed("navigation.nearest_available")
+    def get_nearest_available_property(self, location):
+        nearest = self.k_nearest_available(location, 1)
+        if nearest:
+            return nearest[0]
+        search = PropertySearch()
+        if isinstance(location, str):
+            match = next(search.query(self.rental_company, location=location, available=True), None)
+            if match is not None:
+                return match
+        return next(search.query(self.rental_company, available=True), None)
 
 class RentalAnalytics:
-    def vacancy_rate(self, rental_company: RentalCompany):
-        if not rental_company.properties_list:
+    @timed("analytics.snapshot")
+    def snapshot(self, rental_company: RentalCompany, visible_to=None) -> PortfolioSnapshot:
+        if visible_to is not None:
+            return self.scan(self.visible_properties(rental_company, visible_to))
+        if rental_company._pushdown is not None:
+            return self._from_aggregates(rental_company.repository.totals())
+        return rental_company._totals.copy()
+
+    @timed("analytics.columnar_snapshot")
+    def columnar_snapshot(self, rental_company: RentalCompany) -> PortfolioSnapshot:
+        return self._from_aggregates(rental_company.enable_columnar().aggregate())
+
+    def _from_aggregates(self, aggregates: dict[str, tuple[int, int, float, float]]) -> PortfolioSnapshot:
+        totals = PortfolioSnapshot()
+        for type_name, (units, occupied, rent, vacant_rent) in aggregates.items():
+            totals._adjust(type_name, units=units, occupied=occupied, rent=rent, vacant_rent=vacant_rent)
+        return totals
+
+    def visible_properties(self, rental_company: RentalCompany, user) -> list[Property]:
+        properties = rental_company._properties
+        return [p for p in map(properties.get, rental_company.visible_ids(user)) if p is not None]
+
+    @timed("analytics.scan")
+    def scan(self, properties: list[Property]) -> PortfolioSnapshot:
+        totals = PortfolioSnapshot()
+        for p in properties:
+            totals._count(p, 1)
+        return totals
+
+    def vacancy_rate(self, rental_company: RentalCompany, visible_to=None):
+        snapshot = self.snapshot(rental_company, visible_to)
+        if not snapshot.total_units:
             return "No properties available for occupancy analysis."
-        occupied = sum(1 for p in rental_company.properties_list if p.get_status() == "Occupied")
-        vacancy_rate = (len(rental_company.properties_list) - occupied) / len(rental_company.properties_list) * 100
-        return f"Vacancy Rate: {vacancy_rate:.2f}%"
+        return f"Vacancy Rate: {snapshot.vacancy_rate:.2f}%"
 
-    def loss_due_to_vacancy(self, rental_company: RentalCompany):
-        total_loss = sum(p.calculate_cost() for p in rental_company.properties_list if p.get_status() == "Available")
-        return f"Total Loss Due to Vacancy: {total_loss:.2f}"
+    def loss_due_to_vacancy(self, rental_company: RentalCompany, visible_to=None):
+        return f"Total Loss Due to Vacancy: {self.snapshot(rental_company, visible_to).loss_due_to_vacancy:.2f}"
 
-    def average_rent(self, rental_company: RentalCompany):
-        if not rental_company.properties_list:
+    def average_rent(self, rental_company: RentalCompany, visible_to=None):
+        snapshot = self.snapshot(rental_company, visible_to)
+        if not snapshot.total_units:
             return "No properties available for rent analysis."
-        total_rent = sum(p.price for p in rental_company.properties_list)
-        average_rent = total_rent / len(rental_company.properties_list)
-        return f"Average Rent: {average_rent:.2f}"
+        return f"Average Rent: {snapshot.average_rent:.2f}"
 
-    def total_revenue(self, rental_company: RentalCompany):
-        total_revenue = sum(p.calculate_cost() for p in rental_company.properties_list)
-        return f"Total Revenue: {total_revenue:.2f}"
+    def total_revenue(self, rental_company: RentalCompany, visible_to=None):
+        return f"Total Revenue: {self.snapshot(rental_company, visible_to).total_revenue:.2f}"
 
-    def revenue_analysis(self, rental_company: RentalCompany):
-        revenue_analysis = {p.property_id: p.calculate_cost() for p in rental_company.properties_list}
+    @timed("analytics.revenue_analysis")
+    def revenue_analysis(self, rental_company: RentalCompany, visible_to=None):
+        properties = (rental_company.properties_list if visible_to is None
+                      else self.visible_properties(rental_company, visible_to))
+        revenue_analysis = {p.property_id: p.calculate_cost() for p in properties}
         return revenue_analysis
 
-    def turnover_rate(self, rental_company: RentalCompany):
-        if not rental_company.properties_list:
+    def turnover_rate(self, rental_company: RentalCompany, visible_to=None):
+        snapshot = self.snapshot(rental_company, visible_to)
+        if not snapshot.total_units:
             return "No properties available for turnover analysis."
-        turnover = sum(1 for p in rental_company.properties_list if p.get_status() == "Available")
-        turnover_rate = turnover / len(rental_company.properties_list) * 100
-        return f"Turnover Rate: {turnover_rate:.2f}%"
+        return f"Turnover Rate: {snapshot.turnover_rate:.2f}%"
+
+    @timed("analytics.capex_summary")
+    def capex_summary(self, rental_company: RentalCompany, ledger: RenovationLedger, months: int = 12) -> dict:
+        # Both sides are running totals, so this is proportional to the number of property types.
+        snapshot = self.snapshot(rental_company)
+        summary = {}
+        for type_name, breakdown in [*snapshot.by_type.items(), ("Total", snapshot)]:
+            capex = ledger.total() if type_name == "Total" else ledger.type_cost(type_name)
+            income = breakdown.occupied_rent * months
+            summary[type_name] = {"units": breakdown.total_units, "capex": capex,
+                                  "capex_per_unit": capex / breakdown.total_units if breakdown.total_units else 0.0,
+                                  "vacancy_rate": breakdown.vacancy_rate, "income": income,
+                                  "roi": income / capex if capex else None}
+        return summary
+
+    @timed("analytics.renovation_roi")
+    def renovation_roi(self, rental_company: RentalCompany, ledger: RenovationLedger, months: int = 12) -> dict:
+        roi = {}
+        for property_id, capex in ledger.property_costs().items():
+            p = rental_company.get_property(property_id)
+            if p is None or not capex:
+                continue
+            roi[property_id] = (p.price * months if p.is_occupied else 0.0) / capex
+        return roi
+
+def shift_months(moment, months: int):
+    shifted = months_after(moment.year, moment.month, moment.day, months)
+    if isinstance(moment, datetime):
+        return shifted.replace(hour=moment.hour, minute=moment.minute, second=moment.second,
+                               microsecond=moment.microsecond)
+    return shifted.date()
+
+def lease_spans(leases, month_of, before, shift, months: int):
+    # leases are (start, end, rent) sorted by start; a lease is cut short where the next one begins and
+    # each month is counted once per unit. Rent is billed per month from the start date, so a lease
+    # occupies the months in which one of its billing periods begins.
+    counted_until = -1
+    for position, (start, end, rent) in enumerate(leases):
+        if position + 1 < len(leases):
+            end = min(end, leases[position + 1][0])
+        begin = month_of(start)
+        last = month_of(before(end))
+        if last >= begin and shift(start, last - begin) >= end:
+            last -= 1
+        first = max(begin, counted_until + 1, 0)
+        last = min(last, months - 1)
+        if first > last:
+            continue
+        counted_until = last
+        yield first, last, rent
 
 class MonthlyReport:
     def __init__(self, report_id: int, month: int, year: int, vacancy_percentage: float = 0.0, income: float = 0.0, loss_due_to_vacancy: float = 0.0):
@@ -106,15 +749,19 @@ class MonthlyReport:
         self.income = income
         self.loss_due_to_vacancy = loss_due_to_vacancy
 
+    @timed("report.generate_report")
     def generate_report(self, properties: list[Property]):
         if not properties:
             return {"error": "No properties available."}
+        return self._from_snapshot(RentalAnalytics().scan(properties))
 
-        total_unoccupied = sum(1 for p in properties if p.get_status() == "Available")
-        self.vacancy_percentage = (total_unoccupied / len(properties)) * 100
-        self.income = sum(p.calculate_cost() for p in properties if p.get_status() == "Occupied")
-        self.loss_due_to_vacancy = sum(p.calculate_cost() for p in properties if p.get_status() == "Available")
+    def _from_snapshot(self, snapshot: PortfolioSnapshot):
+        self.vacancy_percentage = snapshot.vacancy_rate
+        self.income = snapshot.occupied_rent
+        self.loss_due_to_vacancy = snapshot.loss_due_to_vacancy
+        return self.as_dict()
 
+    def as_dict(self):
         return {
             "Report ID": self.report_id,
             "Month": self.month,
@@ -123,3 +770,53 @@ class MonthlyReport:
             "Income": self.income,
             "Loss Due to Vacancy": self.loss_due_to_vacancy
         }
+
+    @classmethod
+    @timed("report.generate_reports")
+    def generate_reports(cls, rental_company: RentalCompany, start_year: int, start_month: int, end_year: int,
+                         end_month: int, first_report_id: int = 1) -> list['MonthlyReport']:
+        base = start_year * 12 + start_month - 1
+        months = end_year * 12 + end_month - base
+        if months <= 0:
+            return []
+        occupied = [0] * (months + 1)
+        occupied_price = [0.0] * (months + 1)
+        income = [0.0] * (months + 1)
+        total_units = 0
+        total_price = 0.0
+
+        def month_of(moment) -> int:
+            return moment.year * 12 + moment.month - 1 - base
+
+        def before(end):
+            return end - (timedelta(microseconds=1) if isinstance(end, datetime) else timedelta(days=1))
+
+        for p in rental_company.properties_list:
+            total_units += 1
+            total_price += p.price
+            leases = [*p.history, p.current_lease] if p.current_lease is not None else list(p.history)
+            leases = sorted(((lease.start_date, lease.end_date, getattr(lease, "monthly_rent", p.price))
+                             for lease in leases if getattr(lease, "start_date", None) is not None),
+                            key=itemgetter(0))
+            for first, last, rent in lease_spans(leases, month_of, before, shift_months, months):
+                occupied[first] += 1
+                occupied[last + 1] -= 1
+                occupied_price[first] += p.price
+                occupied_price[last + 1] -= p.price
+                income[first] += rent
+                income[last + 1] -= rent
+
+        reports = []
+        running_occupied, running_price, running_income = 0, 0.0, 0.0
+        for offset in range(months):
+            running_occupied += occupied[offset]
+            running_price += occupied_price[offset]
+            running_income += income[offset]
+            year, month = divmod(base + offset, 12)
+            report = cls(first_report_id + offset, month + 1, year)
+            if total_units:
+                report.vacancy_percentage = (total_units - running_occupied) / total_units * 100
+                report.income = running_income
+                report.loss_due_to_vacancy = total_price - running_price
+            reports.append(report)
+        return reports
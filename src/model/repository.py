@@ -0,0 +1,806 @@
+import heapq
+import json
+import queue
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from collections.abc import ItemsView, MutableMapping, ValuesView
+from contextlib import contextmanager
+from datetime import date, datetime
+from itertools import count, islice
+from math import cos, radians
+
+from src.model.columns import round_cents
+from src.model.indexes import EARTH_RADIUS_KM, haversine
+from src.model.property import Property, Land, House, Apartment, Shop
+
+PropertyRow = namedtuple("PropertyRow", ("property_id", "type", "address", "size", "price", "is_occupied", "latitude",
+                                         "longitude", "facilities", "num_bedrooms", "floor_number", "details"))
+LeaseRow = namedtuple("LeaseRow", ("lease_id", "property_id", "resident_id", "start_date", "end_date",
+                                   "duration_months", "monthly_rent", "is_active"))
+PaymentRow = namedtuple("PaymentRow", ("payment_id", "lease_id", "amount", "due_date", "payment_date", "status"))
+
+_TYPES = {cls.__name__: cls for cls in (Property, Land, House, Apartment, Shop)}
+_CONSTRUCTOR_FIELDS = {Land: ("zoning_type", "buildable_area"), House: ("num_bedrooms", "num_bathrooms"),
+                       Apartment: ("floor_number",), Shop: ("business_type",)}
+_KM_PER_DEGREE = EARTH_RADIUS_KM * radians(1)
+_HALF_CIRCUMFERENCE_KM = 180 * _KM_PER_DEGREE
+
+
+def type_names(property_type: type) -> list[str]:
+    return [name for name, cls in _TYPES.items() if issubclass(cls, property_type)]
+
+
+def _property_row(p: Property) -> PropertyRow:
+    cls = type(p)
+    if _TYPES.get(cls.__name__) is not cls:
+        raise ValueError(f"Cannot store property type {cls.__name__}.")
+    details = {} if cls is Property else {name: getattr(p, name) for name in cls.__slots__}
+    latitude, longitude = p.coordinates or (None, None)
+    return PropertyRow(p.property_id, cls.__name__, p.address, p.size, p.price, p.is_occupied, latitude, longitude,
+                       json.dumps(p.facilities), details.get("num_bedrooms"), details.get("floor_number"),
+                       json.dumps(details))
+
+
+def _build_property(row: PropertyRow, company_name: str) -> Property:
+    cls = _TYPES[row.type]
+    details = json.loads(row.details)
+    arguments = [details.pop(name) for name in _CONSTRUCTOR_FIELDS.get(cls, ())]
+    p = cls(row.property_id, row.address, row.size, row.price, company_name, *arguments, row.latitude, row.longitude)
+    for name, value in details.items():
+        setattr(p, name, value)
+    p._is_occupied = bool(row.is_occupied)
+    p.facilities = json.loads(row.facilities)
+    return p
+
+
+def _lease_row(lease) -> LeaseRow:
+    return LeaseRow(lease.lease_id, lease.property.property_id, getattr(lease.resident, "resident_id", None),
+                    lease.start_date.isoformat(), lease.end_date.isoformat(), lease.duration_months,
+                    lease.monthly_rent, lease._is_active)
+
+
+def _payment_values(payment) -> tuple:
+    payment_date = payment.payment_date.isoformat() if payment.payment_date is not None else None
+    return (getattr(payment.lease, "lease_id", None), payment.amount, payment.due_date.isoformat(), payment_date,
+            payment.status)
+
+
+def _lease_from_values(values) -> LeaseRow:
+    row = LeaseRow._make(values)
+    return row._replace(start_date=datetime.fromisoformat(row.start_date), end_date=datetime.fromisoformat(row.end_date),
+                        is_active=bool(row.is_active))
+
+
+def _payment_from_values(values) -> PaymentRow:
+    row = PaymentRow._make(values)
+    return row._replace(due_date=date.fromisoformat(row.due_date),
+                        payment_date=date.fromisoformat(row.payment_date) if row.payment_date else None)
+
+
+def _iso(moment) -> str:
+    return moment.isoformat() if isinstance(moment, datetime) else datetime(moment.year, moment.month, moment.day).isoformat()
+
+
+class Repository(ABC):
+    # Repositories that answer queries themselves; the company then skips its in-memory indexes for reads.
+    pushdown = False
+
+    @abstractmethod
+    def save_properties(self, properties) -> int:
+        ...
+
+    @abstractmethod
+    def update_property(self, property: Property, field: str) -> None:
+        ...
+
+    @abstractmethod
+    def update_prices(self, changes) -> None:
+        ...
+
+    @abstractmethod
+    def delete_property(self, property_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def get(self, property_id: str) -> PropertyRow:
+        ...
+
+    def contains(self, property_id: str) -> bool:
+        return self.get(property_id) is not None
+
+    def existing(self, property_ids) -> set[str]:
+        return {property_id for property_id in property_ids if self.contains(property_id)}
+
+    @abstractmethod
+    def property_ids(self):
+        ...
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def query(self, location: str = None, min_price: float = None, max_price: float = None, available: bool = None,
+              types: list[str] = None, min_bedrooms: int = None, floor: int = None, limit: int = None,
+              offset: int = 0):
+        ...
+
+    @abstractmethod
+    def totals(self) -> dict[str, tuple[int, int, float, float]]:
+        ...
+
+    @abstractmethod
+    def scale_prices(self, factor: float, types: list[str] = None) -> list[tuple[str, float]]:
+        ...
+
+    @abstractmethod
+    def nearest_available(self, latitude: float, longitude: float, k: int = 1,
+                          max_km: float = None) -> list[tuple[float, PropertyRow]]:
+        ...
+
+    @abstractmethod
+    def save_leases(self, leases) -> int:
+        ...
+
+    @abstractmethod
+    def save_payments(self, payments) -> int:
+        ...
+
+    @abstractmethod
+    def refresh(self, record) -> None:
+        ...
+
+    def refresh_many(self, records) -> None:
+        for record in records:
+            self.refresh(record)
+
+    @abstractmethod
+    def leases_for_property(self, property_id: str) -> list[LeaseRow]:
+        ...
+
+    @abstractmethod
+    def leases_active_on(self, moment) -> list[LeaseRow]:
+        ...
+
+    @abstractmethod
+    def leases_ending_between(self, start, end) -> list[LeaseRow]:
+        ...
+
+    @abstractmethod
+    def payments_by_status(self, status: str) -> list[PaymentRow]:
+        ...
+
+    @abstractmethod
+    def payment_total(self, status: str = "Paid", start: date = None, end: date = None) -> float:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+def _matches(row: PropertyRow, location, min_price, max_price, available, types, min_bedrooms, floor) -> bool:
+    return ((location is None or location in row.address.lower())
+            and (min_price is None or row.price >= min_price)
+            and (max_price is None or row.price <= max_price)
+            and (available is None or bool(row.is_occupied) != available)
+            and (types is None or row.type in types)
+            and (min_bedrooms is None or (row.num_bedrooms is not None and row.num_bedrooms >= min_bedrooms))
+            and (floor is None or row.floor_number == floor))
+
+
+class InMemoryRepository(Repository):
+    def __init__(self):
+        self._properties: dict[str, PropertyRow] = {}
+        self._leases: dict[int, LeaseRow] = {}
+        self._payments: dict[int, PaymentRow] = {}
+        self._payment_ids: dict = {}
+        self._sequence = count(1)
+
+    def save_properties(self, properties) -> int:
+        saved = 0
+        for p in properties:
+            self._properties[p.property_id] = _property_row(p)
+            saved += 1
+        return saved
+
+    def update_property(self, property: Property, field: str) -> None:
+        if property.property_id in self._properties:
+            self._properties[property.property_id] = _property_row(property)
+
+    def update_prices(self, changes) -> None:
+        for property_id, price in changes:
+            self._properties[property_id] = self._properties[property_id]._replace(price=price)
+
+    def delete_property(self, property_id: str) -> None:
+        self._properties.pop(property_id, None)
+
+    def get(self, property_id: str) -> PropertyRow:
+        return self._properties.get(property_id)
+
+    def property_ids(self):
+        return iter(list(self._properties))
+
+    def count(self) -> int:
+        return len(self._properties)
+
+    def query(self, location: str = None, min_price: float = None, max_price: float = None, available: bool = None,
+              types: list[str] = None, min_bedrooms: int = None, floor: int = None, limit: int = None,
+              offset: int = 0):
+        location = location.lower() if location else None
+        rows = (row for row in list(self._properties.values())
+                if _matches(row, location, min_price, max_price, available, types, min_bedrooms, floor))
+        return islice(rows, offset, None if limit is None else offset + limit)
+
+    def totals(self) -> dict[str, tuple[int, int, float, float]]:
+        totals: dict[str, list] = {}
+        for row in self._properties.values():
+            entry = totals.setdefault(row.type, [0, 0, 0.0, 0.0])
+            entry[0] += 1
+            entry[2] += row.price
+            if row.is_occupied:
+                entry[1] += 1
+            else:
+                entry[3] += row.price
+        return {type_name: tuple(entry) for type_name, entry in totals.items()}
+
+    def scale_prices(self, factor: float, types: list[str] = None) -> list[tuple[str, float]]:
+        changes = [(row.property_id, round_cents(row.price * factor)) for row in self._properties.values()
+                   if types is None or row.type in types]
+        self.update_prices(changes)
+        return changes
+
+    def nearest_available(self, latitude: float, longitude: float, k: int = 1,
+                          max_km: float = None) -> list[tuple[float, PropertyRow]]:
+        candidates = ((haversine(latitude, longitude, row.latitude, row.longitude), position, row)
+                      for position, row in enumerate(self._properties.values())
+                      if not row.is_occupied and row.latitude is not None)
+        nearest = heapq.nsmallest(k, candidates)
+        return [(distance, row) for distance, _, row in nearest if max_km is None or distance <= max_km]
+
+    def save_leases(self, leases) -> int:
+        saved = 0
+        for lease in leases:
+            self._leases[lease.lease_id] = _lease_from_values(_lease_row(lease))
+            if self not in lease._registries:
+                lease._registries += (self,)
+            saved += 1
+        return saved
+
+    def save_payments(self, payments) -> int:
+        saved = 0
+        for payment in payments:
+            payment_id = self._payment_ids.get(payment)
+            if payment_id is None:
+                payment_id = self._payment_ids[payment] = next(self._sequence)
+                payment._histories += (self,)
+            self._payments[payment_id] = _payment_from_values((payment_id, *_payment_values(payment)))
+            saved += 1
+        return saved
+
+    def refresh(self, record) -> None:
+        if record in self._payment_ids:
+            self.save_payments([record])
+        elif getattr(record, "lease_id", None) in self._leases:
+            self.save_leases([record])
+
+    def leases_for_property(self, property_id: str) -> list[LeaseRow]:
+        return [row for row in self._leases.values() if row.property_id == property_id]
+
+    def leases_active_on(self, moment) -> list[LeaseRow]:
+        moment = datetime.fromisoformat(_iso(moment))
+        return [row for row in self._leases.values() if row.is_active and row.start_date <= moment < row.end_date]
+
+    def leases_ending_between(self, start, end) -> list[LeaseRow]:
+        start, end = datetime.fromisoformat(_iso(start)), datetime.fromisoformat(_iso(end))
+        return sorted((row for row in self._leases.values() if start <= row.end_date <= end),
+                      key=lambda row: row.end_date)
+
+    def payments_by_status(self, status: str) -> list[PaymentRow]:
+        return [row for row in self._payments.values() if row.status == status]
+
+    def payment_total(self, status: str = "Paid", start: date = None, end: date = None) -> float:
+        return sum(row.amount for row in self._payments.values() if row.status == status
+                   and (start is None or (row.payment_date is not None and row.payment_date >= start))
+                   and (end is None or (row.payment_date is not None and row.payment_date <= end)))
+
+
+class ConnectionPool:
+    def __init__(self, connect, size: int = 4):
+        self._connect = connect
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._connections: list[sqlite3.Connection] = []
+
+    @contextmanager
+    def connection(self):
+        with self._slots:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                connection = self._connect()
+                with self._lock:
+                    self._connections.append(connection)
+            try:
+                yield connection
+            finally:
+                self._idle.put(connection)
+
+    def close(self) -> None:
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+
+
+_PROPERTY_COLUMNS = ", ".join(PropertyRow._fields)
+_LEASE_COLUMNS = ", ".join(LeaseRow._fields)
+_PAYMENT_COLUMNS = ", ".join(PaymentRow._fields)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS properties (
+    id INTEGER PRIMARY KEY,
+    property_id TEXT NOT NULL UNIQUE,
+    type TEXT NOT NULL,
+    address TEXT NOT NULL,
+    address_key TEXT NOT NULL,
+    size REAL,
+    price REAL NOT NULL,
+    is_occupied INTEGER NOT NULL,
+    latitude REAL,
+    longitude REAL,
+    facilities TEXT NOT NULL,
+    num_bedrooms INTEGER,
+    floor_number INTEGER,
+    details TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS properties_price ON properties (price);
+CREATE INDEX IF NOT EXISTS properties_available ON properties (is_occupied, price);
+CREATE INDEX IF NOT EXISTS properties_type ON properties (type, price);
+CREATE INDEX IF NOT EXISTS properties_address ON properties (address_key);
+CREATE INDEX IF NOT EXISTS properties_location ON properties (latitude, longitude) WHERE is_occupied = 0;
+CREATE TABLE IF NOT EXISTS leases (
+    lease_id INTEGER PRIMARY KEY,
+    property_id TEXT NOT NULL,
+    resident_id INTEGER,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    duration_months INTEGER NOT NULL,
+    monthly_rent REAL NOT NULL,
+    is_active INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leases_property ON leases (property_id);
+CREATE INDEX IF NOT EXISTS leases_start ON leases (start_date);
+CREATE INDEX IF NOT EXISTS leases_end ON leases (end_date);
+CREATE TABLE IF NOT EXISTS payments (
+    payment_id INTEGER PRIMARY KEY,
+    lease_id INTEGER,
+    amount REAL NOT NULL,
+    due_date TEXT NOT NULL,
+    payment_date TEXT,
+    status TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS payments_status ON payments (status, payment_date);
+CREATE INDEX IF NOT EXISTS payments_due ON payments (due_date);
+CREATE INDEX IF NOT EXISTS payments_lease ON payments (lease_id);
+"""
+
+# Substring searches on addresses go through a trigram full-text index when SQLite ships the tokenizer.
+_ADDRESS_SEARCH = """
+CREATE VIRTUAL TABLE IF NOT EXISTS property_addresses
+    USING fts5(address_key, content='properties', content_rowid='id', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS properties_address_insert AFTER INSERT ON properties BEGIN
+    INSERT INTO property_addresses (rowid, address_key) VALUES (new.id, new.address_key);
+END;
+CREATE TRIGGER IF NOT EXISTS properties_address_delete AFTER DELETE ON properties BEGIN
+    INSERT INTO property_addresses (property_addresses, rowid, address_key) VALUES ('delete', old.id, old.address_key);
+END;
+CREATE TRIGGER IF NOT EXISTS properties_address_update AFTER UPDATE OF address_key ON properties BEGIN
+    INSERT INTO property_addresses (property_addresses, rowid, address_key) VALUES ('delete', old.id, old.address_key);
+    INSERT INTO property_addresses (rowid, address_key) VALUES (new.id, new.address_key);
+END;
+"""
+
+_UPSERT_PROPERTY = f"""
+INSERT INTO properties (address_key, {_PROPERTY_COLUMNS}) VALUES (?, {", ".join("?" * len(PropertyRow._fields))})
+ON CONFLICT (property_id) DO UPDATE SET {", ".join(f"{name} = excluded.{name}" for name in
+                                                  ("address_key", *PropertyRow._fields[1:]))}
+"""
+_UPSERT_LEASE = f"""
+INSERT INTO leases ({_LEASE_COLUMNS}) VALUES ({", ".join("?" * len(LeaseRow._fields))})
+ON CONFLICT (lease_id) DO UPDATE SET {", ".join(f"{name} = excluded.{name}" for name in LeaseRow._fields[1:])}
+"""
+_INSERT_PAYMENT = "INSERT INTO payments (lease_id, amount, due_date, payment_date, status) VALUES (?, ?, ?, ?, ?)"
+_UPDATE_PAYMENT = ("UPDATE payments SET lease_id = ?, amount = ?, due_date = ?, payment_date = ?, status = ? "
+                   "WHERE payment_id = ?")
+_UPDATE_FIELDS = {
+    "price": "UPDATE properties SET price = ? WHERE property_id = ?",
+    "size": "UPDATE properties SET size = ? WHERE property_id = ?",
+    "is_occupied": "UPDATE properties SET is_occupied = ? WHERE property_id = ?",
+    "address": "UPDATE properties SET address = ?, address_key = ? WHERE property_id = ?",
+    "coordinates": "UPDATE properties SET latitude = ?, longitude = ? WHERE property_id = ?",
+}
+_SELECT_PROPERTY = f"SELECT {_PROPERTY_COLUMNS} FROM properties WHERE property_id = ?"
+_TOTALS = ("SELECT type, COUNT(*), SUM(is_occupied), SUM(price), SUM(CASE WHEN is_occupied THEN 0 ELSE price END) "
+           "FROM properties GROUP BY type")
+
+
+class SQLiteRepository(Repository):
+    pushdown = True
+    batch_size = 5_000
+    page_size = 1_000
+    _memory_databases = count(1)
+
+    def __init__(self, path: str = ":memory:", pool_size: int = 4):
+        self.path = path
+        if path == ":memory:":
+            # A shared in-memory database has no WAL, so readers reuse the writer connection under its lock.
+            self._database = f"file:rental-repository-{next(self._memory_databases)}?mode=memory&cache=shared"
+            self._writer = self._connect()
+            self._pool = None
+        else:
+            self._database = path
+            self._writer = self._connect()
+            self._writer.execute("PRAGMA journal_mode = WAL")
+            self._writer.execute("PRAGMA synchronous = NORMAL")
+            self._pool = ConnectionPool(self._reader, pool_size)
+        self._lock = threading.RLock()
+        self._payment_ids: dict = {}
+        self._leases: dict = {}
+        self._writer.executescript(_SCHEMA)
+        try:
+            self._writer.executescript(_ADDRESS_SEARCH)
+            self.trigram = True
+        except sqlite3.OperationalError:
+            self.trigram = False
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._database, uri=self._database.startswith("file:"), check_same_thread=False,
+                               cached_statements=256)
+
+    def _reader(self) -> sqlite3.Connection:
+        connection = self._connect()
+        connection.execute("PRAGMA query_only = 1")
+        return connection
+
+    @contextmanager
+    def _write(self):
+        with self._lock, self._writer:
+            yield self._writer
+
+    @contextmanager
+    def _read(self):
+        if self._pool is None:
+            with self._lock:
+                yield self._writer
+        else:
+            with self._pool.connection() as connection:
+                yield connection
+
+    def _execute_batches(self, statement: str, rows) -> int:
+        saved = 0
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                return saved
+            with self._write() as connection:
+                connection.executemany(statement, batch)
+            saved += len(batch)
+
+    def save_properties(self, properties) -> int:
+        return self._execute_batches(_UPSERT_PROPERTY, ((p.address.lower(), *_property_row(p)) for p in properties))
+
+    def update_property(self, property: Property, field: str) -> None:
+        statement = _UPDATE_FIELDS.get(field)
+        if statement is None:
+            return
+        if field == "address":
+            values = (property.address, property.address.lower())
+        elif field == "coordinates":
+            values = property.coordinates or (None, None)
+        else:
+            values = (getattr(property, field),)
+        with self._write() as connection:
+            connection.execute(statement, (*values, property.property_id))
+
+    def update_prices(self, changes) -> None:
+        self._execute_batches(_UPDATE_FIELDS["price"], ((price, property_id) for property_id, price in changes))
+
+    def delete_property(self, property_id: str) -> None:
+        with self._write() as connection:
+            connection.execute("DELETE FROM properties WHERE property_id = ?", (property_id,))
+
+    def get(self, property_id: str) -> PropertyRow:
+        with self._read() as connection:
+            row = connection.execute(_SELECT_PROPERTY, (property_id,)).fetchone()
+        return PropertyRow._make(row) if row is not None else None
+
+    def contains(self, property_id: str) -> bool:
+        with self._read() as connection:
+            return connection.execute("SELECT 1 FROM properties WHERE property_id = ?", (property_id,)).fetchone() is not None
+
+    def existing(self, property_ids) -> set[str]:
+        found = set()
+        property_ids = iter(property_ids)
+        while True:
+            # Stay well under SQLite's bound-parameter limit.
+            chunk = list(islice(property_ids, 500))
+            if not chunk:
+                return found
+            with self._read() as connection:
+                found.update(property_id for property_id, in connection.execute(
+                    f"SELECT property_id FROM properties WHERE property_id IN ({', '.join('?' * len(chunk))})", chunk))
+
+    def property_ids(self):
+        last = 0
+        while True:
+            with self._read() as connection:
+                rows = connection.execute("SELECT id, property_id FROM properties WHERE id > ? ORDER BY id LIMIT ?",
+                                          (last, self.page_size)).fetchall()
+            if not rows:
+                return
+            last = rows[-1][0]
+            for _, property_id in rows:
+                yield property_id
+
+    def count(self) -> int:
+        with self._read() as connection:
+            return connection.execute("SELECT COUNT(*) FROM properties").fetchone()[0]
+
+    def _where(self, location, min_price, max_price, available, types, min_bedrooms, floor) -> tuple[list, list]:
+        clauses, parameters = [], []
+        if location:
+            key = location.lower()
+            if self.trigram and len(key) >= 3:
+                clauses.append("id IN (SELECT rowid FROM property_addresses WHERE property_addresses MATCH ?)")
+                parameters.append('"' + key.replace('"', '""') + '"')
+            clauses.append("instr(address_key, ?) > 0")
+            parameters.append(key)
+        if min_price is not None:
+            clauses.append("price >= ?")
+            parameters.append(min_price)
+        if max_price is not None:
+            clauses.append("price <= ?")
+            parameters.append(max_price)
+        if available is not None:
+            clauses.append("is_occupied = ?")
+            parameters.append(not available)
+        if types is not None:
+            clauses.append(f"type IN ({', '.join('?' * len(types))})")
+            parameters.extend(types)
+        if min_bedrooms is not None:
+            clauses.append("num_bedrooms >= ?")
+            parameters.append(min_bedrooms)
+        if floor is not None:
+            clauses.append("floor_number = ?")
+            parameters.append(floor)
+        return clauses, parameters
+
+    def query(self, location: str = None, min_price: float = None, max_price: float = None, available: bool = None,
+              types: list[str] = None, min_bedrooms: int = None, floor: int = None, limit: int = None,
+              offset: int = 0):
+        clauses, parameters = self._where(location, min_price, max_price, available, types, min_bedrooms, floor)
+        if types is not None and not types:
+            return
+        if limit is not None:
+            where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+            with self._read() as connection:
+                rows = connection.execute(f"SELECT {_PROPERTY_COLUMNS} FROM properties {where}ORDER BY id LIMIT ? OFFSET ?",
+                                          (*parameters, limit, offset)).fetchall()
+            yield from map(PropertyRow._make, rows)
+            return
+        # Keyset pagination keeps each pooled connection only for the length of one page.
+        statement = (f"SELECT id, {_PROPERTY_COLUMNS} FROM properties WHERE {' AND '.join(['id > ?', *clauses])} "
+                     f"ORDER BY id LIMIT ?")
+        last, skip = 0, offset
+        while True:
+            with self._read() as connection:
+                rows = connection.execute(statement, (last, *parameters, self.page_size)).fetchall()
+            if not rows:
+                return
+            last = rows[-1][0]
+            for row in rows[skip:]:
+                yield PropertyRow._make(row[1:])
+            skip = max(0, skip - len(rows))
+
+    def totals(self) -> dict[str, tuple[int, int, float, float]]:
+        with self._read() as connection:
+            rows = connection.execute(_TOTALS).fetchall()
+        return {type_name: (units, occupied, rent, vacant_rent) for type_name, units, occupied, rent, vacant_rent in rows}
+
+    def scale_prices(self, factor: float, types: list[str] = None) -> list[tuple[str, float]]:
+        statement = "SELECT property_id, price FROM properties"
+        parameters = ()
+        if types is not None:
+            statement += f" WHERE type IN ({', '.join('?' * len(types))})"
+            parameters = tuple(types)
+        with self._write() as connection:
+            changes = [(property_id, round_cents(price * factor))
+                       for property_id, price in connection.execute(statement, parameters)]
+            connection.executemany(_UPDATE_FIELDS["price"], ((price, property_id) for property_id, price in changes))
+        return changes
+
+    def nearest_available(self, latitude: float, longitude: float, k: int = 1,
+                          max_km: float = None) -> list[tuple[float, PropertyRow]]:
+        if k <= 0:
+            return []
+        limit = min(max_km if max_km is not None else _HALF_CIRCUMFERENCE_KM, _HALF_CIRCUMFERENCE_KM)
+        radius = min(10.0, limit)
+        while True:
+            # Grow a bounding box until it holds k units within its inscribed radius, or covers the limit.
+            clauses = ["is_occupied = 0", "latitude IS NOT NULL"]
+            span = radius / _KM_PER_DEGREE
+            parameters = []
+            if radius < _HALF_CIRCUMFERENCE_KM:
+                clauses.append("latitude BETWEEN ? AND ?")
+                parameters.extend((latitude - span, latitude + span))
+                scale = cos(radians(min(89.9, abs(latitude) + span)))
+                if span / scale < 180 and -180 <= longitude - span / scale and longitude + span / scale <= 180:
+                    clauses.append("longitude BETWEEN ? AND ?")
+                    parameters.extend((longitude - span / scale, longitude + span / scale))
+            with self._read() as connection:
+                rows = connection.execute(f"SELECT id, {_PROPERTY_COLUMNS} FROM properties WHERE {' AND '.join(clauses)}",
+                                          parameters).fetchall()
+            hits = sorted((haversine(latitude, longitude, row[7], row[8]), row[0], row) for row in rows)
+            hits = [(distance, PropertyRow._make(row[1:])) for distance, _, row in hits if distance <= radius]
+            if len(hits) >= k or radius >= limit:
+                return hits[:k]
+            radius = min(radius * 4, limit)
+
+    def save_leases(self, leases) -> int:
+        leases = list(leases)
+        saved = self._execute_batches(_UPSERT_LEASE, map(_lease_row, leases))
+        for lease in leases:
+            self._leases[lease] = None
+            if self not in lease._registries:
+                lease._registries += (self,)
+        return saved
+
+    def save_payments(self, payments) -> int:
+        updates, inserts = [], []
+        for payment in payments:
+            payment_id = self._payment_ids.get(payment)
+            if payment_id is None:
+                inserts.append(payment)
+            else:
+                updates.append((*_payment_values(payment), payment_id))
+        self._execute_batches(_UPDATE_PAYMENT, updates)
+        batch = iter(inserts)
+        while True:
+            chunk = list(islice(batch, self.batch_size))
+            if not chunk:
+                break
+            with self._write() as connection:
+                for payment in chunk:
+                    self._payment_ids[payment] = connection.execute(_INSERT_PAYMENT, _payment_values(payment)).lastrowid
+            for payment in chunk:
+                payment._histories += (self,)
+        return len(updates) + len(inserts)
+
+    def refresh(self, record) -> None:
+        if record in self._payment_ids:
+            self.save_payments([record])
+        elif record in self._leases:
+            self.save_leases([record])
+
+    def refresh_many(self, records) -> None:
+        records = list(records)
+        self.save_payments([record for record in records if record in self._payment_ids])
+        self.save_leases([record for record in records if record in self._leases])
+
+    def _lease_rows(self, condition: str, parameters: tuple) -> list[LeaseRow]:
+        with self._read() as connection:
+            rows = connection.execute(f"SELECT {_LEASE_COLUMNS} FROM leases WHERE {condition}", parameters).fetchall()
+        return [_lease_from_values(row) for row in rows]
+
+    def leases_for_property(self, property_id: str) -> list[LeaseRow]:
+        return self._lease_rows("property_id = ? ORDER BY start_date", (property_id,))
+
+    def leases_active_on(self, moment) -> list[LeaseRow]:
+        moment = _iso(moment)
+        return self._lease_rows("start_date <= ? AND end_date > ? AND is_active ORDER BY start_date", (moment, moment))
+
+    def leases_ending_between(self, start, end) -> list[LeaseRow]:
+        return self._lease_rows("end_date BETWEEN ? AND ? ORDER BY end_date", (_iso(start), _iso(end)))
+
+    def payments_by_status(self, status: str) -> list[PaymentRow]:
+        with self._read() as connection:
+            rows = connection.execute(f"SELECT {_PAYMENT_COLUMNS} FROM payments WHERE status = ? ORDER BY payment_id",
+                                      (status,)).fetchall()
+        return [_payment_from_values(row) for row in rows]
+
+    def payment_total(self, status: str = "Paid", start: date = None, end: date = None) -> float:
+        statement, parameters = "SELECT TOTAL(amount) FROM payments WHERE status = ?", [status]
+        if start is not None:
+            statement += " AND payment_date >= ?"
+            parameters.append(start.isoformat())
+        if end is not None:
+            statement += " AND payment_date <= ?"
+            parameters.append(end.isoformat())
+        with self._read() as connection:
+            return connection.execute(statement, parameters).fetchone()[0]
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
+        self._writer.close()
+
+
+class _StreamedValues(ValuesView):
+    def __iter__(self):
+        for row in self._mapping._repository.query():
+            yield self._mapping.adopt(row)
+
+
+class _StreamedItems(ItemsView):
+    def __iter__(self):
+        for row in self._mapping._repository.query():
+            yield row.property_id, self._mapping.adopt(row)
+
+
+class RepositoryProperties(MutableMapping):
+    def __init__(self, repository: Repository, rental_company, entries: dict = None):
+        self._repository = repository
+        self._company = rental_company
+        self._entries: dict[str, Property] = entries if entries is not None else {}
+        self._absent: set[str] = set()
+
+    def adopt(self, row: PropertyRow) -> Property:
+        p = self._entries.get(row.property_id)
+        if p is None:
+            p = self._entries[row.property_id] = _build_property(row, self._company.company_name)
+            p._watchers = (self._company,)
+        return p
+
+    def __getitem__(self, property_id: str) -> Property:
+        p = self._entries.get(property_id)
+        if p is None:
+            row = self._repository.get(property_id)
+            if row is None:
+                raise KeyError(property_id)
+            p = self.adopt(row)
+        return p
+
+    def get(self, property_id: str, default=None):
+        try:
+            return self[property_id]
+        except KeyError:
+            return default
+
+    def __setitem__(self, property_id: str, property: Property) -> None:
+        self._entries[property_id] = property
+        self._absent.discard(property_id)
+
+    def __delitem__(self, property_id: str) -> None:
+        self._entries.pop(property_id, None)
+
+    def __contains__(self, property_id) -> bool:
+        if property_id in self._entries:
+            return True
+        if property_id in self._absent:
+            return False
+        return self._repository.contains(property_id)
+
+    def prefetch(self, property_ids) -> None:
+        # Answers the membership checks of a bulk add with one round trip per chunk.
+        property_ids = set(property_ids) - self._entries.keys()
+        self._absent = property_ids - self._repository.existing(property_ids)
+
+    def __iter__(self):
+        return self._repository.property_ids()
+
+    # A full walk reads the rows in one paged query instead of one lookup per id.
+    def values(self):
+        return _StreamedValues(self)
+
+    def items(self):
+        return _StreamedItems(self)
+
+    def __len__(self):
+        return self._repository.count()
+
+    def cached(self) -> dict[str, Property]:
+        return self._entries
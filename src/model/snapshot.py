@@ -0,0 +1,290 @@
+import mmap
+import struct
+from array import array
+from collections.abc import MutableMapping
+from datetime import datetime, timedelta
+
+from src.model import LeaseAgreement, Owner, RentalContract, Resident
+from src.model.property import Property, Land, House, Apartment, Shop, _FACILITY_NAMES, _facility_bit
+
+MAGIC = b"RPMSNAP\0"
+VERSION = 2
+
+_TYPES = (Property, Land, House, Apartment, Shop)
+_SECTIONS = ("strings", "facilities", "properties", "leases", "residents", "contracts")
+_HEADER = struct.Struct("<8sHI6I6Q")
+_PROPERTY = struct.Struct("<BIIddBddQqqdII")
+_LEASE = struct.Struct("<qIqidqB")
+_RESIDENT = struct.Struct("<qIIqII")
+_CONTRACT = struct.Struct("<qqIIIqqdB")
+
+_OCCUPIED, _HAS_COORDINATES, _FLAG_A, _FLAG_B, _HAS_CURRENT_LEASE = 1, 2, 4, 8, 16
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _to_micros(moment: datetime) -> int:
+    return (moment - _EPOCH) // _MICROSECOND
+
+
+def _from_micros(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=value)
+
+
+class _StringTable:
+    def __init__(self):
+        self._index: dict[str, int] = {}
+
+    def __call__(self, text: str) -> int:
+        index = self._index.get(text)
+        if index is None:
+            index = self._index[text] = len(self._index)
+        return index
+
+    def encode(self) -> bytes:
+        blobs = [text.encode("utf-8") for text in self._index]
+        offsets = array('Q', [0])
+        for blob in blobs:
+            offsets.append(offsets[-1] + len(blob))
+        return offsets.tobytes() + b"".join(blobs)
+
+
+def save_snapshot(rental_company, path: str) -> None:
+    if len(_FACILITY_NAMES) > 64:
+        raise ValueError("Snapshots support at most 64 distinct facilities.")
+    strings = _StringTable()
+    properties, leases, residents, contracts = bytearray(), bytearray(), bytearray(), bytearray()
+    resident_rows: dict[int, int] = {}
+
+    def resident_row(resident: Resident) -> int:
+        row = resident_rows.get(id(resident))
+        if row is None:
+            row = resident_rows[id(resident)] = len(resident_rows)
+            residents.extend(_RESIDENT.pack(resident.user_id, strings(resident.username), strings(resident.password_hash),
+                                            resident.resident_id, strings(resident.name), strings(resident.contact_info)))
+        return row
+
+    lease_count = 0
+    for p in rental_company.properties_list:
+        if type(p) not in _TYPES:
+            raise ValueError(f"Cannot snapshot property type {type(p).__name__}.")
+        history = [*p.history, p.current_lease] if p.current_lease is not None else list(p.history)
+        for lease in history:
+            if not isinstance(lease, LeaseAgreement):
+                raise ValueError(f"Cannot snapshot lease {lease!r} of property {p.property_id}.")
+            leases.extend(_LEASE.pack(lease.lease_id, resident_row(lease.resident), _to_micros(lease.start_date),
+                                      lease.duration_months, lease.monthly_rent, _to_micros(lease.end_date),
+                                      lease._is_active))
+        flags = (_OCCUPIED if p.is_occupied else 0) | (_HAS_COORDINATES if p.coordinates else 0)
+        flags |= _HAS_CURRENT_LEASE if p.current_lease is not None else 0
+        int_field, second_int, float_field = 0, 0, 0.0
+        if isinstance(p, Land):
+            int_field, float_field = strings(p.zoning_type), p.buildable_area
+        elif isinstance(p, House):
+            int_field, second_int = p.num_bedrooms, p.num_bathrooms
+            flags |= _FLAG_A if p.has_garden else 0
+        elif isinstance(p, Apartment):
+            int_field = p.floor_number
+            flags |= (_FLAG_A if p.has_elevator else 0) | (_FLAG_B if p.has_balcony else 0)
+        elif isinstance(p, Shop):
+            int_field = strings(p.business_type)
+            flags |= _FLAG_A if p.parking_available else 0
+        latitude, longitude = p.coordinates or (0.0, 0.0)
+        properties.extend(_PROPERTY.pack(_TYPES.index(type(p)), strings(p.property_id), strings(p.address), p.size,
+                                         p.price, flags, latitude, longitude, p._facilities, int_field, second_int,
+                                         float_field, lease_count, len(history)))
+        lease_count += len(history)
+
+    for contract in rental_company.contracts:
+        if not isinstance(contract, RentalContract):
+            raise ValueError(f"Cannot snapshot contract {contract!r}.")
+        owner = contract.owner
+        contracts.extend(_CONTRACT.pack(contract.contract_id, owner.user_id, strings(owner.username),
+                                        strings(owner.contact_info), strings(contract.property.property_id),
+                                        _to_micros(contract.start_date), _to_micros(contract.end_date),
+                                        contract.commission_fee, contract._is_active))
+
+    company_name = strings(rental_company.company_name)
+    facilities = array('I', (strings(name) for name in _FACILITY_NAMES)).tobytes()
+    sections = [strings.encode(), facilities, bytes(properties), bytes(leases), bytes(residents), bytes(contracts)]
+    counts = [len(strings._index), len(_FACILITY_NAMES), len(rental_company), lease_count, len(resident_rows),
+              len(rental_company.contracts)]
+    offsets, position = [], _HEADER.size
+    for section in sections:
+        offsets.append(position)
+        position += len(section)
+    with open(path, "wb") as handle:
+        handle.write(_HEADER.pack(MAGIC, VERSION, company_name, *counts, *offsets))
+        for section in sections:
+            handle.write(section)
+
+
+class _SnapshotReader:
+    def __init__(self, path: str):
+        with open(path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.company_name_index, *fields = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a rental company snapshot.")
+            raise ValueError(f"Unsupported snapshot version {version}.")
+        self.counts = dict(zip(_SECTIONS, fields[:6]))
+        self.offsets = dict(zip(_SECTIONS, fields[6:]))
+        count = self.counts["strings"]
+        self._string_offsets = array('Q', self._map[self.offsets["strings"]:self.offsets["strings"] + 8 * (count + 1)])
+        self._blob = self.offsets["strings"] + 8 * (count + 1)
+        facilities = array('I', self._map[self.offsets["facilities"]:self.offsets["facilities"] + 4 * self.counts["facilities"]])
+        self._facility_bits = [_facility_bit(self.string(index)) for index in facilities]
+        self._residents: dict[int, Resident] = {}
+
+    def close(self) -> None:
+        self._map.close()
+
+    def string(self, index: int) -> str:
+        start, end = self._string_offsets[index], self._string_offsets[index + 1]
+        return self._map[self._blob + start:self._blob + end].decode("utf-8")
+
+    def property_rows(self):
+        start = self.offsets["properties"]
+        return _PROPERTY.iter_unpack(self._map[start:start + _PROPERTY.size * self.counts["properties"]])
+
+    def _facilities(self, mask: int) -> int:
+        bits = 0
+        for index, bit in enumerate(self._facility_bits):
+            if mask >> index & 1:
+                bits |= bit
+        return bits
+
+    def resident(self, row: int) -> Resident:
+        # A resident's lease_agreements only holds the leases of properties built so far; leases
+        # on properties that are still unloaded join the list when those properties are built.
+        resident = self._residents.get(row)
+        if resident is None:
+            user_id, username, password_hash, resident_id, name, contact_info = _RESIDENT.unpack_from(
+                self._map, self.offsets["residents"] + row * _RESIDENT.size)
+            resident = self._residents[row] = Resident(user_id, self.string(username), self.string(password_hash),
+                                                       resident_id, self.string(name), self.string(contact_info), [])
+        return resident
+
+    def lease(self, row: int, p: Property) -> LeaseAgreement:
+        lease_id, resident_row, start, duration, rent, end, active = _LEASE.unpack_from(
+            self._map, self.offsets["leases"] + row * _LEASE.size)
+        resident = self.resident(resident_row)
+        lease = LeaseAgreement(lease_id, p, resident, _from_micros(start), duration, rent)
+        lease.end_date = _from_micros(end)
+        lease._is_active = active
+        resident.lease_agreements.append(lease)
+        return lease
+
+    def build_property(self, row: int, rental_company) -> Property:
+        (code, property_id, address, size, price, flags, latitude, longitude, facilities, int_field, second_int,
+         float_field, lease_start, lease_count) = _PROPERTY.unpack_from(
+            self._map, self.offsets["properties"] + row * _PROPERTY.size)
+        cls = _TYPES[code]
+        common = (self.string(property_id), self.string(address), size, price, rental_company.company_name)
+        coordinates = (latitude, longitude) if flags & _HAS_COORDINATES else (None, None)
+        if cls is Land:
+            p = Land(*common, self.string(int_field), float_field, *coordinates)
+        elif cls is House:
+            p = House(*common, int_field, second_int, *coordinates)
+            p.has_garden = bool(flags & _FLAG_A)
+        elif cls is Apartment:
+            p = Apartment(*common, int_field, *coordinates)
+            p.has_elevator, p.has_balcony = bool(flags & _FLAG_A), bool(flags & _FLAG_B)
+        elif cls is Shop:
+            p = Shop(*common, self.string(int_field), *coordinates)
+            p.parking_available = bool(flags & _FLAG_A)
+        else:
+            p = Property(*common, *coordinates)
+        p._is_occupied = bool(flags & _OCCUPIED)
+        p._facilities = self._facilities(facilities)
+        leases = [self.lease(lease_row, p) for lease_row in range(lease_start, lease_start + lease_count)]
+        if flags & _HAS_CURRENT_LEASE:
+            p.current_lease = leases.pop()
+            if p.current_lease._is_active:
+                p.current_lease.resident.current_lease = p.current_lease
+        if leases:
+            p._history = leases
+        p._watchers = (rental_company,)
+        return p
+
+    def contracts(self, rental_company) -> list[RentalContract]:
+        owners: dict[int, Owner] = {}
+        contracts = []
+        for row in range(self.counts["contracts"]):
+            contract_id, owner_id, name, contact_info, property_id, start, end, commission, active = (
+                _CONTRACT.unpack_from(self._map, self.offsets["contracts"] + row * _CONTRACT.size))
+            owner = owners.get(owner_id)
+            if owner is None:
+                owner = owners[owner_id] = Owner(owner_id, self.string(name), self.string(contact_info), [])
+            p = rental_company.get_property(self.string(property_id))
+            contract = RentalContract(contract_id, owner, p, _from_micros(start), _from_micros(end), commission)
+            contract._is_active = bool(active)
+            contracts.append(contract)
+        return contracts
+
+
+class _LazyProperties(MutableMapping):
+    def __init__(self, reader: _SnapshotReader, rental_company, rows: dict[str, int]):
+        self._reader = reader
+        self._company = rental_company
+        self._entries: dict = rows
+
+    def __getitem__(self, property_id: str) -> Property:
+        value = self._entries[property_id]
+        if type(value) is int:
+            value = self._entries[property_id] = self._reader.build_property(value, self._company)
+        return value
+
+    def get(self, property_id: str, default=None):
+        return self[property_id] if property_id in self._entries else default
+
+    def __setitem__(self, property_id: str, property: Property) -> None:
+        self._entries[property_id] = property
+
+    def __delitem__(self, property_id: str) -> None:
+        del self._entries[property_id]
+
+    def __contains__(self, property_id) -> bool:
+        return property_id in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def loaded(self) -> int:
+        return sum(1 for value in self._entries.values() if type(value) is not int)
+
+    def close(self) -> None:
+        # Builds every unit that is still only a row, then releases the snapshot file.
+        if self._reader is None:
+            return
+        for property_id in self._entries:
+            self[property_id]
+        self._reader.close()
+        self._reader = None
+
+
+def load_snapshot(path: str, company_class):
+    reader = _SnapshotReader(path)
+    rental_company = company_class(reader.string(reader.company_name_index))
+    rows: dict[str, int] = {}
+    entries, addresses = [], []
+    for row, (code, property_id, address, size, price, flags, latitude, longitude, *_) in enumerate(reader.property_rows()):
+        property_id = reader.string(property_id)
+        rows[property_id] = row
+        entries.append((property_id, _TYPES[code], price, bool(flags & _OCCUPIED),
+                        (latitude, longitude) if flags & _HAS_COORDINATES else None))
+        addresses.append((property_id, address))
+    properties = _LazyProperties(reader, rental_company, rows)
+    try:
+        rental_company._restore(properties, entries,
+                                ((property_id, reader.string(address)) for property_id, address in addresses))
+        rental_company.contracts = reader.contracts(rental_company)
+    except BaseException:
+        reader.close()
+        raise
+    return rental_company
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import time
+from abc import ABC, abstractmethod
+
+from src.scripts.task2 import Notification
+
+
+class Transport(ABC):
+    @abstractmethod
+    async def send(self, recipient, messages: list[str]) -> None:
+        ...
+
+
+class InMemoryTransport(Transport):
+    def __init__(self, failures: int = 0):
+        self.sent: list[tuple[object, list[str]]] = []
+        self.failures = failures
+
+    async def send(self, recipient, messages: list[str]) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("Transport unavailable.")
+        self.sent.append((recipient, list(messages)))
+
+
+class FileTransport(Transport):
+    def __init__(self, path: str):
+        self.path = path
+
+    async def send(self, recipient, messages: list[str]) -> None:
+        line = json.dumps({"recipient": getattr(recipient, "user_id", str(recipient)), "messages": messages})
+        await asyncio.to_thread(self._append, line)
+
+    def _append(self, line: str) -> None:
+        with open(self.path, "a") as handle:
+            handle.write(line + "\n")
+
+
+class DispatchStats:
+    def __init__(self):
+        self.notifications = 0
+        self.deliveries = 0
+        self.retries = 0
+        self.failed = 0
+        self.elapsed = 0.0
+
+    def __repr__(self):
+        return (f"DispatchStats(notifications={self.notifications}, deliveries={self.deliveries}, "
+                f"retries={self.retries}, failed={self.failed}, messages_per_second={self.messages_per_second:.0f})")
+
+    @property
+    def messages_per_second(self) -> float:
+        return self.notifications / self.elapsed if self.elapsed else 0.0
+
+
+class NotificationDispatcher:
+    def __init__(self, transport: Transport, concurrency: int = 10, max_queue: int = 1000, batch_size: int = 100,
+                 retries: int = 3, retry_delay: float = 0.05):
+        self.transport = transport
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.stats = DispatchStats()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._workers: list[asyncio.Task] = []
+        self._started = None
+
+    async def start(self) -> None:
+        self._started = time.perf_counter()
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def submit(self, notification: Notification) -> None:
+        # Blocks while the queue is full, which pushes back on the producer.
+        await self._queue.put(notification)
+
+    async def close(self) -> DispatchStats:
+        if self._started is None:
+            return self.stats
+        await self._queue.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self.stats.elapsed = time.perf_counter() - self._started
+        return self.stats
+
+    async def dispatch(self, notifications) -> DispatchStats:
+        await self.start()
+        for notification in notifications:
+            await self.submit(notification)
+        return await self.close()
+
+    def _drain(self, first: Notification) -> list[Notification]:
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _worker(self) -> None:
+        while True:
+            batch = self._drain(await self._queue.get())
+            # Coalescing only spans this worker's drained batch: a recipient whose notifications land in
+            # different batches or workers gets one transport call per batch.
+            try:
+                grouped: dict[int, list[Notification]] = {}
+                for notification in batch:
+                    grouped.setdefault(id(notification.recipient), []).append(notification)
+                for notifications in grouped.values():
+                    await self._deliver(notifications)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _deliver(self, notifications: list[Notification]) -> None:
+        recipient = notifications[0].recipient
+        messages = [notification.message for notification in notifications]
+        for attempt in range(self.retries + 1):
+            try:
+                await self.transport.send(recipient, messages)
+                break
+            except Exception:
+                if attempt == self.retries:
+                    self.stats.failed += len(notifications)
+                    for notification in notifications:
+                        notification.status = "Failed"
+                    return
+                self.stats.retries += 1
+                await asyncio.sleep(self.retry_delay * 2 ** attempt)
+        self.stats.deliveries += 1
+        self.stats.notifications += len(notifications)
+        for notification in notifications:
+            notification.status = "Sent"
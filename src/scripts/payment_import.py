@@ -0,0 +1,100 @@
+import csv
+import json
+import time
+from datetime import date, datetime
+from itertools import islice
+
+from src.model import LeaseAgreement
+from src.scripts.task2 import Payment, PaymentHistory
+
+
+class ImportStats:
+    def __init__(self):
+        self.rows = 0
+        self.applied = 0
+        self.unmatched = 0
+        self.invalid = 0
+        self.elapsed = 0.0
+
+    def __repr__(self):
+        return (f"ImportStats(rows={self.rows}, applied={self.applied}, unmatched={self.unmatched}, "
+                f"invalid={self.invalid}, rows_per_second={self.rows_per_second:.0f})")
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+class PaymentImporter:
+    date_cache_size = 4096
+
+    def __init__(self, leases, history: PaymentHistory, batch_size: int = 10_000):
+        self.leases: dict[str, LeaseAgreement] = {str(lease.lease_id): lease for lease in leases}
+        self.history = history
+        self.batch_size = batch_size
+        self._dates: dict[str, date] = {}
+
+    def parse_date(self, text: str) -> date:
+        parsed = self._dates.get(text)
+        if parsed is None:
+            try:
+                parsed = date.fromisoformat(text)
+            except ValueError:
+                parsed = datetime.strptime(text, "%Y-%m-%d").date()
+            if len(self._dates) >= self.date_cache_size:
+                self._dates.clear()
+            self._dates[text] = parsed
+        return parsed
+
+    def _build(self, row: dict, stats: ImportStats):
+        if not isinstance(row, dict):
+            stats.invalid += 1
+            return None
+        lease = self.leases.get(str(row.get("lease_id")))
+        if lease is None:
+            stats.unmatched += 1
+            return None
+        try:
+            payment = Payment(lease, float(row["amount"]), self.parse_date(row["due_date"]))
+            if row.get("payment_date"):
+                payment.settle(self.parse_date(row["payment_date"]))
+        except (KeyError, TypeError, ValueError):
+            stats.invalid += 1
+            return None
+        return payment
+
+    def import_rows(self, rows) -> ImportStats:
+        stats = ImportStats()
+        started = time.perf_counter()
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.batch_size))
+            if not chunk:
+                break
+            stats.rows += len(chunk)
+            payments = [payment for payment in (self._build(row, stats) for row in chunk) if payment is not None]
+            self.history.add_payments(payments)
+            stats.applied += len(payments)
+        stats.elapsed = time.perf_counter() - started
+        return stats
+
+    def import_csv(self, path: str) -> ImportStats:
+        with open(path, newline="") as handle:
+            return self.import_rows(csv.DictReader(handle))
+
+    def import_jsonl(self, path: str) -> ImportStats:
+        with open(path) as handle:
+            return self.import_rows(self._json_rows(handle))
+
+    def _json_rows(self, lines):
+        for line in lines:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield None
+
+    def import_file(self, path: str) -> ImportStats:
+        if str(path).endswith((".jsonl", ".ndjson")):
+            return self.import_jsonl(path)
+        return self.import_csv(path)
@@ -0,0 +1,63 @@
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; penalties are then computed row by row
+    np = None
+
+
+class PenaltyRule:
+    def __init__(self, base_rate: float = 0.05, daily_rate: float = 0.02, grace_days: int = 1):
+        self.base_rate = base_rate
+        self.daily_rate = daily_rate
+        self.grace_days = grace_days
+
+    def __repr__(self):
+        return f"PenaltyRule(base_rate={self.base_rate}, daily_rate={self.daily_rate}, grace_days={self.grace_days})"
+
+    def penalty(self, amount: float, days_late: float) -> float:
+        base_penalty = amount * self.base_rate
+        additional_penalty = (days_late - self.grace_days) * self.daily_rate * amount if days_late > self.grace_days else 0
+        return round(base_penalty + additional_penalty, 2)
+
+
+DEFAULT_PENALTY_RULE = PenaltyRule()
+
+
+def rule_for(lease) -> PenaltyRule:
+    return getattr(lease, "penalty_rule", None) or DEFAULT_PENALTY_RULE
+
+
+def calculate_penalties(amounts, days_late, rule: PenaltyRule = DEFAULT_PENALTY_RULE):
+    if np is None:
+        fees = [rule.penalty(amount, days) for amount, days in zip(amounts, days_late)]
+        return fees, [amount + fee for amount, fee in zip(amounts, fees)]
+    amounts = np.asarray(amounts, dtype=float)
+    days_late = np.asarray(days_late)
+    base_penalty = amounts * rule.base_rate
+    additional_penalty = np.where(days_late > rule.grace_days,
+                                  (days_late - rule.grace_days) * rule.daily_rate * amounts, 0.0)
+    raw = base_penalty + additional_penalty
+    scaled = raw * 100
+    fees = np.rint(scaled) / 100
+    # Away from a half cent, rint agrees with round(fee, 2); the few fees that sit on a half cent go
+    # through round itself, which rounds their exact binary value.
+    for position in np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6):
+        fees[position] = round(float(raw[position]), 2)
+    return fees, amounts + fees
+
+
+def assess_payments(payments, today: date = None) -> tuple[list[float], float]:
+    today = today or date.today()
+    groups: dict[PenaltyRule, list[int]] = {}
+    for position, payment in enumerate(payments):
+        if payment.due_date < today:
+            groups.setdefault(rule_for(payment.lease), []).append(position)
+    fees = [0.0] * len(payments)
+    for rule, positions in groups.items():
+        amounts = [payments[position].amount for position in positions]
+        days_late = [(today - payments[position].due_date).days for position in positions]
+        group_fees, _ = calculate_penalties(amounts, days_late, rule)
+        for position, fee in zip(positions, group_fees):
+            fees[position] = float(fee)
+    return fees, sum(fees)
@@ -1,25 +1,54 @@
-from datetime import datetime
+import heapq
+from datetime import date, datetime
 
 from src.model import LeaseAgreement, User
+from src.model.indexes import PrefixSums
+from src.model.instrumentation import timed
+from src.scripts.penalties import rule_for
 from src.model.maintenance import Event
 
 class Payment:
     def __init__(self,lease: 'LeaseAgreement', amount: float, due_date: str):
+        self._histories = ()
         self.amount = amount
         self.lease = lease
-        self.due_date = datetime.strptime(due_date, "%Y-%m-%d").date()
-        self.payment_date = None
-        self.status = "Pending"
+        self.due_date = due_date if isinstance(due_date, date) else datetime.strptime(due_date, "%Y-%m-%d").date()
+        self._payment_date = None
+        self._status = "Pending"
+
+    @property
+    def status(self):
+        return self._status
+
+    @status.setter
+    def status(self, value) -> None:
+        self._status = value
+        for history in self._histories:
+            history.refresh(self)
+
+    @property
+    def payment_date(self):
+        return self._payment_date
+
+    @payment_date.setter
+    def payment_date(self, value) -> None:
+        self._payment_date = value
+        for history in self._histories:
+            history.refresh(self)
+
+    @timed("payments.settle")
+    def settle(self, payment_date: date) -> bool:
+        self._payment_date = payment_date
+        self.status = "Paid" if payment_date <= self.due_date else "Late"
+        return self.status == "Paid"
 
     def process_payment(self, payment_date: str):
-        self.payment_date = datetime.strptime(payment_date, "%Y-%m-%d").date()
-        if self.payment_date <= self.due_date:
-            self.status = "Paid"
-            event = Event(f"Payment of {self.amount} for lease {self.lease} is paid on time.")
+        if self.settle(datetime.strptime(payment_date, "%Y-%m-%d").date()):
+            event = Event(True, f"Payment of {self.amount} for lease {self.lease} is paid on time.")
             return event
         else:
-            self.status = "Late"
-            event = Event(f"Payment of {self.amount} for lease {self.lease} is late.")
+            event = Event(True, f"Payment of {self.amount} for lease {self.lease} is late.")
+            return event
     
     def is_late(self) -> bool:
         return self.status == "Late"
@@ -31,44 +60,90 @@ class LatePayment(Payment):
         self.days_late = days_late
         self.late_fee = self._calculate_penalty()
         self.total_amount = self.amount + self.late_fee
-        self.status = self.is_late()
+        self.status = "Late"
 
     def _calculate_penalty(self):
-        base_penalty = self.amount * 0.05  # 5% of the payment amount
-        additional_penalty = (self.days_late - 1) * 0.02 * self.amount if self.days_late > 1 else 0
-        return round(base_penalty + additional_penalty, 2)
+        return rule_for(self.lease).penalty(self.amount, self.days_late)
     
     @classmethod
-    def from_payment(cls, payment: Payment):
-        days_late = (datetime.now().date() - payment.due_date).days
-        return cls(payment.lease, payment.amount, payment.due_date.strftime("%Y-%m-%d"), days_late)
+    def from_payment(cls, payment: Payment, today: date = None):
+        days_late = ((today or datetime.now().date()) - payment.due_date).days
+        return cls(payment.lease, payment.amount, payment.due_date, days_late)
     def __str__(self):
         return f"Late Payment of {self.total_amount} for lease {self.lease} on {self.due_date} - Days Late: {self.days_late}, Late Fee: {self.late_fee}"
 
 class PaymentHistory:
     def __init__(self):
         self.payments = []
+        self._indexed: dict[Payment, tuple] = {}
+        self._by_status: dict[str, dict[Payment, None]] = {}
+        # Running totals are kept in integer cents so repeated status flips cannot drift; whatever an
+        # amount has below a cent is tracked separately so totals still add up to the amounts paid.
+        self._revenue = PrefixSums()
+        self._revenue_rest = PrefixSums()
+        self._paid_cents = 0
+        self._paid_rest = 0.0
+
+    def _index(self, payment: Payment) -> None:
+        status, payment_date = payment.status, payment.payment_date
+        revenue = payment.total_amount if isinstance(payment, LatePayment) else payment.amount
+        amount, revenue_cents = round(payment.amount * 100), round(revenue * 100)
+        amount_rest, revenue_rest = payment.amount - amount / 100, revenue - revenue_cents / 100
+        self._indexed[payment] = (status, payment_date, amount, revenue_cents, amount_rest, revenue_rest)
+        self._by_status.setdefault(status, {})[payment] = None
+        if status == "Paid":
+            self._paid_cents += amount
+            self._paid_rest += amount_rest
+            if payment_date is not None:
+                self._revenue.add(payment_date, revenue_cents)
+                if revenue_rest:
+                    self._revenue_rest.add(payment_date, revenue_rest)
+
+    def _unindex(self, payment: Payment) -> None:
+        status, payment_date, amount, revenue, amount_rest, revenue_rest = self._indexed.pop(payment)
+        del self._by_status[status][payment]
+        if status == "Paid":
+            self._paid_cents -= amount
+            self._paid_rest -= amount_rest
+            if payment_date is not None:
+                self._revenue.add(payment_date, -revenue)
+                if revenue_rest:
+                    self._revenue_rest.add(payment_date, -revenue_rest)
+
+    def refresh(self, payment: Payment) -> None:
+        if payment in self._indexed:
+            self._unindex(payment)
+            self._index(payment)
 
     def add_payment(self, payment: Payment):
+        if payment in self._indexed:
+            return
         self.payments.append(payment)
-    
+        self._index(payment)
+        payment._histories += (self,)
+
+    @timed("payments.add_payments")
+    def add_payments(self, payments: list[Payment]):
+        for payment in payments:
+            self.add_payment(payment)
+
+    def get_payments_by_status(self, status: str):
+        return list(self._by_status.get(status, ()))
+
     def get_unpaid_payments(self):
-        return [payment for payment in self.payments if payment.status == "Pending"]
+        return self.get_payments_by_status("Pending")
 
     def get_payments(self):
         return self.payments
     
+    @timed("payments.total_revenue")
     def total_revenue(self, start_date: str, end_date: str):
         start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
         end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
-        return sum(
-            t.amount if not isinstance(t, LatePayment) else t.total_amount
-            for t in self.payments
-            if t.status == "Paid" and start_date <= t.payment_date <= end_date
-        )
+        return self._revenue.total(start_date, end_date) / 100 + self._revenue_rest.total(start_date, end_date)
 
     def get_total_payments(self):
-        return sum(payment.amount for payment in self.payments if payment.status == "Paid")
+        return self._paid_cents / 100 + self._paid_rest
     
 class Notification:
     def __init__(self,notification_id: int, message: str, recipient: User):
@@ -77,13 +152,60 @@ class Notification:
         self.recipient = recipient
         self.status = "Unread"
     
+    @staticmethod
+    def reminder_message(payment: Payment, days_late: int) -> str:
+        return (f"Reminder: Payment of {payment.amount} for lease {payment.lease} is overdue by {days_late} days."
+                f"Please pay as soon as possible.{payment.lease.resident.name}")
+
     def check_unpaid_payments(self):
         today = datetime.now().date()
         reminders = []
         for payment in self.recipient.payment_history.get_unpaid_payments():
             if payment.due_date < today:
                 days_late = (today - payment.due_date).days
-                reminders.append(LatePayment.from_payment(payment))(
-                    f"Reminder: Payment of {payment.amount} for lease {payment.lease} is overdue by {days_late} days."
-                    f"Please pay as soon as possible.{payment.lease.resident.name}")
-        return reminders
\ No newline at end of file
+                reminders.append(Notification(self.notification_id, self.reminder_message(payment, days_late),
+                                              self.recipient))
+        return reminders
+
+
+class PaymentScheduler:
+    def __init__(self, payments: list[Payment] = None):
+        self._heap: list[tuple[date, int, Payment]] = []
+        self._sequence = 0
+        self._next_notification_id = 1
+        if payments:
+            self.schedule_many(payments)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def _entry(self, payment: Payment) -> tuple[date, int, Payment]:
+        self._sequence += 1
+        return payment.due_date, self._sequence, payment
+
+    def schedule(self, payment: Payment) -> None:
+        if payment.status == "Pending":
+            heapq.heappush(self._heap, self._entry(payment))
+
+    def schedule_many(self, payments: list[Payment]) -> None:
+        self._heap.extend(self._entry(payment) for payment in payments if payment.status == "Pending")
+        heapq.heapify(self._heap)
+
+    def next_due_date(self):
+        return self._heap[0][0] if self._heap else None
+
+    @timed("payments.scheduler_tick")
+    def tick(self, today: date = None) -> tuple[list[LatePayment], list[Notification]]:
+        today = today or datetime.now().date()
+        late_payments, reminders = [], []
+        while self._heap and self._heap[0][0] < today:
+            _, _, payment = heapq.heappop(self._heap)
+            if payment.status != "Pending":
+                continue
+            late_payment = LatePayment.from_payment(payment, today)
+            late_payments.append(late_payment)
+            reminders.append(Notification(self._next_notification_id,
+                                          Notification.reminder_message(payment, late_payment.days_late),
+                                          payment.lease.resident))
+            self._next_notification_id += 1
+        return late_payments, reminders
@@ -1,5 +1,5 @@
 import pytest
-from datetime import timedelta
+from datetime import date, timedelta
 
 from src.model import *
 
@@ -86,3 +86,75 @@ def test_rental_contract_commission(sample_property):
     contract = RentalContract(1, owner, sample_property, "2024-03-23", '2025-04-15', 10.0)
     commission = contract.calculate_commission()
     assert commission == sample_property.price * 0.1
+
+@pytest.fixture
+def lease_registry(sample_property, sample_resident):
+    leases = [
+        LeaseAgreement(10, sample_property, sample_resident, "2026-01-01", 6, 900.0),
+        LeaseAgreement(11, sample_property, sample_resident, "2026-03-15", 1, 950.0),
+        LeaseAgreement(12, sample_property, sample_resident, "2025-02-01", 12, 800.0),
+    ]
+    return LeaseRegistry(leases), leases
+
+def test_lease_registry_active_on(lease_registry):
+    registry, (first, second, third) = lease_registry
+    assert registry.active_on(datetime(2026, 3, 1)) == [first]
+    assert registry.active_on(date(2026, 4, 1)) == [first, second]
+    assert registry.active_on(datetime(2026, 4, 15)) == [first]
+    assert registry.active_between(datetime(2025, 12, 1), datetime(2026, 2, 1)) == [third, first]
+
+def test_lease_registry_ending_within(lease_registry):
+    registry, (first, second, third) = lease_registry
+    assert registry.ending_within(30, today=date(2026, 4, 1)) == [second]
+    assert registry.ending_between(date(2026, 1, 1), date(2026, 12, 31)) == [third, second, first]
+
+def test_lease_registry_follows_renew_and_terminate(lease_registry):
+    registry, (first, second, third) = lease_registry
+    second.renew(2)
+    assert registry.ending_within(30, today=date(2026, 4, 1)) == []
+    assert second in registry.active_on(datetime(2026, 6, 1))
+    third.terminate()
+    assert registry.ending_within(1) == [third]
+    registry.remove(third)
+    assert len(registry) == 2 and third not in registry
+
+def test_months_after_clamps_to_month_end():
+    assert months_after(2024, 1, 31, 1) == datetime(2024, 2, 29)
+    assert months_after(2023, 11, 30, 3) == datetime(2024, 2, 29)
+    assert months_after(2025, 1, 31, 13) == datetime(2026, 2, 28)
+
+def test_expiry_calendar_buckets_by_end_date(lease_registry):
+    _, (first, second, third) = lease_registry
+    calendar = ExpiryCalendar([first, second, third])
+    assert calendar.expiring_within(30, today=date(2026, 4, 1)) == [second]
+    assert calendar.expiring_on(date(2026, 7, 1)) == [first]
+    assert calendar.counts_by_day(date(2026, 1, 1), date(2026, 12, 31)) == {date(2026, 2, 1): 1, date(2026, 4, 15): 1,
+                                                                              date(2026, 7, 1): 1}
+    third.terminate()
+    assert third in calendar and calendar.expiring_between(date(2000, 1, 1), date(2100, 1, 1)) == [second, first]
+
+def test_renew_many_updates_every_registry_in_one_batch(lease_registry):
+    registry, (first, second, third) = lease_registry
+    calendar = ExpiryCalendar([first, second, third])
+    event = renew_many([first, second], 3)
+    assert "Renewed 2 leases" in event.text
+    assert first.end_date == datetime(2026, 10, 1) and second.end_date == datetime(2026, 7, 15)
+    assert calendar.expiring_within(30, today=date(2026, 4, 1)) == []
+    assert calendar.expiring_on(date(2026, 7, 15)) == [second]
+    assert registry.ending_between(date(2026, 1, 1), date(2026, 12, 31)) == [third, second, first]
+    assert second in registry.active_on(datetime(2026, 6, 1))
+
+def test_terminating_through_the_property_updates_registries(sample_property, sample_resident):
+    lease = LeaseAgreement(13, sample_property, sample_resident, datetime.now() - timedelta(days=30), 12, 900.0)
+    registry, calendar = LeaseRegistry([lease]), ExpiryCalendar([lease])
+    sample_property.add_lease(lease)
+    sample_property.terminate_lease()
+    assert registry.active_on(datetime.now() + timedelta(days=30)) == []
+    assert registry.ending_within(1) == [lease]
+    assert calendar.expiring_within(400) == []
+
+def test_assigned_properties_behave_like_a_list(sample_property):
+    owner = Owner(1, "Olivia", "olivia@email.com", [sample_property])
+    assert owner.get_properties() == [sample_property]
+    assert owner.get_properties()[0] is sample_property and owner.get_properties()[-1:] == [sample_property]
+    assert len(owner.get_properties()) == 1 and owner.get_properties() != [sample_property, sample_property]
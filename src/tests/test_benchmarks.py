@@ -0,0 +1,32 @@
+from datetime import date
+
+from src.benchmarks.portfolio import generate_portfolio, parse_size
+from src.benchmarks.suite import compare, run
+
+def test_generated_portfolio_is_consistent():
+    portfolio = generate_portfolio(500, seed=3)
+    company = portfolio.company
+    assert len(company) == 500 and parse_size("100k") == 100_000
+    occupied = [p for p in company.properties_list if p.is_occupied]
+    assert all(p.current_lease.start_date.date() <= date(2025, 1, 1) < p.current_lease.end_date.date() for p in occupied)
+    assert len(portfolio.payments.payments) == 3 * len(occupied)
+    assert generate_portfolio(500, seed=3).company.properties_list[42].price == company.properties_list[42].price
+
+def test_run_and_compare_against_baseline():
+    results = run(["300"], repeat=1, only="search")
+    timings = results["runs"]["300"]["benchmarks"]
+    assert {"search.by_location", "search.by_price", "search.query_page"} <= timings.keys()
+    baseline = {"format": 1, "runs": {"300": {"units": 300, "benchmarks": {
+        "search.by_location": {"seconds": timings["search.by_location"]["seconds"] / 2},
+        "search.by_price": {"seconds": timings["search.by_price"]["seconds"] * 2},
+        "search.query_page": {"seconds": timings["search.query_page"]["seconds"]},
+    }}}}
+    statuses = {row["name"]: row["status"] for row in compare(results, baseline, tolerance=0.25)}
+    assert statuses["search.by_location"] == "regressed"
+    assert statuses["search.by_price"] == "improved"
+    assert statuses["search.query_page"] == "ok"
+    assert statuses["search.by_availability"] == "new"
+
+def test_lease_lifecycle_benchmarks():
+    timings = run(["200"], repeat=1, only="lease")["runs"]["200"]["benchmarks"]
+    assert {"lease.renew", "lease.renew_many", "lease.terminate"} <= timings.keys()
@@ -0,0 +1,46 @@
+import pytest
+from src.model import columns as columns_module
+from src.model.columns import PortfolioColumns, round_cents
+from src.model.property import Property, House, Apartment
+
+@pytest.fixture(params=["numpy", "stdlib"])
+def columns(request, monkeypatch):
+    if request.param == "numpy" and columns_module.np is None:
+        pytest.skip("NumPy is not installed")
+    if request.param == "stdlib":
+        monkeypatch.setattr(columns_module, "np", None)
+    store = PortfolioColumns()
+    store.extend([
+        House("H1", "Green Street", 200.0, 1500.0, "Col Homes", 3, 2),
+        Apartment("A1", "Towers", 80.0, 900.0, "Col Homes", 4),
+        Apartment("A2", "Heights", 70.0, 950.0, "Col Homes", 2),
+    ])
+    return store
+
+def test_select_by_type_and_price(columns):
+    assert columns.select(property_type=Apartment) == ["A1", "A2"]
+    assert columns.select(property_type=Property, max_price=1000) == ["A1", "A2"]
+    assert columns.select(min_price=1000) == ["H1"]
+
+def test_remove_swaps_last_row(columns):
+    columns.remove("H1")
+    assert columns.property_ids == ["A2", "A1"]
+    columns.update("A1", "is_occupied", True)
+    assert columns.select(occupied=True) == ["A1"]
+
+def test_scale_prices_rounds_to_cents(columns):
+    assert columns.scale_prices(1.03, Apartment) == [("A1", 927.0), ("A2", 978.5)]
+    assert columns.price[0] == 1500.0
+
+def test_aggregate_by_type(columns):
+    columns.update("A2", "is_occupied", True)
+    assert columns.aggregate() == {"House": (1, 0, 1500.0, 1500.0), "Apartment": (2, 1, 1850.0, 900.0)}
+
+def test_round_cents():
+    assert round_cents(1000 * 1.03) == 1030.0
+
+def test_column_is_a_copy_that_does_not_pin_the_store(columns):
+    prices = columns.column("price")
+    columns.append(Apartment("A3", "Plaza", 60.0, 700.0, "Col Homes", 1))
+    columns.remove("H1")
+    assert list(prices) == [1500.0, 900.0, 950.0] and len(columns) == 3
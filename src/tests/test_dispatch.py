@@ -0,0 +1,67 @@
+import asyncio
+import json
+import pytest
+
+from src.model import User
+from src.scripts.dispatch import NotificationDispatcher, InMemoryTransport, FileTransport, Transport
+from src.scripts.task2 import Notification
+
+@pytest.fixture
+def recipients():
+    return [User(user_id, f"user{user_id}", "hash", "resident") for user_id in range(3)]
+
+def make_notifications(recipients, per_recipient=4):
+    return [Notification(index, f"message {index}", recipients[index % len(recipients)])
+            for index in range(per_recipient * len(recipients))]
+
+def test_dispatcher_coalesces_by_recipient(recipients):
+    transport = InMemoryTransport()
+    notifications = make_notifications(recipients)
+    dispatcher = NotificationDispatcher(transport, concurrency=1, batch_size=50)
+    stats = asyncio.run(dispatcher.dispatch(notifications))
+    assert stats.notifications == 12
+    assert stats.deliveries == len(transport.sent) == 3
+    assert sorted(len(messages) for _, messages in transport.sent) == [4, 4, 4]
+    assert all(notification.status == "Sent" for notification in notifications)
+    assert stats.messages_per_second > 0
+
+def test_dispatcher_retries_and_fails(recipients):
+    transport = InMemoryTransport(failures=2)
+    dispatcher = NotificationDispatcher(transport, concurrency=1, retries=2, retry_delay=0)
+    stats = asyncio.run(dispatcher.dispatch(make_notifications(recipients[:1], 1)))
+    assert (stats.retries, stats.failed, stats.deliveries) == (2, 0, 1)
+
+    transport = InMemoryTransport(failures=5)
+    notification = Notification(1, "hello", recipients[0])
+    dispatcher = NotificationDispatcher(transport, concurrency=1, retries=1, retry_delay=0)
+    stats = asyncio.run(dispatcher.dispatch([notification]))
+    assert stats.failed == 1 and notification.status == "Failed"
+
+def test_dispatcher_applies_backpressure(recipients):
+    async def scenario():
+        dispatcher = NotificationDispatcher(InMemoryTransport(), concurrency=1, max_queue=2)
+        for notification in make_notifications(recipients, 1)[:2]:
+            await dispatcher.submit(notification)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(dispatcher.submit(Notification(9, "late", recipients[0])), 0.01)
+        await dispatcher.start()
+        return await dispatcher.close()
+    assert asyncio.run(scenario()).notifications == 2
+
+def test_file_transport(recipients, tmp_path):
+    path = tmp_path / "outbox.jsonl"
+    dispatcher = NotificationDispatcher(FileTransport(str(path)), concurrency=2)
+    asyncio.run(dispatcher.dispatch(make_notifications(recipients, 2)))
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert sum(len(line["messages"]) for line in lines) == 6
+
+def test_close_without_start_returns_empty_stats():
+    stats = asyncio.run(NotificationDispatcher(InMemoryTransport()).close())
+    assert (stats.notifications, stats.elapsed) == (0, 0.0)
+
+def test_incomplete_transport_fails_on_creation():
+    class Silent(Transport):
+        pass
+
+    with pytest.raises(TypeError):
+        Silent()
@@ -0,0 +1,116 @@
+import pytest
+from datetime import date
+from src.model.indexes import AddressIndex, IntervalTree, MembershipIndex, PrefixSums, SortedIndex, SpatialIndex, haversine
+
+@pytest.fixture
+def price_index():
+    index = SortedIndex()
+    for property_id, price in [("P1", 900.0), ("P2", 1200.0), ("P3", 1000.0), ("P4", 1000.0)]:
+        index.add(property_id, price)
+    return index
+
+@pytest.fixture
+def address_index():
+    index = AddressIndex()
+    index.add("P1", "12 Green Street")
+    index.add("P2", "City Center")
+    index.add("P3", "Greenwich Road")
+    return index
+
+def test_price_index_range_is_sorted(price_index):
+    assert price_index.range(950, 1200) == ["P3", "P4", "P2"]
+    assert price_index.count(950, 1200) == 3
+    assert price_index.range(1300, 1400) == []
+
+def test_price_index_remove_duplicate_price(price_index):
+    price_index.remove("P3", 1000.0)
+    assert price_index.range(1000, 1000) == ["P4"]
+
+def test_price_index_add_many(price_index):
+    price_index.add_many([(950.0, "P5"), (100.0, "P6")])
+    assert price_index.range(0, 1000) == ["P6", "P1", "P5", "P3", "P4"]
+
+def test_address_index_short_and_long_queries(address_index):
+    assert address_index.candidates("gre") == ["P1", "P3"]
+    assert address_index.candidates("y") == ["P2"]
+    assert set(address_index.candidates("Green St")) == {"P1"}
+
+def test_address_index_remove(address_index):
+    address_index.remove("P1", "12 Green Street")
+    assert address_index.candidates("green") == ["P3"]
+
+def test_haversine_known_distance():
+    # Nairobi to Mombasa is roughly 440 km as the crow flies.
+    assert 430 < haversine(-1.2921, 36.8219, -4.0435, 39.6682) < 450
+
+def test_spatial_index_nearest_matches_brute_force():
+    index = SpatialIndex(cell_km=2.0)
+    points = {f"P{i}": (-1.2 + (i % 17) * 0.013, 36.7 + (i // 17) * 0.011) for i in range(200)}
+    for property_id, (lat, lon) in points.items():
+        index.add(property_id, lat, lon)
+    expected = sorted((haversine(-1.15, 36.8, lat, lon), property_id) for property_id, (lat, lon) in points.items())
+    result = index.nearest(-1.15, 36.8, k=5)
+    assert [property_id for _, property_id in result] == [property_id for _, property_id in expected[:5]]
+    assert result[0][0] == pytest.approx(expected[0][0])
+
+def test_spatial_index_max_km_and_remove():
+    index = SpatialIndex()
+    index.add("near", 0.0, 0.0)
+    index.add("far", 0.0, 10.0)
+    assert [property_id for _, property_id in index.nearest(0.0, 0.1, k=2, max_km=50)] == ["near"]
+    index.remove("near", 0.0, 0.0)
+    assert [property_id for _, property_id in index.nearest(0.0, 0.1)] == ["far"]
+    assert len(index) == 1
+
+def test_interval_tree_matches_brute_force():
+    import random
+    rng = random.Random(7)
+    tree = IntervalTree()
+    intervals = {}
+    for sequence in range(300):
+        start = rng.randint(0, 1000)
+        intervals[sequence] = (start, start + rng.randint(1, 120))
+        tree.add(start, sequence, intervals[sequence][1], sequence)
+    for sequence in range(0, 300, 3):
+        tree.remove(intervals.pop(sequence)[0], sequence)
+    assert len(tree) == len(intervals)
+    for point in range(0, 1100, 37):
+        expected = sorted((start, s) for s, (start, end) in intervals.items() if start <= point < end)
+        assert tree.containing(point) == [s for _, s in expected]
+    expected = sorted((start, s) for s, (start, end) in intervals.items() if start < 500 and end > 450)
+    assert tree.overlapping(450, 500) == [s for _, s in expected]
+
+def test_prefix_sums_out_of_order_updates():
+    sums = PrefixSums()
+    for key, amount in [(5, 10.0), (1, 2.0), (9, 4.0), (5, 1.0)]:
+        sums.add(key, amount)
+    assert sums.total(1, 5) == 13.0
+    sums.add(3, 100.0)
+    assert sums.total(2, 9) == 115.0
+    assert sums.total(6, 8) == 0.0
+
+def test_membership_index_tracks_both_directions():
+    index = MembershipIndex()
+    assert index.add("u1", "P1") and index.add("u1", "P2") and index.add("u2", "P1")
+    assert not index.add("u1", "P1")
+    assert list(index.members("u1")) == ["P1", "P2"] and set(index.holders("P1")) == {"u1", "u2"}
+    assert index.filter("u1", ["P3", "P2", "P1"]) == ["P2", "P1"]
+    assert index.remove("u1", "P1") and not index.remove("u1", "P1")
+    assert list(index.holders("P1")) == ["u2"] and index.count("u1") == 1 and not index.contains("u1", "P1")
+
+def test_address_index_posts_trigrams_only(address_index):
+    address_index.add("P4", "Ax")
+    assert all(len(gram) == 3 for gram in address_index._postings if gram != "ax")
+    assert address_index.candidates("x") == ["P4"]
+    assert set(address_index.candidates("en")) == {"P1", "P2", "P3"}
+    assert address_index.count("ax") == 1
+
+def test_prefix_sums_grow_in_both_directions_over_dates():
+    sums = PrefixSums()
+    sums.add(date(2026, 3, 1), 5.0)
+    sums.add(date(2025, 1, 1), 1.0)
+    sums.add(date(2027, 6, 30), 2.0)
+    sums.add(date(2026, 3, 1), -5.0)
+    assert sums.total(date(2024, 1, 1), date(2030, 1, 1)) == 3.0
+    assert sums.total(date(2025, 1, 2), date(2027, 6, 29)) == 0.0
+    assert sums.total(date(2027, 6, 30), date(2027, 6, 30)) == 2.0
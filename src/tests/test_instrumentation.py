@@ -0,0 +1,86 @@
+import logging
+import pytest
+from datetime import date, datetime
+
+from src.model import LeaseAgreement, Resident
+from src.model.instrumentation import Histogram, metrics, timed
+from src.model.property import Property
+from src.model.rentalcompany import RentalCompany, PropertySearch, RentalAnalytics
+from src.scripts.task2 import Payment, PaymentHistory
+
+@pytest.fixture
+def recording():
+    metrics.reset()
+    metrics.enable()
+    yield metrics
+    metrics.disable()
+    metrics.reset()
+
+def test_disabled_mode_records_nothing():
+    metrics.reset()
+    company = RentalCompany("Quiet Homes")
+    company.add_property(Property("P1", "Main Street", 50.0, 500.0, "Quiet Homes"))
+    PropertySearch().search_by_price(company, 0, 1000)
+    assert metrics.snapshot() == {"enabled": False, "counters": {}, "latency": {}}
+
+def test_operations_are_counted_and_timed(recording, tmp_path):
+    company = RentalCompany("Busy Homes")
+    units = [Property(f"P{i}", f"{i} Main Street", 50.0, 500.0 + i, "Busy Homes") for i in range(10)]
+    company.add_properties(units)
+    company.add_property(units[0])
+    company.remove_property(units[1])
+    for _ in range(3):
+        PropertySearch().search_by_location(company, "main")
+    RentalAnalytics().snapshot(company)
+    resident = Resident(1, "jane", "secret", 1, "Jane", "jane@email.com", [])
+    lease = LeaseAgreement(1, units[2], resident, datetime(2025, 1, 1), 12, 500.0)
+    lease.renew(6)
+    history = PaymentHistory()
+    history.add_payments([Payment(lease, 500.0, date(2025, 2, 1))])
+    history.payments[0].settle(date(2025, 2, 1))
+
+    stats = recording.snapshot()
+    assert stats["counters"] == {"company.properties_added": 10, "company.duplicates": 1,
+                                 "company.properties_removed": 1}
+    latency = stats["latency"]
+    assert latency["search.by_location"]["count"] == 3
+    for name in ("company.add_properties", "company.add_property", "company.remove_property", "analytics.snapshot",
+                 "lease.renew", "payments.add_payments", "payments.settle"):
+        assert latency[name]["count"] == 1
+    assert 0 < latency["search.by_location"]["p50"] <= latency["search.by_location"]["max"]
+    recording.export(str(tmp_path / "stats.json"))
+    assert (tmp_path / "stats.json").read_text().startswith("{")
+
+def test_errors_are_counted(recording):
+    @timed("test.failing")
+    def failing():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        failing()
+    assert recording.counters["test.failing.errors"] == 1
+    assert recording.histograms["test.failing"].count == 1
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    for micros in [1] * 90 + [1000] * 9 + [50_000]:
+        histogram.observe(micros / 1e6)
+    assert histogram.percentile(50) == pytest.approx(2e-6)
+    assert histogram.percentile(95) == pytest.approx(1.024e-3)
+    assert histogram.percentile(100) == pytest.approx(0.05)
+    assert histogram.mean == pytest.approx((90e-6 + 9e-3 + 0.05) / 100)
+
+def test_messages_are_logged_instead_of_printed(caplog, capsys):
+    company = RentalCompany("Logged Homes")
+    unit = Property("P1", "Main Street", 50.0, 500.0, "Logged Homes")
+    with caplog.at_level(logging.INFO):
+        company.add_property(unit)
+        company.add_property(unit)
+        Resident(1, "jane", "secret", 1, "Jane", "jane@email.com", []).pay_rent(100.0)
+    assert capsys.readouterr().out == ""
+    assert [(record.levelname, record.getMessage()) for record in caplog.records] == [
+        ("INFO", "Property P1 added to Logged Homes."),
+        ("WARNING", "Property P1 already exists."),
+        ("WARNING", "No active lease found."),
+    ]
+    assert caplog.records[0].property_id == "P1"
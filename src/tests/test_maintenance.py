@@ -1,7 +1,7 @@
 import pytest
 from datetime import date
 from src.model.property import Property
-from src.model.maintenance import Event, EventLog, MaintenanceRequest, Renovation
+from src.model.maintenance import Event, EventLog, MaintenanceQueue, MaintenanceRequest, Renovation, RenovationLedger
 
 # Fixtures
 @pytest.fixture
@@ -64,3 +64,116 @@ def test_resolve_request_success(maintenance_request):
 # Tests for Renovation
 def test_renovation_total_cost(renovation):
     assert renovation.get_total_cost() == 2500.0
+
+def test_event_log_cursors_return_only_new_messages(event_log):
+    assert event_log.read_new_messages() == ["New maintenance request logged."]
+    event_log.record_event(Event(True, "Second"))
+    event_log.record_event(Event(False, "Hidden"))
+    assert event_log.read_new_messages() == ["Second"]
+    assert event_log.read_new_messages() == []
+    assert event_log.read_new_messages("auditor") == ["New maintenance request logged.", "Second"]
+
+def test_event_log_spills_segments_to_disk(tmp_path):
+    log = EventLog([], segment_size=4, spill_dir=str(tmp_path), max_memory_segments=1)
+    for index in range(18):
+        log.record_event(Event(index % 2 == 0, f"event {index}"))
+    assert len(list(tmp_path.iterdir())) == 3
+    assert log.read_all_messages() == [f"event {index}" for index in range(18)]
+    assert [event.text for event in log.iter_events(6)][:3] == ["event 6", "event 7", "event 8"]
+    assert log.read_new_messages()[-1] == "event 16"
+    log.close()
+    assert list(tmp_path.iterdir()) == []
+
+def test_event_log_retention_drops_old_segments(tmp_path):
+    log = EventLog([], segment_size=3, spill_dir=str(tmp_path), max_memory_segments=0, retention_segments=2)
+    for index in range(10):
+        log.record_event(Event(True, f"event {index}"))
+    assert log.read_all_messages() == ["event 6", "event 7", "event 8", "event 9"]
+    assert len(log) == 4
+    assert log.read_new_messages() == ["event 6", "event 7", "event 8", "event 9"]
+    assert len(list(tmp_path.iterdir())) == 1
+    log.close()
+
+# Tests for MaintenanceQueue
+@pytest.fixture
+def backlog():
+    properties = [Property(f"P{index}", "City Center", 120.0, 1500.0, "Olivia Homes") for index in range(3)]
+    requests = [MaintenanceRequest(index, properties[index % 3], date.fromordinal(date(2025, 1, 1).toordinal() + index),
+                                   "Pending", urgency=index % 4) for index in range(100)]
+    return properties, requests, MaintenanceQueue(requests)
+
+def test_queue_indexes_follow_status_changes(backlog):
+    properties, requests, queue = backlog
+    assert len(queue) == 100 and len(queue.with_status("Pending")) == 100
+    assert len(queue.for_property(properties[1], "Pending")) == 33
+    requests[4].status = "Approved"
+    assert requests[4] in queue.with_status("Approved") and requests[4] not in queue.with_status("Pending")
+    assert requests[4] in queue.for_property(properties[1], "Approved")
+    queue.remove(requests[5])
+    assert queue.get(5) is None and len(queue.with_status("Pending")) == 98
+
+def test_queue_top_orders_by_urgency_then_date(backlog):
+    _, requests, queue = backlog
+    assert [r.request_id for r in queue.top(3)] == [3, 7, 11]
+    requests[3].urgency = 0
+    requests[50].urgency = 9
+    assert [r.request_id for r in queue.top(2)] == [50, 7]
+    assert [r.request_id for r in queue.oldest(2)] == [0, 1]
+
+def test_queue_batch_transitions(backlog):
+    _, requests, queue = backlog
+    events, failed = queue.approve_requests([0, 1, requests[2], 999])
+    assert len(events) == 3 and failed == [None]
+    events, failed = queue.resolve_requests([0, 1, 3])
+    assert len(events) == 2 and failed == [requests[3]]
+    assert {r.request_id for r in queue.with_status("Resolved")} == {0, 1}
+    assert [r.request_id for r in queue.oldest(1)] == [2]
+
+def test_queue_sla_metrics(backlog):
+    _, _, queue = backlog
+    today = date(2025, 4, 11)
+    assert queue.age_percentiles((50, 90, 100), today=today) == {50: 50, 90: 90, 100: 100}
+    assert [r.request_id for r in queue.overdue(97, today=today)] == [0, 1, 2]
+    assert MaintenanceQueue().age_percentiles((50,), today=today) == {50: None}
+
+# Tests for RenovationLedger
+def test_ledger_rolls_up_costs(sample_property):
+    other = Property("P002", "Green Plaza", 60.0, 800.0, "Olivia Homes")
+    renovations = [Renovation(1, sample_property, date(2024, 2, 10), 1000.0, "Roof"),
+                   Renovation(2, sample_property, date(2024, 5, 1), 500.0, "Paint"),
+                   Renovation(3, other, date(2024, 3, 31), 250.0, "Locks")]
+    ledger = RenovationLedger(renovations)
+    assert ledger.property_cost(sample_property) == 1500.0 and ledger.property_cost("P002") == 250.0
+    assert ledger.quarterly_costs() == {(2024, 1): 1250.0, (2024, 2): 500.0}
+    assert ledger.type_costs() == {"Property": 1750.0}
+    assert ledger.total() == 1750.0 and ledger.total(date(2024, 3, 1), date(2024, 6, 30)) == 750.0
+    assert [r.renovation_id for r in ledger.for_property(sample_property)] == [1, 2]
+
+def test_ledger_tracks_changes_and_removals(sample_property):
+    renovation = Renovation(1, sample_property, date(2024, 2, 10), 1000.0, "Roof")
+    ledger = RenovationLedger([renovation])
+    renovation.cost = 1200.0
+    renovation.date = date(2024, 11, 2)
+    assert ledger.quarterly_costs() == {(2024, 4): 1200.0}
+    assert ledger.quarter_cost(2024, 4, "Property") == 1200.0
+    ledger.remove(renovation)
+    assert len(ledger) == 0 and ledger.property_costs() == {} and ledger.quarterly_costs() == {}
+    assert ledger.total() == 0.0
+
+def test_event_logs_can_share_a_spill_dir(tmp_path):
+    first = EventLog([], segment_size=2, spill_dir=str(tmp_path), max_memory_segments=0)
+    second = EventLog([], segment_size=2, spill_dir=str(tmp_path), max_memory_segments=0)
+    for index in range(6):
+        first.record_event(Event(True, f"first {index}"))
+        second.record_event(Event(True, f"second {index}"))
+    assert first.read_all_messages() == [f"first {index}" for index in range(6)]
+    assert second.read_all_messages() == [f"second {index}" for index in range(6)]
+    with pytest.raises(AttributeError):
+        first.events.append(Event(True, "lost"))
+    first.close()
+    second.close()
+    assert list(tmp_path.iterdir()) == []
+
+def test_event_log_rejects_retention_below_one_segment():
+    with pytest.raises(ValueError):
+        EventLog([], retention_segments=0)
@@ -0,0 +1,60 @@
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from math import fsum
+
+from src.benchmarks.portfolio import generate_portfolio
+from src.model.parallel import ParallelReportRunner, exact_partials
+from src.model.rentalcompany import RentalAnalytics, MonthlyReport
+
+@pytest.fixture(scope="module")
+def companies():
+    portfolios = [generate_portfolio(units, seed=seed) for seed, units in enumerate((400, 250, 30))]
+    for position, portfolio in enumerate(portfolios):
+        portfolio.company.company_name = f"Client {position}"
+    return [portfolio.company for portfolio in portfolios]
+
+def test_exact_partials_merge_independently_of_grouping():
+    values = [0.1] * 10 + [1e16, 1.0, -1e16, 2.5e-8]
+    assert fsum(exact_partials(values)) == fsum(values)
+    merged = exact_partials(values[:5]) + exact_partials(values[5:11]) + exact_partials(values[11:])
+    assert fsum(merged) == fsum(values)
+    assert exact_partials([]) == [] and exact_partials([1.5, -1.5]) == []
+
+def test_sharded_reports_match_serial_analytics(companies):
+    results = ParallelReportRunner(processes=1, partition_size=100).run(companies, 2023, 1, 2025, 6)
+    assert [result.company_name for result in results] == ["Client 0", "Client 1", "Client 2"]
+    for company, result in zip(companies, results):
+        expected = RentalAnalytics().snapshot(company)
+        snapshot = result.snapshot
+        assert (snapshot.total_units, snapshot.occupied_units) == (expected.total_units, expected.occupied_units)
+        assert snapshot.total_rent == fsum(p.price for p in company.properties_list)
+        assert snapshot.vacant_rent == pytest.approx(expected.vacant_rent)
+        for type_name, breakdown in expected.by_type.items():
+            assert snapshot.by_type[type_name].total_units == breakdown.total_units
+            assert snapshot.by_type[type_name].total_rent == pytest.approx(breakdown.total_rent)
+        serial = MonthlyReport.generate_reports(company, 2023, 1, 2025, 6)
+        assert len(result.reports) == len(serial) == 30
+        for report, reference in zip(result.reports, serial):
+            assert (report.report_id, report.month, report.year) == (reference.report_id, reference.month, reference.year)
+            assert report.vacancy_percentage == pytest.approx(reference.vacancy_percentage)
+            assert report.income == pytest.approx(reference.income)
+            assert report.loss_due_to_vacancy == pytest.approx(reference.loss_due_to_vacancy)
+
+def test_results_do_not_depend_on_sharding(companies):
+    whole = ParallelReportRunner(processes=1).run(companies[:1], 2024, 1, 2024, 12)[0]
+    split = ParallelReportRunner(processes=1, partition_size=37).run(companies[:1], 2024, 1, 2024, 12)[0]
+    assert split.snapshot.vacant_rent == whole.snapshot.vacant_rent
+    assert [report.as_dict() for report in split.reports] == [report.as_dict() for report in whole.reports]
+
+def test_process_pool_runner(companies):
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        pooled = ParallelReportRunner(partition_size=150, executor=executor).run(companies, 2024, 1, 2024, 3)
+    inline = ParallelReportRunner(processes=1, partition_size=150).run(companies, 2024, 1, 2024, 3)
+    assert [r.snapshot.total_rent for r in pooled] == [r.snapshot.total_rent for r in inline]
+    assert [[m.as_dict() for m in r.reports] for r in pooled] == [[m.as_dict() for m in r.reports] for r in inline]
+
+def test_workers_build_their_own_slices(companies):
+    pooled = ParallelReportRunner(processes=2, partition_size=120).run(companies, 2024, 1, 2024, 6)
+    inline = ParallelReportRunner(processes=1, partition_size=120).run(companies, 2024, 1, 2024, 6)
+    assert [r.snapshot.total_rent for r in pooled] == [r.snapshot.total_rent for r in inline]
+    assert [[m.as_dict() for m in r.reports] for r in pooled] == [[m.as_dict() for m in r.reports] for r in inline]
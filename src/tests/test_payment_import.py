@@ -0,0 +1,46 @@
+import json
+import pytest
+from datetime import date, datetime
+
+from src.model import LeaseAgreement, Resident
+from src.model.property import Property
+from src.scripts.payment_import import PaymentImporter
+from src.scripts.task2 import PaymentHistory
+
+@pytest.fixture
+def leases():
+    resident = Resident(101, "jane", "secret", 1, "Jane", "jane@email.com", [])
+    return [LeaseAgreement(lease_id, Property(f"P{lease_id}", "Downtown", 100.0, 1200.0, "Nice Owner"), resident,
+                           datetime(2026, 1, 1), 12, 1200.0) for lease_id in (1, 2)]
+
+@pytest.fixture
+def importer(leases):
+    return PaymentImporter(leases, PaymentHistory(), batch_size=2)
+
+def test_import_csv_in_batches(importer, tmp_path):
+    path = tmp_path / "settlements.csv"
+    path.write_text("lease_id,amount,due_date,payment_date\n"
+                    "1,1200,2026-02-05,2026-02-03\n"
+                    "2,1200,2026-02-05,2026-02-09\n"
+                    "3,900,2026-02-05,2026-02-01\n"
+                    "1,oops,2026-03-05,\n"
+                    "2,1200,2026-03-05,\n")
+    stats = importer.import_file(str(path))
+    assert (stats.rows, stats.applied, stats.unmatched, stats.invalid) == (5, 3, 1, 1)
+    assert stats.rows_per_second > 0
+    history = importer.history
+    assert [p.status for p in history.get_payments()] == ["Paid", "Late", "Pending"]
+    assert history.total_revenue("2026-02-01", "2026-02-28") == 1200.0
+
+def test_import_jsonl(importer, tmp_path):
+    path = tmp_path / "settlements.jsonl"
+    rows = [{"lease_id": 2, "amount": 1200, "due_date": "2026-02-05", "payment_date": "2026-02-05"}]
+    path.write_text("\n".join(json.dumps(row) for row in rows) + "\n{broken\n[1, 2]\n5\nnull\n")
+    stats = importer.import_file(str(path))
+    assert (stats.applied, stats.invalid) == (1, 4)
+    assert importer.history.get_payments()[0].lease.lease_id == 2
+
+def test_parse_date_cache(importer):
+    first = importer.parse_date("2026-02-05")
+    assert first == date(2026, 2, 5)
+    assert importer.parse_date("2026-02-05") is first
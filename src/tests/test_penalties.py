@@ -0,0 +1,58 @@
+import random
+import pytest
+from datetime import date, datetime
+
+from src.model import LeaseAgreement, Resident
+from src.model.property import Property
+from src.scripts import penalties as penalties_module
+from src.scripts.penalties import PenaltyRule, calculate_penalties, assess_payments
+from src.scripts.task2 import Payment, LatePayment
+
+@pytest.fixture
+def sample_lease():
+    resident = Resident(101, "jane", "secret", 1, "Jane", "jane@email.com", [])
+    unit = Property("P001", "Downtown", 100.0, 1200.0, "Nice Owner")
+    return LeaseAgreement(1, unit, resident, datetime(2026, 1, 1), 12, 1200.0)
+
+def test_default_rule_matches_late_payment(sample_lease):
+    late = LatePayment(sample_lease, 1000.0, "2026-02-01", 3)
+    assert late.late_fee == 90.0
+    assert late.total_amount == 1090.0
+
+@pytest.fixture(params=["numpy", "stdlib"])
+def batch(request, monkeypatch):
+    if request.param == "numpy" and penalties_module.np is None:
+        pytest.skip("NumPy is not installed")
+    if request.param == "stdlib":
+        monkeypatch.setattr(penalties_module, "np", None)
+    return request.param
+
+def test_batch_matches_scalar_penalties(sample_lease, batch):
+    rng = random.Random(3)
+    amounts = [round(rng.uniform(50, 5000), 2) for _ in range(500)]
+    days_late = [rng.randint(0, 60) for _ in range(500)]
+    fees, totals = calculate_penalties(amounts, days_late)
+    expected = [LatePayment(sample_lease, amount, "2026-01-01", days)._calculate_penalty()
+                for amount, days in zip(amounts, days_late)]
+    assert list(fees) == expected
+    assert list(totals) == [amount + fee for amount, fee in zip(amounts, expected)]
+
+def test_rules_are_configurable_per_lease(sample_lease):
+    lenient = PenaltyRule(base_rate=0.02, daily_rate=0.01, grace_days=5)
+    sample_lease.penalty_rule = lenient
+    assert LatePayment(sample_lease, 1000.0, "2026-02-01", 7).late_fee == 40.0
+    resident = sample_lease.resident
+    default_lease = LeaseAgreement(2, sample_lease.property, resident, datetime(2026, 1, 1), 12, 1000.0)
+    payments = [Payment(sample_lease, 1000.0, "2026-02-01"), Payment(default_lease, 1000.0, "2026-02-01"),
+                Payment(default_lease, 1000.0, "2026-03-01")]
+    fees, total = assess_payments(payments, today=date(2026, 2, 8))
+    assert fees == [40.0, 170.0, 0.0]
+    assert total == 210.0
+
+def test_penalties_keep_two_decimal_rounding(batch):
+    rule = PenaltyRule()
+    assert rule.penalty(110.50, 1) == 5.53
+    amounts = [cents / 100 for cents in range(1, 20_001)]
+    for days in (0, 2, 7):
+        fees, _ = calculate_penalties(amounts, [days] * len(amounts))
+        assert [float(fee) for fee in fees] == [rule.penalty(amount, days) for amount in amounts]
@@ -63,3 +63,38 @@ def test_utility_provider_cost():
 def test_tax_record_calculation(base_property):
     tax = TaxRecord(101, base_property, 2025, 400.0)
     assert tax.calculate_tax() == 400.0
+
+def test_property_uses_slots(base_property):
+    with pytest.raises(AttributeError):
+        base_property.unknown_attribute = 1
+    assert not hasattr(Apartment("A002", "Block D", 70.0, 800.0, "UrbanStay", 2), "__dict__")
+
+def test_facilities_are_bitmask_encoded(base_property):
+    base_property.add_facility("parking")
+    base_property.add_facility("gym")
+    base_property.add_facility("parking")
+    assert base_property.facilities == ("parking", "gym")
+    assert base_property.has_facility("gym")
+    base_property.remove_facility("parking")
+    assert base_property.facilities == ("gym",)
+    base_property.facilities = ["pool"]
+    assert base_property.facilities == ("pool",)
+
+def test_history_is_allocated_lazily(base_property):
+    assert base_property.history == ()
+    assert base_property._history is None
+    base_property.add_lease(LeaseAgreement())
+    base_property.add_lease(LeaseAgreement())
+    assert len(base_property.history) == 1
+
+def test_history_and_facilities_are_read_only_views(base_property):
+    with pytest.raises(AttributeError):
+        base_property.history.append(LeaseAgreement())
+    base_property.add_lease(LeaseAgreement())
+    base_property.terminate_lease()
+    history = base_property.history
+    with pytest.raises(AttributeError):
+        history.append(LeaseAgreement())
+    assert len(base_property.history) == 1
+    with pytest.raises(AttributeError):
+        base_property.facilities.append("pool")
@@ -1,5 +1,10 @@
+import logging
 import pytest
-from src.model.property import Property
+from types import SimpleNamespace
+from datetime import date
+from src.model import Owner, PropertyManager
+from src.model.maintenance import Renovation, RenovationLedger
+from src.model.property import Property, House, Apartment, Shop
 from src.model.rentalcompany import (
     RentalCompany, PropertySearch, Navigation,
     RentalAnalytics, MonthlyReport
@@ -78,3 +83,307 @@ def test_monthly_report_generation(rental_company, sample_property_1):
     assert result["Report ID"] == 1
     assert result["Month"] == 4
     assert "Vacancy Percentage" in result
+
+def test_add_property_rejects_duplicate_id(rental_company, sample_property_1):
+    duplicate = Property("P001", "Elsewhere", 50.0, 700.0, "Olivia Homes")
+    rental_company.add_property(duplicate)
+    assert len(rental_company) == 2
+    assert rental_company.get_property("P001") is sample_property_1
+
+def test_add_properties_bulk_keeps_insertion_order(caplog):
+    company = RentalCompany("Bulk Homes")
+    properties = [Property(f"P{i:03}", f"Street {i}", 50.0, 500.0 + i, "Bulk Homes") for i in range(5)]
+    with caplog.at_level(logging.INFO, logger="src.model.rentalcompany"):
+        assert company.add_properties(properties + properties[:2]) == 5
+    assert company.properties_list == tuple(properties)
+    assert [record.getMessage() for record in caplog.records] == ["5 properties added to Bulk Homes."]
+    assert caplog.records[0].added == 5
+
+def test_remove_property_by_registry(rental_company, sample_property_1, sample_property_2):
+    rental_company.remove_property(sample_property_1)
+    assert rental_company.get_property("P001") is None
+    assert rental_company.properties_list == (sample_property_2,)
+    with pytest.raises(AttributeError):
+        rental_company.properties_list.append(sample_property_1)
+
+def test_search_indexes_follow_property_changes(rental_company, sample_property_1, sample_property_2):
+    search = PropertySearch()
+    sample_property_2.price = 1600.0
+    sample_property_1.address = "Old Town"
+    assert search.search_by_price(rental_company, 1550, 1700) == [sample_property_2]
+    assert search.search_by_location(rental_company, "town") == [sample_property_1]
+    assert search.search_by_location(rental_company, "City") == []
+
+def test_search_by_availability_follows_leases(rental_company, sample_property_1):
+    search = PropertySearch()
+    sample_property_1.add_lease(object())
+    assert sample_property_1 not in search.search_by_availability(rental_company)
+    sample_property_1.current_lease = None
+    sample_property_1.is_occupied = False
+    assert sample_property_1 in search.search_by_availability(rental_company)
+
+def test_removed_property_leaves_indexes(rental_company, sample_property_1):
+    rental_company.remove_property(sample_property_1)
+    sample_property_1.price = 1000.0
+    search = PropertySearch()
+    assert search.search_by_price(rental_company, 1000, 1500) == [rental_company.get_property("P002")]
+    assert search.search_by_location(rental_company, "") == [rental_company.get_property("P002")]
+
+@pytest.fixture
+def mixed_company():
+    company = RentalCompany("Mixed Homes")
+    company.add_properties([
+        House("H1", "12 Green Street", 200.0, 1500.0, "Mixed Homes", 3, 2),
+        House("H2", "4 Green Lane", 150.0, 1100.0, "Mixed Homes", 2, 1),
+        Apartment("A1", "Green Towers", 80.0, 900.0, "Mixed Homes", 4),
+        Apartment("A2", "City Heights", 70.0, 950.0, "Mixed Homes", 2),
+        Property("P1", "Green Plaza", 60.0, 800.0, "Mixed Homes"),
+    ])
+    return company
+
+def test_query_combines_criteria(mixed_company):
+    search = PropertySearch()
+    mixed_company.get_property("H2").is_occupied = True
+    results = search.query(mixed_company, location="green", max_price=1500, available=True)
+    assert sorted(p.property_id for p in results) == ["A1", "H1", "P1"]
+    assert [p.property_id for p in search.query(mixed_company, type=House)] == ["H1", "H2"]
+    assert [p.property_id for p in search.query(mixed_company, min_bedrooms=3)] == ["H1"]
+    assert [p.property_id for p in search.query(mixed_company, floor=4, location="towers")] == ["A1"]
+
+def test_query_is_lazy_and_paginated(mixed_company):
+    search = PropertySearch()
+    results = search.query(mixed_company, min_price=0)
+    assert next(results).property_id == "H1"
+    page = search.query_page(mixed_company, page=1, page_size=2, min_price=0)
+    assert [p.property_id for p in page] == ["H1", "H2"]
+
+def test_query_pages_do_not_depend_on_the_chosen_index(mixed_company):
+    search = PropertySearch()
+    criteria = {"location": "green", "max_price": 1000}
+    assert list(search._plan(mixed_company, "green", None, 1000, None, None)) == ["P1", "A1", "A2"]
+    before = [[p.property_id for p in search.query_page(mixed_company, page=page, page_size=1, **criteria)]
+              for page in range(2)]
+    mixed_company.add_properties([Property(f"X{index}", "Far Road", 40.0, 500.0, "Mixed Homes") for index in range(3)])
+    assert list(search._plan(mixed_company, "green", None, 1000, None, None)) == ["H1", "H2", "A1", "P1"]
+    after = [[p.property_id for p in search.query_page(mixed_company, page=page, page_size=1, **criteria)]
+             for page in range(2)]
+    assert before == after == [["A1"], ["P1"]]
+
+def test_query_plan_prefers_selective_index(mixed_company):
+    search = PropertySearch()
+    assert list(search._plan(mixed_company, "city", None, None, None, None)) == ["A2"]
+    assert list(search._plan(mixed_company, None, 1400, None, None, None)) == ["H1"]
+
+def test_navigation_uses_coordinates():
+    company = RentalCompany("Geo Homes")
+    near = Property("G1", "Westlands", 50.0, 900.0, "Geo Homes", latitude=-1.2676, longitude=36.8108)
+    far = Property("G2", "Karen", 50.0, 900.0, "Geo Homes", latitude=-1.3197, longitude=36.7073)
+    nearest_but_taken = Property("G3", "Parklands", 50.0, 900.0, "Geo Homes", latitude=-1.2630, longitude=36.8150)
+    company.add_properties([near, far, nearest_but_taken])
+    nearest_but_taken.is_occupied = True
+    nav = Navigation(company)
+    origin = (-1.2640, 36.8140)
+    assert nav.get_nearest_available_property(origin) is near
+    assert nav.k_nearest_available(origin, 5) == [near, far]
+    assert nav.k_nearest_available(origin, 5, max_km=2) == [near]
+    assert 12 < nav.calculate_distance(near, far) < 14
+
+def test_navigation_geocoder_and_coordinate_updates():
+    company = RentalCompany("Geo Homes")
+    unit = Property("G1", "Westlands", 50.0, 900.0, "Geo Homes")
+    company.add_property(unit)
+    nav = Navigation(company, geocoder={"CBD": (-1.2864, 36.8172)}.get)
+    assert nav.k_nearest_available("CBD", 1) == []
+    unit.coordinates = (-1.2676, 36.8108)
+    assert nav.k_nearest_available("CBD", 1) == [unit]
+    assert nav.calculate_distance("CBD", "Nowhere") == float('inf')
+
+def test_analytics_snapshot_is_numeric(mixed_company):
+    mixed_company.get_property("H1").is_occupied = True
+    mixed_company.get_property("A2").is_occupied = True
+    snapshot = RentalAnalytics().snapshot(mixed_company)
+    assert snapshot.total_units == 5
+    assert snapshot.occupied_units == 2
+    assert snapshot.vacancy_rate == 60.0
+    assert snapshot.total_revenue == 5250.0
+    assert snapshot.loss_due_to_vacancy == 2800.0
+    assert snapshot.average_rent == 1050.0
+    assert snapshot.by_type["House"].occupied_units == 1
+    assert snapshot.by_type["Apartment"].vacant_rent == 900.0
+
+def test_analytics_formatters_use_snapshot(mixed_company):
+    analytics = RentalAnalytics()
+    mixed_company.get_property("H1").is_occupied = True
+    assert analytics.vacancy_rate(mixed_company) == "Vacancy Rate: 80.00%"
+    assert analytics.loss_due_to_vacancy(mixed_company) == "Total Loss Due to Vacancy: 3750.00"
+    assert analytics.average_rent(RentalCompany("Empty")) == "No properties available for rent analysis."
+
+def test_snapshot_counters_track_mutations(mixed_company):
+    analytics = RentalAnalytics()
+    house = mixed_company.get_property("H1")
+    house.add_lease(SimpleNamespace(end_date=None))
+    house.price = 1700.0
+    mixed_company.get_property("A1").price = 1000.0
+    mixed_company.remove_property(mixed_company.get_property("P1"))
+    mixed_company.add_property(Shop("S1", "Market Street", 40.0, 600.0, "Mixed Homes", "Retail"))
+    house.terminate_lease()
+    mixed_company.get_property("A2").is_occupied = True
+
+    snapshot = analytics.snapshot(mixed_company)
+    expected = analytics.scan(mixed_company.properties_list)
+    assert (snapshot.total_units, snapshot.occupied_units) == (expected.total_units, expected.occupied_units)
+    assert snapshot.total_rent == pytest.approx(expected.total_rent)
+    assert snapshot.vacant_rent == pytest.approx(expected.vacant_rent)
+    assert set(snapshot.by_type) == {"House", "Apartment", "Shop"}
+    assert snapshot.by_type["Apartment"].occupied_units == 1
+
+def test_snapshot_is_a_copy(rental_company):
+    snapshot = RentalAnalytics().snapshot(rental_company)
+    snapshot.total_units = 99
+    assert RentalAnalytics().snapshot(rental_company).total_units == 2
+
+def test_columnar_store_stays_in_sync(mixed_company):
+    columns = mixed_company.enable_columnar()
+    mixed_company.get_property("H1").is_occupied = True
+    mixed_company.get_property("A1").size = 85.0
+    mixed_company.remove_property(mixed_company.get_property("P1"))
+    mixed_company.add_property(Shop("S1", "Market Street", 40.0, 600.0, "Mixed Homes", "Retail"))
+    assert sorted(columns.property_ids) == sorted(p.property_id for p in mixed_company.properties_list)
+    assert columns.size[columns._rows["A1"]] == 85.0
+    columnar = RentalAnalytics().columnar_snapshot(mixed_company)
+    counters = RentalAnalytics().snapshot(mixed_company)
+    assert (columnar.total_units, columnar.occupied_units) == (counters.total_units, counters.occupied_units)
+    assert columnar.vacant_rent == pytest.approx(counters.vacant_rent)
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_adjust_prices_by_type(mixed_company, columnar):
+    if columnar:
+        mixed_company.enable_columnar()
+    assert mixed_company.adjust_prices(1.03, Apartment) == 2
+    assert mixed_company.get_property("A1").price == 927.0
+    assert mixed_company.get_property("H1").price == 1500.0
+    search = PropertySearch()
+    assert [p.property_id for p in search.search_by_price(mixed_company, 920, 980)] == ["A1", "A2"]
+    assert RentalAnalytics().snapshot(mixed_company).total_rent == pytest.approx(800 + 927 + 978.5 + 1100 + 1500)
+
+def test_monthly_reports_replay_lease_history():
+    from src.model import LeaseAgreement, Resident
+    company = RentalCompany("History Homes")
+    first = Property("P1", "North Road", 90.0, 1000.0, "History Homes")
+    second = Property("P2", "South Road", 40.0, 500.0, "History Homes")
+    company.add_properties([first, second])
+    resident = Resident(1, "sam", "hash", 1, "Sam", "sam@email.com", [])
+    first.add_lease(LeaseAgreement(1, first, resident, "2025-01-15", 3, 950.0))
+    first.add_lease(LeaseAgreement(2, first, resident, "2025-06-01", 12, 1100.0))
+    second.add_lease(LeaseAgreement(3, second, resident, "2025-03-01", 1, 480.0))
+
+    reports = MonthlyReport.generate_reports(company, 2025, 1, 2025, 6, first_report_id=10)
+    rows = [(r.report_id, r.month, r.vacancy_percentage, r.income, r.loss_due_to_vacancy) for r in reports]
+    assert rows == [
+        (10, 1, 50.0, 950.0, 500.0),
+        (11, 2, 50.0, 950.0, 500.0),
+        (12, 3, 0.0, 1430.0, 0.0),
+        (13, 4, 100.0, 0.0, 1500.0),
+        (14, 5, 100.0, 0.0, 1500.0),
+        (15, 6, 50.0, 1100.0, 500.0),
+    ]
+    assert reports[0].as_dict()["Year"] == 2025
+
+def test_monthly_reports_bill_mid_month_leases_per_period():
+    from src.model import LeaseAgreement, Resident
+    from src.model.parallel import ParallelReportRunner
+    company = RentalCompany("Billing Homes")
+    unit = Property("P1", "North Road", 90.0, 1000.0, "Billing Homes")
+    company.add_property(unit)
+    unit.add_lease(LeaseAgreement(1, unit, Resident(1, "sam", "hash", 1, "Sam", "sam@email.com", []),
+                                  "2025-01-15", 3, 1000.0))
+    reports = MonthlyReport.generate_reports(company, 2025, 1, 2025, 5)
+    assert [r.income for r in reports] == [1000.0, 1000.0, 1000.0, 0.0, 0.0]
+    assert [r.vacancy_percentage for r in reports] == [0.0, 0.0, 0.0, 100.0, 100.0]
+    sharded = ParallelReportRunner(processes=1).run([company], 2025, 1, 2025, 5)[0].reports
+    assert [r.as_dict() for r in sharded] == [r.as_dict() for r in reports]
+
+def test_monthly_reports_span_years(rental_company):
+    reports = MonthlyReport.generate_reports(rental_company, 2024, 11, 2025, 2)
+    assert [(r.year, r.month) for r in reports] == [(2024, 11), (2024, 12), (2025, 1), (2025, 2)]
+    assert all(r.vacancy_percentage == 100.0 for r in reports)
+
+def test_capex_summary_and_roi_use_ledger_totals(mixed_company):
+    mixed_company.get_property("H1").is_occupied = True
+    ledger = RenovationLedger([Renovation(1, mixed_company.get_property("H1"), date(2024, 1, 5), 6000.0, "Kitchen"),
+                               Renovation(2, mixed_company.get_property("A1"), date(2024, 2, 5), 1000.0, "Paint")])
+    analytics = RentalAnalytics()
+    summary = analytics.capex_summary(mixed_company, ledger)
+    assert summary["House"]["capex"] == 6000.0 and summary["House"]["capex_per_unit"] == 3000.0
+    assert summary["House"]["roi"] == 1500.0 * 12 / 6000.0
+    assert summary["Apartment"]["roi"] == 0.0 and summary["Property"]["roi"] is None
+    assert summary["Total"]["capex"] == 7000.0 and summary["Total"]["units"] == 5
+    assert analytics.renovation_roi(mixed_company, ledger) == {"H1": 3.0, "A1": 0.0}
+
+def test_search_and_analytics_scoped_to_visible_properties(mixed_company):
+    manager = PropertyManager(30, "manager", "hash")
+    manager.assign_property(mixed_company.get_property("H1"))
+    mixed_company.track_access(manager)
+    manager.assign_property(mixed_company.get_property("A1"))
+    manager.assign_property(mixed_company.get_property("A2"))
+    search, analytics = PropertySearch(), RentalAnalytics()
+    assert sorted(p.property_id for p in search.query(mixed_company, visible_to=manager)) == ["A1", "A2", "H1"]
+    assert [p.property_id for p in search.query(mixed_company, location="green", visible_to=manager)] == ["H1", "A1"]
+    manager.properties.remove(mixed_company.get_property("A1"))
+    assert [p.property_id for p in search.query_page(mixed_company, location="green", visible_to=("manager", 30))] == ["H1"]
+    mixed_company.get_property("H1").is_occupied = True
+    snapshot = analytics.snapshot(mixed_company, visible_to=manager)
+    assert snapshot.total_units == 2 and snapshot.occupied_units == 1
+    assert analytics.total_revenue(mixed_company, visible_to=manager) == "Total Revenue: 2450.00"
+    assert analytics.revenue_analysis(mixed_company, visible_to=manager).keys() == {"H1", "A2"}
+    mixed_company.untrack_access(manager)
+    assert list(search.query(mixed_company, visible_to=("manager", 30))) == []
+    assert [p.property_id for p in search.query(mixed_company, visible_to=manager)] == ["H1", "A2"]
+
+def test_untracked_users_see_their_own_properties(mixed_company):
+    owner = Owner(7, "olivia", "olivia@email.com", [mixed_company.get_property("A2")])
+    assert [p.property_id for p in PropertySearch().query(mixed_company, visible_to=owner)] == ["A2"]
+    assert RentalAnalytics().snapshot(mixed_company, visible_to=owner).total_units == 1
+
+def test_failed_add_leaves_company_unchanged(mixed_company):
+    mixed_company.enable_columnar()
+    broken = Property("P9", "Green Walk", 50.0, 700.0, "Mixed Homes")
+    broken._price = None
+    with pytest.raises(TypeError):
+        mixed_company.add_property(broken)
+    assert len(mixed_company) == 5 and len(mixed_company.columns) == 5 and broken._watchers == ()
+    assert mixed_company.properties_at_location("walk") == []
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_adjust_prices_notifies_other_watchers(mixed_company, columnar):
+    if columnar:
+        mixed_company.enable_columnar()
+    other = RentalCompany("Shared Listings")
+    other.add_property(mixed_company.get_property("A1"))
+    mixed_company.adjust_prices(1.1, Apartment)
+    assert [p.property_id for p in other.properties_in_price_range(990.0, 990.0)] == ["A1"]
+    assert RentalAnalytics().snapshot(other).total_rent == 990.0
+
+def test_visibility_is_keyed_by_role_and_user_id(mixed_company):
+    owner, manager = Owner(7, "owner", "contact", [mixed_company.get_property("H1")]), PropertyManager(7, "m", "hash")
+    manager.assign_property(mixed_company.get_property("A1"))
+    mixed_company.track_access(owner)
+    mixed_company.track_access(manager)
+    search = PropertySearch()
+    assert [p.property_id for p in search.query(mixed_company, visible_to=owner)] == ["H1"]
+    assert [p.property_id for p in search.query(mixed_company, visible_to=manager)] == ["A1"]
+
+def test_running_totals_do_not_drift():
+    company = RentalCompany("Drift Homes")
+    units = [Property(f"P{index}", "Drift Road", 50.0, 100.1 + index * 0.7, "Drift Homes") for index in range(50)]
+    company.add_properties(units)
+    for step in range(200):
+        units[step % 50].price = round(units[step % 50].price + 0.3, 2)
+    for p in units:
+        p.is_occupied = True
+    assert RentalAnalytics().loss_due_to_vacancy(company) == "Total Loss Due to Vacancy: 0.00"
+    assert RentalAnalytics().snapshot(company).vacant_rent == 0.0
+    for p in units:
+        company.remove_property(p)
+    snapshot = RentalAnalytics().snapshot(company)
+    assert (snapshot.total_units, snapshot.total_rent, snapshot.vacant_rent) == (0, 0.0, 0.0)
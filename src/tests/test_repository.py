@@ -0,0 +1,146 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+from src.model import LeaseAgreement, Resident
+from src.model.property import Property, Land, House, Apartment, Shop
+from src.model.rentalcompany import RentalCompany, PropertySearch, Navigation, RentalAnalytics
+from src.model.repository import InMemoryRepository, Repository, SQLiteRepository
+from src.scripts.task2 import Payment
+
+@pytest.fixture(params=["memory", "sqlite"])
+def repository(request, tmp_path):
+    if request.param == "memory":
+        yield InMemoryRepository()
+    else:
+        repository = SQLiteRepository(str(tmp_path / "rentals.db"))
+        yield repository
+        repository.close()
+
+def build_company(repository=None):
+    company = RentalCompany("Stored Homes", repository)
+    house = House("H1", "12 Green Street", 200.0, 1500.0, "Stored Homes", 3, 2, latitude=-1.28, longitude=36.82)
+    house.has_garden = True
+    house.add_facility("garden shed")
+    apartment = Apartment("A1", "Green Towers", 80.0, 900.0, "Stored Homes", 4, latitude=-1.29, longitude=36.80)
+    apartment.has_balcony = True
+    company.add_properties([
+        house,
+        apartment,
+        Apartment("A2", "City Heights", 70.0, 950.0, "Stored Homes", 2, latitude=-1.30, longitude=36.78),
+        Land("L1", "Plot 7B", 1000.0, 25000.0, "Stored Homes", "Residential", 800.0),
+        Shop("S1", "Main Street 10", 60.0, 1200.0, "Stored Homes", "Retail"),
+        Property("P1", "Green Plaza", 60.0, 800.0, "Stored Homes"),
+    ])
+    company.get_property("A2").is_occupied = True
+    return company
+
+def test_properties_round_trip(repository):
+    build_company(repository)
+    restored = RentalCompany.from_repository(repository, "Stored Homes")
+    assert len(restored) == 6
+    assert [p.property_id for p in restored.properties_list] == ["H1", "A1", "A2", "L1", "S1", "P1"]
+    house, land = restored.get_property("H1"), restored.get_property("L1")
+    assert (house.num_bedrooms, house.num_bathrooms, house.has_garden) == (3, 2, True)
+    assert house.coordinates == (-1.28, 36.82) and house.facilities == ("garden shed",)
+    assert (land.zoning_type, land.buildable_area) == ("Residential", 800.0)
+    assert restored.get_property("A1").has_balcony and restored.get_property("A2").is_occupied
+
+def test_changes_are_written_through(repository):
+    company = build_company(repository)
+    company.get_property("H1").price = 1600.0
+    company.get_property("P1").address = "Blue Plaza"
+    company.remove_property(company.get_property("S1"))
+    assert company.adjust_prices(1.1, Apartment) == 2
+    row = repository.get("H1")
+    assert row.price == 1600.0 and repository.get("P1").address == "Blue Plaza"
+    assert repository.get("S1") is None and repository.count() == 5
+    assert repository.get("A1").price == 990.0
+
+def test_queries_push_down_to_sql(tmp_path):
+    expected = build_company()
+    repository = SQLiteRepository(str(tmp_path / "rentals.db"))
+    build_company(repository)
+    company = RentalCompany.from_repository(repository, "Stored Homes")
+    search = PropertySearch()
+    for criteria in ({"location": "green", "available": True}, {"min_price": 900, "max_price": 1500},
+                     {"type": Apartment}, {"min_bedrooms": 3}, {"floor": 4, "location": "tow"},
+                     {"available": False}, {"location": "plaza", "max_price": 1000}):
+        assert ([p.property_id for p in search.query(company, **criteria)]
+                == sorted((p.property_id for p in search.query(expected, **criteria)),
+                          key=["H1", "A1", "A2", "L1", "S1", "P1"].index))
+    assert [p.property_id for p in search.query_page(company, page=1, page_size=2, min_price=0)] == ["A2", "L1"]
+    assert [p.property_id for p in search.search_by_availability(company)] == ["H1", "A1", "L1", "S1", "P1"]
+    assert company._properties.cached().keys() <= {"H1", "A1", "A2", "L1", "S1", "P1"}
+    repository.close()
+
+def test_analytics_and_navigation_push_down(tmp_path):
+    expected = build_company()
+    repository = SQLiteRepository(str(tmp_path / "rentals.db"))
+    build_company(repository)
+    company = RentalCompany.from_repository(repository, "Stored Homes")
+    snapshot, reference = RentalAnalytics().snapshot(company), RentalAnalytics().snapshot(expected)
+    assert (snapshot.total_units, snapshot.occupied_units) == (6, 1)
+    assert snapshot.total_rent == pytest.approx(reference.total_rent)
+    assert snapshot.by_type["Apartment"].vacant_rent == pytest.approx(900.0)
+    assert company.analyze_occupancy() == "Occupancy Rate: 16.67%"
+    nearest = Navigation(company).k_nearest_available((-1.30, 36.78), 2)
+    assert [p.property_id for p in nearest] == ["A1", "H1"]
+    assert Navigation(company).k_nearest_available((51.5, -0.1), 1, max_km=100) == []
+    company.get_property("A1").is_occupied = True
+    assert Navigation(company).get_nearest_available_property((-1.30, 36.78)).property_id == "H1"
+    repository.close()
+
+def test_leases_and_payments_are_indexed(repository):
+    company = build_company(repository)
+    apartment = company.get_property("A1")
+    resident = Resident(101, "jane", "secret", 1, "Jane", "jane@email.com", [])
+    first = LeaseAgreement(1, apartment, resident, datetime(2025, 1, 1), 6, 850.0)
+    second = LeaseAgreement(2, apartment, resident, datetime(2025, 7, 1), 12, 900.0)
+    repository.save_leases([first, second])
+    payments = [Payment(second, 900.0, date(2025, 7, 1)), Payment(second, 900.0, date(2025, 8, 1))]
+    repository.save_payments(payments)
+
+    assert [row.lease_id for row in repository.leases_active_on(datetime(2025, 3, 1))] == [1]
+    assert [row.lease_id for row in repository.leases_ending_between(date(2026, 1, 1), date(2026, 12, 31))] == [2]
+    second.renew(6)
+    assert repository.leases_for_property("A1")[1].end_date == datetime(2027, 1, 1)
+
+    payments[0].settle(date(2025, 6, 30))
+    assert [row.due_date for row in repository.payments_by_status("Pending")] == [date(2025, 8, 1)]
+    assert repository.payment_total("Paid") == 900.0
+    assert repository.payment_total("Paid", start=date(2025, 7, 1)) == 0.0
+
+def test_concurrent_readers_share_the_pool(tmp_path):
+    repository = SQLiteRepository(str(tmp_path / "rentals.db"), pool_size=3)
+    repository.batch_size = 100
+    repository.save_properties(Apartment(f"A{index}", f"{index} Pool Street", 50.0, 500.0 + index, "Pooled", index % 5)
+                               for index in range(1000))
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        counts = list(pool.map(lambda floor: sum(1 for _ in repository.query(floor=floor, min_price=600)), range(5)))
+    assert counts == [180, 180, 180, 180, 180]
+    assert len(repository._pool._connections) <= 3
+    repository.close()
+
+def test_in_memory_database_is_shared_between_connections():
+    repository = SQLiteRepository()
+    company = build_company(repository)
+    assert repository.count() == len(company) == 6
+    assert [row.property_id for row in repository.query(location="st")] == ["H1", "S1"]
+    repository.close()
+
+def test_full_walk_streams_one_query(tmp_path, monkeypatch):
+    repository = SQLiteRepository(str(tmp_path / "rentals.db"))
+    build_company(repository)
+    company = RentalCompany.from_repository(repository, "Stored Homes")
+    monkeypatch.setattr(repository, "get", lambda property_id: pytest.fail("per-id lookup during a full walk"))
+    assert [p.property_id for p in company.properties_list] == ["H1", "A1", "A2", "L1", "S1", "P1"]
+    assert dict(company._properties.items())["A2"] is company.properties_list[2]
+    repository.close()
+
+def test_incomplete_repository_fails_on_creation():
+    class Partial(Repository):
+        def get(self, property_id):
+            return None
+    with pytest.raises(TypeError):
+        Partial()
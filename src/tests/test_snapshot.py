@@ -0,0 +1,93 @@
+import pytest
+from datetime import datetime
+
+from src.model import LeaseAgreement, Owner, RentalContract, Resident
+from src.model.property import Property, Land, House, Apartment, Shop
+from src.model.rentalcompany import RentalCompany, PropertySearch, RentalAnalytics
+
+@pytest.fixture
+def portfolio():
+    company = RentalCompany("Snapshot Homes")
+    house = House("H1", "12 Green Street", 200.0, 1500.0, "Snapshot Homes", 3, 2, latitude=-1.28, longitude=36.82)
+    house.has_garden = True
+    house.add_facility("garden shed")
+    apartment = Apartment("A1", "Green Towers", 80.0, 900.0, "Snapshot Homes", 4)
+    apartment.has_balcony = True
+    company.add_properties([
+        house,
+        apartment,
+        Land("L1", "Plot 7B", 1000.0, 25000.0, "Snapshot Homes", "Residential", 800.0),
+        Shop("S1", "Main Street 10", 60.0, 1200.0, "Snapshot Homes", "Retail"),
+        Property("P1", "City Center", 120.0, 1000.0, "Snapshot Homes"),
+    ])
+    resident = Resident(101, "jane", "secret", 1, "Jane", "jane@email.com", [])
+    apartment.add_lease(LeaseAgreement(1, apartment, resident, datetime(2025, 1, 1), 6, 850.0))
+    apartment.add_lease(LeaseAgreement(2, apartment, resident, datetime(2025, 7, 1), 12, 900.0))
+    owner = Owner(7, "Olivia", "olivia@email.com", [house])
+    company.contracts.append(RentalContract(3, owner, house, "2025-01-01", "2027-01-01", 10.0))
+    return company
+
+def test_snapshot_round_trip(portfolio, tmp_path):
+    path = str(tmp_path / "portfolio.snap")
+    portfolio.save_snapshot(path)
+    restored = RentalCompany.load_snapshot(path)
+
+    assert restored.company_name == "Snapshot Homes"
+    assert [p.property_id for p in restored.properties_list] == ["H1", "A1", "L1", "S1", "P1"]
+    house, apartment = restored.get_property("H1"), restored.get_property("A1")
+    assert (house.num_bedrooms, house.num_bathrooms, house.has_garden) == (3, 2, True)
+    assert house.coordinates == (-1.28, 36.82) and house.facilities == ("garden shed",)
+    assert apartment.has_balcony and apartment.is_occupied
+    assert [lease.lease_id for lease in apartment.history] == [1]
+    assert apartment.current_lease.monthly_rent == 900.0
+    assert apartment.current_lease.resident is apartment.history[0].resident
+    assert restored.get_property("L1").zoning_type == "Residential"
+    assert restored.contracts[0].property is house and restored.contracts[0].owner.username == "Olivia"
+
+def test_snapshot_loads_properties_lazily(portfolio, tmp_path):
+    path = str(tmp_path / "portfolio.snap")
+    portfolio.save_snapshot(path)
+    restored = RentalCompany.load_snapshot(path)
+    assert restored._properties.loaded() == 1
+    snapshot = RentalAnalytics().snapshot(restored)
+    assert (snapshot.total_units, snapshot.occupied_units) == (5, 1)
+    assert snapshot.total_rent == RentalAnalytics().snapshot(portfolio).total_rent
+    search = PropertySearch()
+    assert [p.property_id for p in search.search_by_price(restored, 1100, 1600)] == ["S1", "H1"]
+    assert restored._properties.loaded() == 2
+    assert [p.property_id for p in search.search_by_location(restored, "green")] == ["H1", "A1"]
+    assert restored._properties.loaded() == 3
+
+def test_restored_properties_keep_indexes_current(portfolio, tmp_path):
+    path = str(tmp_path / "portfolio.snap")
+    portfolio.save_snapshot(path)
+    restored = RentalCompany.load_snapshot(path)
+    restored.get_property("P1").price = 2000.0
+    restored.remove_property(restored.get_property("S1"))
+    search = PropertySearch()
+    assert [p.property_id for p in search.search_by_price(restored, 1100, 2500)] == ["H1", "P1"]
+    assert "S1" not in [p.property_id for p in search.search_by_availability(restored)]
+
+def test_snapshot_rejects_other_files(tmp_path):
+    path = tmp_path / "bogus.snap"
+    path.write_bytes(b"\0" * 256)
+    with pytest.raises(ValueError):
+        RentalCompany.load_snapshot(str(path))
+
+def test_snapshot_keeps_terminated_contracts_terminated(portfolio, tmp_path):
+    path = str(tmp_path / "portfolio.snap")
+    portfolio.contracts[0].terminate()
+    portfolio.save_snapshot(path)
+    restored = RentalCompany.load_snapshot(path)
+    assert restored.contracts[0]._is_active is False
+
+def test_closing_a_restored_company_releases_the_file(portfolio, tmp_path):
+    path = str(tmp_path / "portfolio.snap")
+    portfolio.save_snapshot(path)
+    with RentalCompany.load_snapshot(path) as restored:
+        reader = restored._properties._reader
+        assert restored._properties.loaded() == 1
+    assert reader._map.closed and restored._properties.loaded() == 5
+    assert [p.property_id for p in PropertySearch().search_by_location(restored, "green")] == ["H1", "A1"]
+    assert restored.get_property("H1").facilities == ("garden shed",)
+    restored.close()
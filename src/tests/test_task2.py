@@ -0,0 +1,98 @@
+import pytest
+from datetime import date, datetime
+
+from src.model import LeaseAgreement, Resident
+from src.model.maintenance import Event
+from src.model.property import Property
+from src.scripts.task2 import Payment, LatePayment, PaymentHistory, PaymentScheduler, Notification
+
+@pytest.fixture
+def sample_lease():
+    resident = Resident(101, "jane", "secret", 1, "Jane", "jane@email.com", [])
+    unit = Property("P001", "Downtown", 100.0, 1200.0, "Nice Owner")
+    return LeaseAgreement(1, unit, resident, datetime(2026, 1, 1), 12, 1200.0)
+
+@pytest.fixture
+def payment_history(sample_lease):
+    history = PaymentHistory()
+    for due_date in ["2026-01-05", "2026-02-05", "2026-03-05", "2026-04-05"]:
+        history.add_payment(Payment(sample_lease, 1200.0, due_date))
+    return history
+
+def test_process_payment_returns_event(sample_lease):
+    on_time = Payment(sample_lease, 1200.0, "2026-01-05")
+    late = Payment(sample_lease, 1200.0, "2026-01-05")
+    assert isinstance(on_time.process_payment("2026-01-03"), Event)
+    assert on_time.status == "Paid"
+    assert "late" in late.process_payment("2026-01-09").text
+    assert late.is_late()
+
+def test_status_buckets_follow_processing(payment_history):
+    first, second, third, fourth = payment_history.get_payments()
+    first.process_payment("2026-01-04")
+    second.process_payment("2026-02-10")
+    assert payment_history.get_unpaid_payments() == [third, fourth]
+    assert payment_history.get_payments_by_status("Late") == [second]
+    assert payment_history.get_total_payments() == 1200.0
+
+def test_total_revenue_uses_date_index(payment_history, sample_lease):
+    first, second, third, fourth = payment_history.get_payments()
+    first.process_payment("2026-01-04")
+    third.process_payment("2026-03-01")
+    second.process_payment("2026-02-01")
+    late = LatePayment(sample_lease, 1000.0, "2026-02-01", 3)
+    payment_history.add_payment(late)
+    late.payment_date = datetime(2026, 2, 4).date()
+    late.status = "Paid"
+    assert payment_history.total_revenue("2026-01-01", "2026-01-31") == 1200.0
+    assert payment_history.total_revenue("2026-02-01", "2026-03-01") == 1200.0 + 1090.0 + 1200.0
+    third.status = "Pending"
+    assert payment_history.total_revenue("2026-01-01", "2026-12-31") == 1200.0 + 1090.0 + 1200.0
+    assert payment_history.total_revenue("2027-01-01", "2027-12-31") == 0
+
+def test_check_unpaid_payments_builds_reminders(sample_lease):
+    from datetime import timedelta
+    recipient = sample_lease.resident
+    recipient.payment_history = PaymentHistory()
+    overdue = Payment(sample_lease, 1200.0, (datetime.now().date() - timedelta(days=3)).strftime("%Y-%m-%d"))
+    recipient.payment_history.add_payment(overdue)
+    recipient.payment_history.add_payment(Payment(sample_lease, 1200.0, "2999-01-01"))
+    reminders = Notification(7, "rent", recipient).check_unpaid_payments()
+    assert len(reminders) == 1
+    assert "overdue by 3 days" in reminders[0].message
+
+def test_scheduler_only_pops_newly_overdue(sample_lease):
+    payments = [Payment(sample_lease, 1200.0, due) for due in ["2026-03-05", "2026-01-05", "2026-02-05"]]
+    scheduler = PaymentScheduler(payments)
+    payments[2].process_payment("2026-02-01")
+    late_payments, reminders = scheduler.tick(date(2026, 2, 10))
+    assert [late.due_date for late in late_payments] == [date(2026, 1, 5)]
+    assert late_payments[0].days_late == 36 and late_payments[0].status == "Late"
+    assert reminders[0].recipient is sample_lease.resident
+    assert scheduler.next_due_date() == date(2026, 3, 5)
+    assert scheduler.tick(date(2026, 3, 5)) == ([], [])
+    late_payments, reminders = scheduler.tick(date(2026, 3, 6))
+    assert len(late_payments) == 1 and reminders[0].notification_id == 2
+    assert len(scheduler) == 0
+
+def test_duplicate_payments_are_ignored_and_totals_do_not_drift(sample_lease):
+    history = PaymentHistory()
+    payment = Payment(sample_lease, 0.1, "2026-01-05")
+    history.add_payment(payment)
+    history.add_payment(payment)
+    assert history.get_payments() == [payment]
+    payment.process_payment("2026-01-04")
+    for _ in range(1000):
+        payment.status = "Pending"
+        payment.status = "Paid"
+    assert history.get_total_payments() == 0.1
+    assert history.total_revenue("2026-01-01", "2026-01-31") == 0.1
+
+def test_totals_keep_amounts_below_a_cent(sample_lease):
+    history = PaymentHistory()
+    for _ in range(3):
+        payment = Payment(sample_lease, 100 / 3, "2026-01-05")
+        history.add_payment(payment)
+        payment.process_payment("2026-01-04")
+    assert history.get_total_payments() == 100.0
+    assert history.total_revenue("2026-01-01", "2026-01-31") == 100.0